@@ -13,6 +13,12 @@ from rest_framework.exceptions import ValidationError
 from codecov_auth.models import Owner
 from core.models import Commit, Repository
 
+from .rollup import (
+    coverage_chart_from_rollups,
+    coverage_rollup_cache,
+    daily_coverage_rollups,
+)
+
 
 class ChartParamValidator(Validator):
     # Custom validation rule to require "agg_value" and "agg_function" fields only when not grouping by commit.
@@ -197,9 +203,9 @@ class ChartQueryRunner:
         return ""
 
     @cached_property
-    def repoids(self):
+    def repositories(self):
         """
-        Returns a string of repoids of the repositories being queried.
+        Returns the `(repoid, branch)` of the repositories being queried.
         """
         organization = Owner.objects.get(
             service=self.request_params["service"],
@@ -215,13 +221,16 @@ class ChartQueryRunner:
         if self.request_params.get("repositories", []):
             repos = repos.filter(name__in=self.request_params.get("repositories", []))
 
-        if repos:
+        return list(repos.values_list("repoid", "branch"))
+
+    @cached_property
+    def repoids(self):
+        """
+        Returns a string of repoids of the repositories being queried.
+        """
+        if self.repositories:
             # Get repoids into a format easily plugged into raw SQL
-            return (
-                "("
-                + ",".join(map(str, list(repos.values_list("repoid", flat=True))))
-                + ")"
-            )
+            return "(" + ",".join(str(repoid) for repoid, _ in self.repositories) + ")"
 
     @cached_property
     def first_complete_commit_date(self):
@@ -283,10 +292,42 @@ class ChartQueryRunner:
         if not v.validate(self.request_params):
             raise ValidationError(v.errors)
 
+    def run_rollup_query(self):
+        """
+        Builds the same datapoints as `run_query` from the daily rollups of the
+        repositories, caching them per owner and parameters.
+        """
+        owner = (self.request_params["service"], self.request_params["owner_username"])
+        params = dict(
+            repositories=sorted(self.repositories),
+            grouping_unit=self.grouping_unit,
+            start_date=self.request_params.get("start_date"),
+            end_date=self.end_date,
+            ordering=self.ordering,
+        )
+        chart = coverage_rollup_cache.get_chart(owner, params)
+        if chart is not None:
+            return chart
+
+        start_date = None
+        if "start_date" in self.request_params:
+            start_date = self.start_date
+        chart = coverage_chart_from_rollups(
+            daily_coverage_rollups(self.repositories),
+            grouping_unit=self.grouping_unit,
+            start_date=start_date,
+            end_date=self.end_date,
+            descending=self.ordering == "DESC",
+        )
+        coverage_rollup_cache.set_chart(owner, params, chart)
+        return chart
+
     def run_query(self):
         # Edge cases -- no repos or no commits
         if not self.repoids:
             return []
+        if coverage_rollup_cache.enabled:
+            return self.run_rollup_query()
         if not self.first_complete_commit_date:
             return []
 
@@ -0,0 +1,336 @@
+import hashlib
+import json
+import zlib
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Iterable, Optional
+
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.db.models import F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from core.models import Commit
+from services.redis_cache import RedisCache
+
+# (repoid, branch)
+RepoBranch = tuple[int, str]
+
+# days this recent are recomputed when extending a cached rollup, since commits
+# may complete well after their timestamp
+ROLLUP_RECOMPUTE_WINDOW = timedelta(days=1)
+
+# keys of the commit totals summed by the organization chart, in this order
+TOTALS_KEYS = ("h", "m", "p", "n")
+
+grouping_steps = {
+    "day": relativedelta(days=1),
+    "week": relativedelta(weeks=1),
+    "month": relativedelta(months=1),
+    "quarter": relativedelta(months=3),
+    "year": relativedelta(years=1),
+}
+
+
+@dataclass
+class DailyTotals:
+    """
+    Totals of the latest complete commit of a day: `[hits, misses, partials,
+    lines]`, or `None` when that commit has no totals.
+    """
+
+    timestamp: datetime
+    totals: Optional[list[Optional[float]]]
+
+
+@dataclass
+class CoverageRollup:
+    """
+    `DailyTotals` of a repository branch, by day.  `created_at` is when the
+    rollup was first computed and `computed_at` when it was last extended.
+    """
+
+    created_at: datetime
+    computed_at: datetime
+    days: dict[date, DailyTotals] = field(default_factory=dict)
+
+
+class CoverageRollupCache(RedisCache):
+    """
+    Redis store of the `CoverageRollup` of repository branches backing the
+    organization coverage chart, along with a short-lived cache of the charts
+    built from them.
+    """
+
+    enabled_setting = "CHART_ROLLUP_ENABLED"
+
+    def _redis_key(self, repo: RepoBranch) -> str:
+        repoid, branch = repo
+        return f"chart_rollup/{repoid}/{branch}"
+
+    def get_many(self, repos: Iterable[RepoBranch]) -> dict[RepoBranch, CoverageRollup]:
+        repos = list(repos)
+        if not repos:
+            return {}
+
+        with self.suppress_redis_errors("Error reading chart rollups from redis"):
+            values = self.redis.mget([self._redis_key(repo) for repo in repos])
+            return {
+                repo: self._deserialize(value)
+                for repo, value in zip(repos, values)
+                if value is not None
+            }
+        return {}
+
+    def set_many(self, entries: dict[RepoBranch, CoverageRollup]) -> None:
+        if not entries:
+            return
+
+        with self.suppress_redis_errors("Error writing chart rollups to redis"):
+            pipeline = self.redis.pipeline()
+            for repo, entry in entries.items():
+                pipeline.set(
+                    self._redis_key(repo),
+                    self._serialize(entry),
+                    ex=settings.CHART_ROLLUP_TTL,
+                )
+            pipeline.execute()
+
+    def _chart_key(self, owner: tuple[str, str], params: dict) -> str:
+        service, username = owner
+        params_hash = hashlib.sha256(
+            json.dumps(params, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        return f"chart_coverage/{service}/{username}/{params_hash}"
+
+    def get_chart(self, owner: tuple[str, str], params: dict) -> Optional[list[dict]]:
+        value = None
+        with self.suppress_redis_errors("Error reading chart from redis"):
+            value = self.redis.get(self._chart_key(owner, params))
+        if value is None:
+            return None
+
+        return [
+            {
+                "date": datetime.fromisoformat(datapoint["date"]),
+                **{
+                    key: Decimal(value) if value is not None else None
+                    for key, value in datapoint.items()
+                    if key != "date"
+                },
+            }
+            for datapoint in json.loads(value)
+        ]
+
+    def set_chart(
+        self, owner: tuple[str, str], params: dict, chart: list[dict]
+    ) -> None:
+        with self.suppress_redis_errors("Error writing chart to redis"):
+            self.redis.set(
+                self._chart_key(owner, params),
+                json.dumps(chart, default=str),
+                ex=settings.CHART_RESULT_CACHE_TTL,
+            )
+
+    def _serialize(self, entry: CoverageRollup) -> bytes:
+        data = {
+            "created_at": entry.created_at.isoformat(),
+            "computed_at": entry.computed_at.isoformat(),
+            "days": [
+                [day.isoformat(), totals.timestamp.isoformat(), totals.totals]
+                for day, totals in sorted(entry.days.items())
+            ],
+        }
+        return zlib.compress(json.dumps(data).encode())
+
+    def _deserialize(self, value: bytes) -> CoverageRollup:
+        data = json.loads(zlib.decompress(value))
+        return CoverageRollup(
+            created_at=datetime.fromisoformat(data["created_at"]),
+            computed_at=datetime.fromisoformat(data["computed_at"]),
+            days={
+                date.fromisoformat(day): DailyTotals(
+                    timestamp=datetime.fromisoformat(timestamp), totals=totals
+                )
+                for day, timestamp, totals in data["days"]
+            },
+        )
+
+
+coverage_rollup_cache = CoverageRollupCache()
+
+
+def _fetch_daily_totals(
+    repos: list[RepoBranch], since: Optional[date] = None
+) -> dict[RepoBranch, dict[date, DailyTotals]]:
+    """
+    Returns the totals of the latest complete commit of each day on the given
+    repository branches, optionally only for the days `since` the given date.
+    """
+    commits = Commit.objects.filter(state="complete", timestamp__isnull=False)
+    if since is not None:
+        commits = commits.filter(timestamp__gte=since)
+    rows = (
+        commits.extra(where=["(repoid, branch) in %s"], params=[tuple(repos)])
+        .annotate(day=TruncDate("timestamp"))
+        .order_by("repository_id", "branch", "day", F("timestamp").desc())
+        .distinct("repository_id", "branch", "day")
+        .values("repository_id", "branch", "day", "timestamp", "totals")
+    )
+
+    days = {}
+    for row in rows:
+        totals = row["totals"]
+        if totals is not None:
+            totals = [totals.get(key) for key in TOTALS_KEYS]
+        days.setdefault((row["repository_id"], row["branch"]), {})[row["day"]] = (
+            DailyTotals(timestamp=row["timestamp"], totals=totals)
+        )
+    return days
+
+
+def daily_coverage_rollups(
+    repos: Iterable[RepoBranch],
+) -> dict[RepoBranch, dict[date, DailyTotals]]:
+    """
+    Returns the `DailyTotals` of the given repository branches by day, from their
+    cached rollups.  Cached rollups are only extended with the recent days
+    instead of ranking every commit again, and are rebuilt from scratch once
+    older than `settings.CHART_ROLLUP_TTL`.
+    """
+    repos = list(set(repos))
+    if not repos:
+        return {}
+
+    now = timezone.now()
+    max_age = timedelta(seconds=settings.CHART_ROLLUP_TTL)
+    cached = {
+        repo: entry
+        for repo, entry in coverage_rollup_cache.get_many(repos).items()
+        if now - entry.created_at <= max_age
+    }
+
+    entries = {}
+    missing = [repo for repo in repos if repo not in cached]
+    if missing:
+        days = _fetch_daily_totals(missing)
+        for repo in missing:
+            entries[repo] = CoverageRollup(
+                created_at=now, computed_at=now, days=days.get(repo, {})
+            )
+
+    if cached:
+        since = {
+            repo: (entry.computed_at - ROLLUP_RECOMPUTE_WINDOW).date()
+            for repo, entry in cached.items()
+        }
+        days = _fetch_daily_totals(list(cached), since=min(since.values()))
+        for repo, entry in cached.items():
+            entry.days = {
+                day: totals for day, totals in entry.days.items() if day < since[repo]
+            }
+            entry.days.update(
+                (day, totals)
+                for day, totals in days.get(repo, {}).items()
+                if day >= since[repo]
+            )
+            entry.computed_at = now
+            entries[repo] = entry
+
+    coverage_rollup_cache.set_many(entries)
+    return {repo: entry.days for repo, entry in entries.items()}
+
+
+def truncate_date(day: date, grouping_unit: str) -> date:
+    """
+    Same as Postgres' `DATE_TRUNC` for the chart's grouping units.
+    """
+    if grouping_unit == "week":
+        return day - timedelta(days=day.weekday())
+    if grouping_unit == "month":
+        return day.replace(day=1)
+    if grouping_unit == "quarter":
+        return date(day.year, 3 * ((day.month - 1) // 3) + 1, 1)
+    if grouping_unit == "year":
+        return date(day.year, 1, 1)
+    return day
+
+
+def _decimal(value) -> Decimal:
+    return Decimal(str(value))
+
+
+def coverage_chart_from_rollups(
+    rollups: dict[RepoBranch, dict[date, DailyTotals]],
+    grouping_unit: str,
+    start_date: Optional[date],
+    end_date: date,
+    descending: bool = False,
+) -> list[dict]:
+    """
+    Builds the same datapoints as `ChartQueryRunner.run_query` from daily
+    rollups: the latest commit of each repository in every time window, or the
+    most recent one before it, summed across repositories.
+    """
+    days = [day for repo_days in rollups.values() for day in repo_days]
+    if not days:
+        return []
+
+    # the latest commit of a window is the latest commit of its latest day
+    windows = {}
+    for repo, repo_days in rollups.items():
+        repo_windows = windows.setdefault(repo, {})
+        for day in sorted(repo_days):
+            repo_windows[truncate_date(day, grouping_unit)] = repo_days[day]
+
+    spine_dates = []
+    spine_date = truncate_date(min(days), grouping_unit)
+    while spine_date <= end_date:
+        spine_dates.append(spine_date)
+        spine_date += grouping_steps[grouping_unit]
+
+    latest = {repo: None for repo in rollups}
+    chart = []
+    for spine_date in spine_dates:
+        for repo, repo_windows in windows.items():
+            window = repo_windows.get(spine_date)
+            if window is not None and window.totals is not None:
+                latest[repo] = window.totals
+
+        if start_date is not None and spine_date < truncate_date(
+            start_date, grouping_unit
+        ):
+            continue
+
+        sums = []
+        for index in range(len(TOTALS_KEYS)):
+            values = [
+                _decimal(totals[index]) if totals is not None else Decimal(0)
+                for totals in latest.values()
+                if totals is None or totals[index] is not None
+            ]
+            sums.append(sum(values) if values else None)
+        hits, misses, partials, lines = sums
+
+        coverage = None
+        if hits is not None and partials is not None and lines:
+            coverage = ((hits + partials) / lines * 100).quantize(
+                Decimal("0.01"), rounding=ROUND_HALF_UP
+            )
+
+        chart.append(
+            {
+                "date": datetime.combine(spine_date, time(), tzinfo=timezone.utc),
+                "total_hits": hits,
+                "total_misses": misses,
+                "total_partials": partials,
+                "total_lines": lines,
+                "coverage": coverage,
+            }
+        )
+
+    if descending:
+        chart.reverse()
+    return chart
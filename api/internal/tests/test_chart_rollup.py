@@ -0,0 +1,145 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+import fakeredis
+from ddf import G
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api.internal.chart.helpers import ChartQueryRunner
+from api.internal.chart.rollup import (
+    DailyTotals,
+    coverage_chart_from_rollups,
+    coverage_rollup_cache,
+    daily_coverage_rollups,
+    truncate_date,
+)
+from core.models import Commit
+from core.tests.factories import OwnerFactory, RepositoryFactory
+
+
+def test_truncate_date():
+    day = date(2024, 5, 16)  # a thursday
+    assert truncate_date(day, "day") == day
+    assert truncate_date(day, "week") == date(2024, 5, 13)
+    assert truncate_date(day, "month") == date(2024, 5, 1)
+    assert truncate_date(day, "quarter") == date(2024, 4, 1)
+    assert truncate_date(day, "year") == date(2024, 1, 1)
+
+
+def test_coverage_chart_from_rollups():
+    rollups = {
+        (1, "main"): {
+            date(2024, 5, 1): DailyTotals(
+                timestamp=datetime(2024, 5, 1, 10), totals=[80, 10, 10, 100]
+            ),
+            # the latest commit of the window is the one counted
+            date(2024, 5, 2): DailyTotals(
+                timestamp=datetime(2024, 5, 2, 10), totals=[90, 5, 5, 100]
+            ),
+        },
+        (2, "main"): {
+            date(2024, 5, 3): DailyTotals(
+                timestamp=datetime(2024, 5, 3, 10), totals=[10, 10, 0, 20]
+            ),
+            # commits without totals don't replace the previous ones
+            date(2024, 5, 4): DailyTotals(
+                timestamp=datetime(2024, 5, 4, 10), totals=None
+            ),
+        },
+    }
+
+    chart = coverage_chart_from_rollups(
+        rollups, "day", start_date=date(2024, 5, 2), end_date=date(2024, 5, 4)
+    )
+
+    assert [datapoint["date"].date() for datapoint in chart] == [
+        date(2024, 5, 2),
+        date(2024, 5, 3),
+        date(2024, 5, 4),
+    ]
+    assert chart[0]["total_hits"] == 90
+    assert chart[0]["total_lines"] == 100
+    assert chart[0]["coverage"] == Decimal("95.00")
+    assert chart[2]["total_hits"] == 100
+    assert chart[2]["total_lines"] == 120
+    assert chart[2]["coverage"] == Decimal("87.50")
+
+    weekly = coverage_chart_from_rollups(
+        rollups, "week", start_date=None, end_date=date(2024, 5, 4)
+    )
+    assert len(weekly) == 1
+    assert weekly[0]["date"].date() == date(2024, 4, 29)
+    assert weekly[0]["total_hits"] == 100
+
+
+def test_coverage_chart_from_rollups_without_commits():
+    assert coverage_chart_from_rollups({}, "day", None, date(2024, 5, 4)) == []
+
+
+@override_settings(CHART_ROLLUP_ENABLED=True)
+class ChartRollupTest(TestCase):
+    def setUp(self):
+        redis = patch.object(
+            coverage_rollup_cache, "_redis", fakeredis.FakeStrictRedis()
+        )
+        redis.start()
+        self.addCleanup(redis.stop)
+
+        self.org = OwnerFactory()
+        self.repo1 = RepositoryFactory(author=self.org, active=True)
+        self.repo2 = RepositoryFactory(author=self.org, active=True)
+        self.user = OwnerFactory(permission=[self.repo1.repoid, self.repo2.repoid])
+        G(
+            model=Commit,
+            repository=self.repo1,
+            totals={"h": 100, "n": 120, "p": 10, "m": 10},
+            branch=self.repo1.branch,
+            state="complete",
+        )
+        G(
+            model=Commit,
+            repository=self.repo2,
+            totals={"h": 14, "n": 25, "p": 6, "m": 5},
+            branch=self.repo2.branch,
+            state="complete",
+        )
+
+    def _run_query(self):
+        return ChartQueryRunner(
+            user=self.user,
+            request_params={
+                "owner_username": self.org.username,
+                "service": self.org.service,
+                "end_date": str(timezone.now()),
+                "grouping_unit": "day",
+            },
+        ).run_query()
+
+    def test_matches_query(self):
+        results = self._run_query()
+
+        with override_settings(CHART_ROLLUP_ENABLED=False):
+            assert results == self._run_query()
+
+    def test_caches_results(self):
+        results = self._run_query()
+        # only the owner and its repositories are queried
+        with self.assertNumQueries(2):
+            assert self._run_query() == results
+
+    def test_extends_cached_rollups(self):
+        repo = (self.repo1.repoid, self.repo1.branch)
+        daily_coverage_rollups([repo])
+
+        G(
+            model=Commit,
+            repository=self.repo1,
+            totals={"h": 110, "n": 120, "p": 5, "m": 5},
+            branch=self.repo1.branch,
+            state="complete",
+            timestamp=timezone.now() + timedelta(minutes=1),
+        )
+        (totals,) = daily_coverage_rollups([repo])[repo].values()
+        assert totals.totals == [110, 5, 5, 120]
@@ -1,13 +1,53 @@
 import logging
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
 
 from asgiref.sync import SyncToAsync
 from django.conf import settings
 from django.db import close_old_connections
 from django.db.models import Field, Lookup
 
+from .replicas import replica_aliases, replica_selector
+
 log = logging.getLogger(__name__)
 
 
+@dataclass
+class ReadYourWrites:
+    """
+    What the router tracks for the current request: the models written to, and
+    those whose reads go to the primary database (the former, unless
+    `pin_writes` is off, along with those written to by the client's previous
+    requests).  A single replica is used for the whole request so that its
+    reads don't go back in time.
+    """
+
+    pinned: set[str] = field(default_factory=set)
+    written: set[str] = field(default_factory=set)
+    replica: Optional[str] = None
+    pin_writes: bool = True
+
+
+_read_your_writes: ContextVar[Optional[ReadYourWrites]] = ContextVar(
+    "read_your_writes", default=None
+)
+
+
+def start_read_your_writes(
+    pinned: Iterable[str] = (), pin_writes: bool = True
+) -> ReadYourWrites:
+    state = ReadYourWrites(pinned=set(pinned), pin_writes=pin_writes)
+    _read_your_writes.set(state)
+    return state
+
+
+def stop_read_your_writes() -> Optional[ReadYourWrites]:
+    state = _read_your_writes.get()
+    _read_your_writes.set(None)
+    return state
+
+
 class DatabaseRouter:
     """
     A router to control all database operations on models across multiple databases.
@@ -22,14 +62,31 @@ class DatabaseRouter:
                 return "timeseries"
         else:
             if settings.DATABASE_READ_REPLICA_ENABLED:
-                return "default_read"
+                return self._replica_for_read(model)
             else:
                 return "default"
 
+    def _replica_for_read(self, model) -> str:
+        state = _read_your_writes.get()
+        if state is None:
+            # outside of a request there's no single replica to stick to
+            return replica_selector.choose() or "default"
+
+        if model._meta.label_lower in state.pinned:
+            return "default"
+        if state.replica is None:
+            state.replica = replica_selector.choose() or "default"
+        return state.replica
+
     def db_for_write(self, model, **hints):
         if model._meta.app_label == "timeseries":
             return "timeseries"
         else:
+            state = _read_your_writes.get()
+            if state is not None:
+                state.written.add(model._meta.label_lower)
+                if state.pin_writes:
+                    state.pinned.add(model._meta.label_lower)
             return "default"
 
     def allow_migrate(self, db, app_label, model_name=None, **hints):
@@ -38,7 +95,7 @@ class DatabaseRouter:
         ) and not settings.TIMESERIES_ENABLED:
             log.warning("Skipping timeseries migration")
             return False
-        if db == "default_read" or db == "timeseries_read":
+        if db in replica_aliases() or db == "timeseries_read":
             log.warning("Skipping migration of read-only database")
             return False
         if app_label == "timeseries":
@@ -0,0 +1,109 @@
+import logging
+import random
+import threading
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from prometheus_client import Gauge
+
+log = logging.getLogger(__name__)
+
+DATABASE_REPLICA_LAG = Gauge(
+    "api_database_replica_lag_seconds",
+    "Replication lag of the read replicas, as of their last health check",
+    ["alias"],
+    multiprocess_mode="max",
+)
+
+# a replica that received all the WAL it was sent is not lagging, however old its
+# last replayed transaction is (e.g. when the primary is idle)
+LAG_QUERY = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(
+            EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0
+        )
+    END
+"""
+
+
+def replica_aliases() -> list[str]:
+    return [
+        alias
+        for alias in settings.DATABASES
+        if alias == "default_read" or alias.startswith("default_read_")
+    ]
+
+
+class ReplicaSelector:
+    """
+    Picks the read replica to read from among the healthy ones.
+
+    When `settings.DATABASE_READ_REPLICA_MAX_LAG` is set, each process checks the
+    replication lag of the replicas every
+    `settings.DATABASE_READ_REPLICA_CHECK_INTERVAL` seconds, and skips those
+    lagging further behind or failing the check until the next one.
+    """
+
+    def __init__(self):
+        self._status: dict[str, tuple[float, bool]] = {}
+        self._lock = threading.Lock()
+
+    def choose(self) -> Optional[str]:
+        """
+        Returns a healthy replica alias, or `None` if there is none.
+        """
+        healthy = [alias for alias in replica_aliases() if self.is_healthy(alias)]
+        if not healthy:
+            return None
+        return random.choice(healthy)
+
+    def is_healthy(self, alias: str) -> bool:
+        if settings.DATABASE_READ_REPLICA_MAX_LAG is None:
+            return True
+
+        checked_at, healthy = self._status.get(alias, (None, True))
+        now = time.monotonic()
+        if (
+            checked_at is not None
+            and now - checked_at < settings.DATABASE_READ_REPLICA_CHECK_INTERVAL
+        ):
+            return healthy
+
+        # only one thread checks, the others use the previous status meanwhile
+        if not self._lock.acquire(blocking=False):
+            return healthy
+        try:
+            healthy = self._check(alias)
+            self._status[alias] = (now, healthy)
+        finally:
+            self._lock.release()
+        return healthy
+
+    def _check(self, alias: str) -> bool:
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute(LAG_QUERY)
+                (lag,) = cursor.fetchone()
+        except DatabaseError as e:
+            log.warning(
+                "Read replica health check failed",
+                extra=dict(alias=alias, error=str(e)),
+            )
+            return False
+
+        lag = float(lag)
+        DATABASE_REPLICA_LAG.labels(alias=alias).set(lag)
+        if lag > settings.DATABASE_READ_REPLICA_MAX_LAG:
+            log.warning(
+                "Read replica is lagging, reading from other databases",
+                extra=dict(alias=alias, lag=lag),
+            )
+            return False
+        return True
+
+
+replica_selector = ReplicaSelector()
@@ -44,6 +44,7 @@ INSTALLED_APPS = [
     "labelanalysis",
     "profiling",
     "reports",
+    "repositorysummary",
     "staticanalysis",
     "timeseries",
     "django_prometheus",
@@ -58,6 +59,7 @@ MIDDLEWARE = [
     "core.middleware.AppMetricsBeforeMiddlewareWithUA",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    "core.middleware.ReadYourWritesMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "codecov_auth.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -65,8 +67,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
-    "core.middleware.ServiceMiddleware",
-    "codecov_auth.middleware.CurrentOwnerMiddleware",
+    "codecov_auth.middleware.RequestContextMiddleware",
     "codecov_auth.middleware.ImpersonationMiddleware",
     "core.middleware.AppMetricsAfterMiddlewareWithUA",
     "csp.middleware.CSPMiddleware",
@@ -139,14 +140,120 @@ else:
     )
     DATABASE_READ_PORT = get_config("services", "database_read", "port", default=5432)
 
+# additional read replicas, reads are spread over them and `default_read`
+DATABASE_READ_REPLICA_URLS = get_config(
+    "services", "database_read_replica_urls", default=[]
+)
+# replicas lagging behind the primary by more than this many seconds, or failing
+# the check, are not read from (`None` disables the checks)
+DATABASE_READ_REPLICA_MAX_LAG = get_config(
+    "setup", "database", "read_replica_max_lag", default=None
+)
+DATABASE_READ_REPLICA_CHECK_INTERVAL = get_config(
+    "setup", "database", "read_replica_check_interval", default=15
+)
+# after a request writes to a model, reads of that model by the same client go to
+# the primary database for this many seconds (0 disables the pinning)
+DATABASE_READ_YOUR_WRITES_WINDOW = get_config(
+    "setup", "database", "read_your_writes_window", default=0
+)
+
 GRAPHQL_QUERY_COST_THRESHOLD = get_config(
     "setup", "graphql", "query_cost_threshold", default=10000
 )
+# number of parsed query documents kept in memory, by query hash
+GRAPHQL_QUERY_CACHE_SIZE = get_config(
+    "setup", "graphql", "query_cache_size", default=500
+)
+# how long the queries registered as persisted queries are kept in redis
+GRAPHQL_PERSISTED_QUERIES_TTL = get_config(
+    "setup", "graphql", "persisted_queries_ttl", default=7 * 24 * 60 * 60
+)
+# redis cache of the responses to anonymous queries about public repositories
+GRAPHQL_RESPONSE_CACHE_ENABLED = get_config(
+    "setup", "graphql", "response_cache", "enabled", default=False
+)
+GRAPHQL_RESPONSE_CACHE_TTL = get_config(
+    "setup", "graphql", "response_cache", "ttl", default=60
+)
+GRAPHQL_RESPONSE_CACHE_LOCK_TIMEOUT = get_config(
+    "setup", "graphql", "response_cache", "lock_timeout", default=10
+)
+GRAPHQL_RESPONSE_CACHE_LOCK_WAIT = get_config(
+    "setup", "graphql", "response_cache", "lock_wait", default=2
+)
+# redis cache of the exact total counts of connections (see
+# `graphql_api.count_cache`)
+GRAPHQL_COUNT_CACHE_ENABLED = get_config(
+    "setup", "graphql", "count_cache", "enabled", default=False
+)
+GRAPHQL_COUNT_CACHE_TTL = get_config(
+    "setup", "graphql", "count_cache", "ttl", default=5 * 60
+)
+# estimated counts below this are replaced by exact ones
+GRAPHQL_COUNT_ESTIMATE_THRESHOLD = get_config(
+    "setup", "graphql", "count_estimate_threshold", default=10000
+)
 
 TIMESERIES_ENABLED = get_config("setup", "timeseries", "enabled", default=False)
 TIMESERIES_REAL_TIME_AGGREGATES = get_config(
     "setup", "timeseries", "real_time_aggregates", default=False
 )
+# cache of the final yaml of commits (see `services.yaml_cache`), always kept in
+# memory and also in redis when enabled
+YAML_CACHE_ENABLED = get_config("setup", "yaml_cache", "enabled", default=False)
+YAML_CACHE_TTL = get_config("setup", "yaml_cache", "ttl", default=24 * 60 * 60)
+# for commits without a yaml, or whose yaml couldn't be fetched
+YAML_CACHE_NEGATIVE_TTL = get_config(
+    "setup", "yaml_cache", "negative_ttl", default=5 * 60
+)
+YAML_CACHE_MEMORY_MAX_ENTRIES = get_config(
+    "setup", "yaml_cache", "memory_max_entries", default=500
+)
+
+# cache of the comparisons fetched from git providers, by pair of commits (see
+# `services.git_comparison_cache`)
+GIT_COMPARISON_CACHE_ENABLED = get_config(
+    "setup", "git_comparison_cache", "enabled", default=False
+)
+GIT_COMPARISON_CACHE_TTL = get_config(
+    "setup", "git_comparison_cache", "ttl", default=7 * 24 * 60 * 60
+)
+GIT_COMPARISON_CACHE_MEMORY_MAX_ENTRIES = get_config(
+    "setup", "git_comparison_cache", "memory_max_entries", default=100
+)
+
+# redis store of the indexed impacted files of comparisons (see
+# `services.impacted_files_index`)
+IMPACTED_FILES_INDEX_CACHE_ENABLED = get_config(
+    "setup", "impacted_files_index", "enabled", default=False
+)
+IMPACTED_FILES_INDEX_TTL = get_config(
+    "setup", "impacted_files_index", "ttl", default=24 * 60 * 60
+)
+
+# sort and filter repository lists on the denormalized coverage summaries of
+# repositories (see `repositorysummary`) instead of subqueries on commits
+REPOSITORY_COVERAGE_SUMMARY_ENABLED = get_config(
+    "setup", "repository_coverage_summary", "enabled", default=False
+)
+
+# redis rollup of the latest daily totals of repositories backing the organization
+# coverage chart (see `api.internal.chart.rollup`)
+CHART_ROLLUP_ENABLED = get_config("setup", "charts", "rollup", "enabled", default=False)
+CHART_ROLLUP_TTL = get_config("setup", "charts", "rollup", "ttl", default=24 * 60 * 60)
+CHART_RESULT_CACHE_TTL = get_config(
+    "setup", "charts", "rollup", "result_ttl", default=5 * 60
+)
+
+# redis cache of the coverage computed from commits while timeseries data is not
+# backfilled (see `timeseries.fallback_cache`)
+COVERAGE_FALLBACK_CACHE_ENABLED = get_config(
+    "setup", "timeseries", "fallback_cache", "enabled", default=False
+)
+COVERAGE_FALLBACK_CACHE_TTL = get_config(
+    "setup", "timeseries", "fallback_cache", "ttl", default=24 * 60 * 60
+)
 
 timeseries_database_url = get_config("services", "timeseries_database_url")
 if timeseries_database_url:
@@ -230,6 +337,18 @@ if DATABASE_READ_REPLICA_ENABLED:
         "CONN_MAX_AGE": CONN_MAX_AGE,
     }
 
+    for index, replica_url in enumerate(DATABASE_READ_REPLICA_URLS, start=1):
+        replica_conf = urlparse(replica_url)
+        DATABASES[f"default_read_{index}"] = {
+            "ENGINE": "psqlextra.backend",
+            "NAME": replica_conf.path.replace("/", ""),
+            "USER": replica_conf.username,
+            "PASSWORD": replica_conf.password,
+            "HOST": replica_conf.hostname,
+            "PORT": replica_conf.port,
+            "CONN_MAX_AGE": CONN_MAX_AGE,
+        }
+
 if TIMESERIES_ENABLED:
     DATABASES["timeseries"] = {
         "ENGINE": "django_prometheus.db.backends.postgresql",
@@ -540,6 +659,77 @@ SHELTER_SHARED_SECRET = get_config("setup", "shelter_shared_secret", default=Non
 # TODO: we can eventually get rid of this once it's confirmed working well for many repos
 REPORT_BUILDER_REPO_IDS = get_config("setup", "report_builder", "repo_ids", default=[])
 
+# two-tier (process memory + redis) cache of report chunks fetched from storage
+REPORT_CACHE_ENABLED = get_config("setup", "report_cache", "enabled", default=False)
+REPORT_CACHE_MEMORY_LIMIT = get_config(
+    "setup", "report_cache", "memory_limit", default=256 * 1024 * 1024
+)
+REPORT_CACHE_REDIS_TTL = get_config(
+    "setup", "report_cache", "redis_ttl", default=60 * 60
+)
+
+# lazily built reports read only the chunks of the files they access, through
+# ranged reads located by the sidecar index of `chunks.txt` (when it has one)
+REPORT_CHUNKS_RANGE_READS_ENABLED = get_config(
+    "setup", "report_chunks_range_reads", "enabled", default=False
+)
+
+# denormalized (repoid, commit) -> flags coverage store served to the flag badges
+BADGE_CACHE_ENABLED = get_config("setup", "badge_cache", "enabled", default=False)
+BADGE_CACHE_REDIS_TTL = get_config("setup", "badge_cache", "redis_ttl", default=60 * 60)
+BADGE_CACHE_MEMORY_TTL = get_config("setup", "badge_cache", "memory_ttl", default=10)
+BADGE_CACHE_MEMORY_MAX_ENTRIES = get_config(
+    "setup", "badge_cache", "memory_max_entries", default=10000
+)
+
+# redis cache of the flares and rendered SVGs served to the graph endpoints
+GRAPH_CACHE_ENABLED = get_config("setup", "graph_cache", "enabled", default=False)
+GRAPH_CACHE_TTL = get_config("setup", "graph_cache", "ttl", default=24 * 60 * 60)
+
+# redis counters of per-commit and monthly uploads read by the upload throttles,
+# loaded from the database when missing and reconciled against it once they are
+# older than the ttl.  Uploads created by the worker (legacy uploads) are not
+# counted until then, so limits can be exceeded by a ttl's worth of those.
+UPLOAD_COUNTERS_ENABLED = get_config(
+    "setup", "upload_counters", "enabled", default=False
+)
+UPLOAD_COUNTERS_TTL = get_config("setup", "upload_counters", "ttl", default=5 * 60)
+
+# only schedule one upload task per commit and report while one is pending
+UPLOAD_DISPATCH_DEBOUNCE_ENABLED = get_config(
+    "setup", "upload_dispatch_debounce", "enabled", default=False
+)
+# how long before its countdown elapses a scheduled upload task stops debouncing
+# uploads, so that none is queued after the task drained the queue even if the
+# clocks of the api and the workers drift a little
+UPLOAD_DISPATCH_DEBOUNCE_MARGIN = get_config(
+    "setup", "upload_dispatch_debounce", "margin", default=1
+)
+
+# publish task messages from a background thread instead of the request thread
+TASK_PUBLISHER_ENABLED = get_config("setup", "task_publisher", "enabled", default=False)
+TASK_PUBLISHER_MAX_SIZE = get_config(
+    "setup", "task_publisher", "max_size", default=1000
+)
+TASK_PUBLISHER_BATCH_SIZE = get_config(
+    "setup", "task_publisher", "batch_size", default=50
+)
+TASK_PUBLISHER_MAX_RETRIES = get_config(
+    "setup", "task_publisher", "max_retries", default=3
+)
+TASK_PUBLISHER_RETRY_BACKOFF = get_config(
+    "setup", "task_publisher", "retry_backoff", default=0.5
+)
+TASK_PUBLISHER_SPOOL_REPLAY_INTERVAL = get_config(
+    "setup", "task_publisher", "spool_replay_interval", default=30
+)
+TASK_PUBLISHER_SHUTDOWN_TIMEOUT = get_config(
+    "setup", "task_publisher", "shutdown_timeout", default=5
+)
+TASK_PUBLISHER_SPOOL_DIR = get_config(
+    "setup", "task_publisher", "spool_dir", default="/tmp/task_publisher_spool"
+)
+
 SENTRY_ENV = os.environ.get("CODECOV_ENV", False)
 SENTRY_DSN = os.environ.get("SERVICES__SENTRY__SERVER_DSN", None)
 SENTRY_DENY_LIST = DEFAULT_DENYLIST + ["_headers", "token_to_use"]
@@ -0,0 +1,136 @@
+from unittest.mock import patch
+
+from django.db import DatabaseError
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from codecov.db import DatabaseRouter, start_read_your_writes, stop_read_your_writes
+from codecov.db.replicas import ReplicaSelector
+from core.middleware import ReadYourWritesMiddleware
+from core.models import Commit, Repository
+
+
+@override_settings(DATABASE_READ_REPLICA_ENABLED=True)
+class DatabaseRouterTest(TestCase):
+    def setUp(self):
+        self.router = DatabaseRouter()
+
+    def tearDown(self):
+        stop_read_your_writes()
+
+    @patch("codecov.db.replica_selector.choose", return_value="default_read")
+    def test_reads_from_replica(self, choose):
+        assert self.router.db_for_read(Commit) == "default_read"
+
+    @patch("codecov.db.replica_selector.choose", return_value=None)
+    def test_reads_from_primary_without_healthy_replica(self, choose):
+        assert self.router.db_for_read(Commit) == "default"
+
+    @patch("codecov.db.replica_selector.choose", return_value="default_read")
+    def test_reads_written_models_from_primary(self, choose):
+        state = start_read_your_writes()
+        assert self.router.db_for_write(Commit) == "default"
+        assert state.written == {"core.commit"}
+
+        assert self.router.db_for_read(Commit) == "default"
+        assert self.router.db_for_read(Repository) == "default_read"
+
+    @patch("codecov.db.replica_selector.choose", side_effect=["default_read_1", None])
+    def test_uses_a_single_replica_per_request(self, choose):
+        start_read_your_writes(["core.repository"])
+        assert self.router.db_for_read(Commit) == "default_read_1"
+        assert self.router.db_for_read(Commit) == "default_read_1"
+        assert self.router.db_for_read(Repository) == "default"
+        assert choose.call_count == 1
+
+    def test_does_not_migrate_replicas(self):
+        assert not self.router.allow_migrate("default_read", "core")
+        assert self.router.allow_migrate("default", "core")
+
+
+class ReplicaSelectorTest(TestCase):
+    @override_settings(DATABASE_READ_REPLICA_MAX_LAG=None)
+    def test_healthy_without_checks(self):
+        assert ReplicaSelector().is_healthy("default_read")
+
+    @override_settings(
+        DATABASE_READ_REPLICA_MAX_LAG=10, DATABASE_READ_REPLICA_CHECK_INTERVAL=60
+    )
+    def test_checks_lag_once_per_interval(self):
+        selector = ReplicaSelector()
+        with patch.object(selector, "_check", return_value=False) as check:
+            assert not selector.is_healthy("default_read")
+            assert not selector.is_healthy("default_read")
+        check.assert_called_once_with("default_read")
+
+    @override_settings(DATABASE_READ_REPLICA_MAX_LAG=10)
+    @patch("codecov.db.replicas.connections")
+    def test_check(self, connections):
+        cursor = connections.__getitem__.return_value.cursor.return_value.__enter__()
+        selector = ReplicaSelector()
+
+        cursor.fetchone.return_value = (2.5,)
+        assert selector._check("default_read")
+
+        cursor.fetchone.return_value = (30,)
+        assert not selector._check("default_read")
+
+        cursor.execute.side_effect = DatabaseError("connection refused")
+        assert not selector._check("default_read")
+
+
+@override_settings(DATABASE_READ_YOUR_WRITES_WINDOW=30)
+class ReadYourWritesMiddlewareTest(TestCase):
+    def setUp(self):
+        self.router = DatabaseRouter()
+
+    def _get(self, view, cookie=None):
+        request = RequestFactory().get("/")
+        if cookie is not None:
+            request.COOKIES[ReadYourWritesMiddleware.cookie_name] = cookie
+        return ReadYourWritesMiddleware(view)(request)
+
+    def test_sets_cookie_after_write(self):
+        def view(request):
+            self.router.db_for_write(Commit)
+            return HttpResponse()
+
+        response = self._get(view)
+        cookie = response.cookies[ReadYourWritesMiddleware.cookie_name]
+        assert cookie.value == "core.commit"
+        assert cookie["max-age"] == 30
+
+    def test_no_cookie_without_write(self):
+        response = self._get(lambda request: HttpResponse())
+        assert ReadYourWritesMiddleware.cookie_name not in response.cookies
+
+    @override_settings(DATABASE_READ_REPLICA_ENABLED=True)
+    @patch("codecov.db.replica_selector.choose", return_value="default_read")
+    def test_pins_models_from_cookie(self, choose):
+        databases = []
+
+        def view(request):
+            databases.append(self.router.db_for_read(Commit))
+            databases.append(self.router.db_for_read(Repository))
+            return HttpResponse()
+
+        self._get(view, cookie="core.commit")
+        assert databases == ["default", "default_read"]
+
+    @override_settings(
+        DATABASE_READ_REPLICA_ENABLED=True, DATABASE_READ_YOUR_WRITES_WINDOW=0
+    )
+    @patch("codecov.db.replica_selector.choose", side_effect=["default_read_1", None])
+    def test_single_replica_without_window(self, choose):
+        databases = []
+
+        def view(request):
+            databases.append(self.router.db_for_read(Commit))
+            self.router.db_for_write(Commit)
+            databases.append(self.router.db_for_read(Commit))
+            return HttpResponse()
+
+        response = self._get(view, cookie="core.commit")
+        assert databases == ["default_read_1", "default_read_1"]
+        assert choose.call_count == 1
+        assert ReadYourWritesMiddleware.cookie_name not in response.cookies
@@ -8,33 +8,33 @@ from corsheaders.middleware import (
     ACCESS_CONTROL_ALLOW_ORIGIN,
 )
 from corsheaders.middleware import CorsMiddleware as BaseCorsMiddleware
-from django.conf import settings
-from django.http import HttpRequest, JsonResponse
-from django.urls import resolve
+from django.db.models import Q
 from django.utils.deprecation import MiddlewareMixin
 from rest_framework import exceptions
 
 from codecov_auth.models import Owner, Service
+from core.middleware import MIDDLEWARE_DURATION
 from utils.services import get_long_service_name
 
 log = logging.getLogger(__name__)
 
 
-def get_service(request: HttpRequest) -> Optional[str]:
-    resolver_match = resolve(request.path_info)
-    service = resolver_match.kwargs.get("service")
-    if service is not None:
-        service = get_long_service_name(service.lower())
-        try:
-            Service(service)
-            return service
-        except ValueError:
-            # not a valid service
-            return None
+def get_service(service: Optional[str]) -> Optional[str]:
+    if service is None:
+        return None
+    try:
+        return Service(service).value
+    except ValueError:
+        # not a valid service
+        return None
 
 
-class CurrentOwnerMiddleware(MiddlewareMixin):
+class RequestContextMiddleware(MiddlewareMixin):
     """
+    Sets up the context of the request that views rely on:
+
+    The `service` URL kwarg is normalized to its long name (e.g. `gh` -> `github`).
+
     The authenticated `User` may have multiple linked `Owners` and we need a way
     to load the "currently active" `Owner` for use in this request.
 
@@ -45,35 +45,75 @@ class CurrentOwnerMiddleware(MiddlewareMixin):
     This middleware is preferrable to accessing the session directly in views since
     we can load the `Owner` once and reuse it anywhere needed (without having to perform
     additional database queries).
+
+    The owner is looked up in `process_view` so that it reuses the URL resolution
+    Django did for routing instead of resolving the path again.  Requests that
+    never reach a view keep the `None` owner set in `process_request`.
     """
 
     def process_request(self, request):
-        if not request.user or request.user.is_anonymous:
-            request.current_owner = None
-            return
+        request.current_owner = None
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        with MIDDLEWARE_DURATION.labels(middleware="request_context").time():
+            service = view_kwargs.get("service")
+            if service is not None:
+                service = get_long_service_name(service.lower())
+                # `view_kwargs` is `request.resolver_match.kwargs`
+                view_kwargs["service"] = service
+
+            request.current_owner = self.get_current_owner(
+                request, get_service(service)
+            )
+        return None
 
+    def get_current_owner(self, request, service: Optional[str]) -> Optional[Owner]:
         current_user = request.user
-        current_owner = None
+        if not current_user or current_user.is_anonymous:
+            return None
 
         current_owner_id = request.session.get("current_owner_id")
-        if current_owner_id is not None:
-            current_owner = current_user.owners.filter(pk=current_owner_id).first()
+        if current_owner_id is None and service is None:
+            return None
 
-        service = get_service(request)
+        # a single query for both the session's owner and the service's owners
+        filters = Q(pk=current_owner_id) if current_owner_id is not None else Q()
+        if service:
+            filters |= Q(service=service)
+        owners = list(current_user.owners.filter(filters).order_by("pk"))
+
+        current_owner = next(
+            (owner for owner in owners if owner.pk == current_owner_id), None
+        )
         if service and (current_owner is None or service != current_owner.service):
             # FIXME: this is OK (for now) since we're only allowing a single owner of a given
             # service to be linked to any 1 user
-            current_owner = current_user.owners.filter(service=service).first()
-
-        request.current_owner = current_owner
+            current_owner = next(
+                (owner for owner in owners if owner.service == service), None
+            )
+        return current_owner
 
 
 class ImpersonationMiddleware(MiddlewareMixin):
     """
     Allows staff users to impersonate other users for debugging.
+
+    The impersonated owner is loaded in `process_request` and replaces the
+    `current_owner` in `process_view`, so this must come after
+    `RequestContextMiddleware`.
     """
 
     def process_request(self, request):
+        request.impersonated_owner = None
+        with MIDDLEWARE_DURATION.labels(middleware="impersonation").time():
+            self.impersonate(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.impersonated_owner is not None:
+            request.current_owner = request.impersonated_owner
+        return None
+
+    def impersonate(self, request):
         current_user = request.user
 
         if current_user and not current_user.is_anonymous:
@@ -99,12 +139,12 @@ class ImpersonationMiddleware(MiddlewareMixin):
                 )
                 raise exceptions.PermissionDenied()
 
-            request.current_owner = (
+            request.impersonated_owner = (
                 Owner.objects.filter(pk=impersonating_ownerid)
                 .prefetch_related("user")
                 .first()
             )
-            if request.current_owner is None:
+            if request.impersonated_owner is None:
                 log.warning(
                     "Impersonation unsuccessful",
                     extra=dict(
@@ -1,7 +1,9 @@
-from django.test import TestCase, override_settings
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory, TestCase, override_settings
 from django.urls import reverse
 
-from codecov_auth.tests.factories import OwnerFactory
+from codecov_auth.middleware import ImpersonationMiddleware, RequestContextMiddleware
+from codecov_auth.tests.factories import OwnerFactory, UserFactory
 from utils.test_utils import Client
 
 
@@ -21,3 +23,73 @@ class MiddlewareTest(TestCase):
 
         assert res.headers["Access-Control-Allow-Origin"] == "http://example.com"
         assert "Access-Control-Allow-Credentials" not in res.headers
+
+
+class RequestContextMiddlewareTest(TestCase):
+    def setUp(self):
+        self.user = UserFactory()
+        self.github_owner = OwnerFactory(service="github", user=self.user)
+        self.gitlab_owner = OwnerFactory(service="gitlab", user=self.user)
+        self.middleware = RequestContextMiddleware(lambda request: None)
+
+    def _request(self, current_owner_id=None, user=None):
+        request = RequestFactory().get("/")
+        request.user = user or self.user
+        request.session = {"current_owner_id": current_owner_id}
+        return request
+
+    def test_current_owner_defaults_to_none(self):
+        request = self._request(current_owner_id=self.gitlab_owner.pk)
+        with self.assertNumQueries(0):
+            self.middleware.process_request(request)
+        assert request.current_owner is None
+
+    def test_impersonation(self):
+        self.user.is_staff = True
+        self.user.save()
+        impersonated_owner = OwnerFactory(service="github")
+        impersonation = ImpersonationMiddleware(lambda request: None)
+        request = self._request(current_owner_id=self.github_owner.pk)
+        request.COOKIES["staff_user"] = str(impersonated_owner.pk)
+
+        self.middleware.process_request(request)
+        impersonation.process_request(request)
+        assert request.current_owner is None
+
+        self.middleware.process_view(request, None, (), {"service": "gh"})
+        impersonation.process_view(request, None, (), {"service": "gh"})
+        assert request.current_owner == impersonated_owner
+
+    def test_normalizes_service(self):
+        request = self._request()
+        view_kwargs = {"service": "GH"}
+        self.middleware.process_view(request, None, (), view_kwargs)
+        assert view_kwargs["service"] == "github"
+
+    def test_current_owner_from_session(self):
+        request = self._request(current_owner_id=self.gitlab_owner.pk)
+        with self.assertNumQueries(1):
+            self.middleware.process_view(request, None, (), {})
+        assert request.current_owner == self.gitlab_owner
+
+    def test_current_owner_matching_service(self):
+        request = self._request(current_owner_id=self.gitlab_owner.pk)
+        with self.assertNumQueries(1):
+            self.middleware.process_view(request, None, (), {"service": "gh"})
+        assert request.current_owner == self.github_owner
+
+    def test_current_owner_invalid_service(self):
+        request = self._request(current_owner_id=self.gitlab_owner.pk)
+        self.middleware.process_view(request, None, (), {"service": "unknown"})
+        assert request.current_owner == self.gitlab_owner
+
+    def test_current_owner_of_other_user(self):
+        request = self._request(current_owner_id=OwnerFactory().pk)
+        self.middleware.process_view(request, None, (), {})
+        assert request.current_owner is None
+
+    def test_current_owner_anonymous(self):
+        request = self._request(user=AnonymousUser())
+        with self.assertNumQueries(0):
+            self.middleware.process_view(request, None, (), {"service": "gh"})
+        assert request.current_owner is None
@@ -1,11 +1,11 @@
 import enum
-from typing import List, Optional
+from typing import List
 
 from shared.utils.match import match
 
 import services.components as components
 from codecov.commands.base import BaseInteractor
-from services.comparison import Comparison, ComparisonReport, ImpactedFile
+from services.comparison import Comparison, ComparisonReport, ImpactedFiles
 from services.report import files_belonging_to_flags, files_in_sessions
 
 
@@ -18,22 +18,45 @@ class ImpactedFileParameter(enum.Enum):
 
 
 class FetchImpactedFiles(BaseInteractor):
-    def _apply_filters(
-        self,
-        impacted_files: Optional[List[ImpactedFile]],
-        comparison: Comparison,
-        filters,
-    ):
+    def _ordered_positions(
+        self, comparison_report: ComparisonReport, filters
+    ) -> List[int]:
+        """
+        Positions of the impacted files matching the `has_unintended_changes`
+        filter, in the requested order, from the comparison report's index.
+        """
+        index = comparison_report.index
+
+        positions = range(len(index))
+        has_unintended_changes = filters.get("has_unintended_changes")
+        if has_unintended_changes is not None:
+            positions = index.unintended if has_unintended_changes else index.direct
+
         parameter = filters.get("ordering", {}).get("parameter")
         direction = filters.get("ordering", {}).get("direction")
         if parameter and direction:
-            impacted_files = self.sort_impacted_files(
-                impacted_files, parameter, direction
-            )
+            if not isinstance(parameter, ImpactedFileParameter):
+                raise ValueError(f"invalid impacted file parameter: {parameter}")
+            # files without a value for the parameter are already last
+            ordering = index.ordering(parameter.value, direction.value)
+            if has_unintended_changes is not None:
+                selected = set(positions)
+                ordering = [pos for pos in ordering if pos in selected]
+            positions = ordering
+
+        return list(positions)
 
+    def _apply_filters(
+        self,
+        positions: List[int],
+        comparison_report: ComparisonReport,
+        comparison: Comparison,
+        filters,
+    ) -> List[int]:
         if not comparison:
-            return impacted_files
+            return positions
 
+        head_names = comparison_report.index.head_names
         flags_filter = filters.get("flags", [])
         components_filter = filters.get("components", [])
 
@@ -63,84 +86,32 @@ class FetchImpactedFiles(BaseInteractor):
 
         if flags_filter:
             if set(flags_filter) & set(head_commit_report.flags):
-                files = files_belonging_to_flags(
-                    commit_report=head_commit_report, flags=flags_filter
+                files = set(
+                    files_belonging_to_flags(
+                        commit_report=head_commit_report, flags=flags_filter
+                    )
                 )
-
-                impacted_files = [
-                    file for file in impacted_files if file.head_name in files
-                ]
-
-        res = impacted_files
+                positions = [pos for pos in positions if head_names[pos] in files]
 
         if components_paths:
-            res = [
-                file
-                for file in impacted_files
-                if match(components_paths, file.head_name)
+            positions = [
+                pos for pos in positions if match(components_paths, head_names[pos])
             ]
-        return res
-
-    def get_attribute(
-        self, impacted_file: ImpactedFile, parameter: ImpactedFileParameter
-    ):
-        if parameter == ImpactedFileParameter.FILE_NAME:
-            return impacted_file.file_name
-        elif parameter == ImpactedFileParameter.CHANGE_COVERAGE:
-            return impacted_file.change_coverage
-        elif parameter == ImpactedFileParameter.HEAD_COVERAGE:
-            if impacted_file.head_coverage is not None:
-                return impacted_file.head_coverage.coverage
-        elif parameter == ImpactedFileParameter.MISSES_COUNT:
-            if impacted_file.misses_count is not None:
-                return impacted_file.misses_count
-        elif parameter == ImpactedFileParameter.PATCH_COVERAGE:
-            if impacted_file.patch_coverage is not None:
-                return impacted_file.patch_coverage.coverage
-        else:
-            raise ValueError(f"invalid impacted file parameter: {parameter}")
-
-    def sort_impacted_files(self, impacted_files, parameter, direction):
-        """
-        Sorts the impacted files by any provided parameter and slides items with None values to the end
-        """
-        # Separate impacted files with None values for the specified parameter value
-        files_with_coverage = []
-        files_without_coverage = []
-        for file in impacted_files:
-            if self.get_attribute(file, parameter) is not None:
-                files_with_coverage.append(file)
-            else:
-                files_without_coverage.append(file)
-
-        # Sort impacted_files list based on parameter value
-        is_reversed = direction.value == "descending"
-        files_with_coverage = sorted(
-            files_with_coverage,
-            key=lambda x: self.get_attribute(x, parameter),
-            reverse=is_reversed,
-        )
-
-        # Merge both lists together
-        return files_with_coverage + files_without_coverage
+        return positions
 
     def execute(
         self,
         comparison_report: ComparisonReport,
         comparison: Comparison,
         filters,
-    ):
-        if filters is None:
-            return comparison_report.impacted_files
-
-        has_unintended_changes = filters.get("has_unintended_changes")
-        if has_unintended_changes is not None:
-            impacted_files = (
-                comparison_report.impacted_files_with_unintended_changes
-                if has_unintended_changes
-                else comparison_report.impacted_files_with_direct_changes
-            )
-        else:
-            impacted_files = comparison_report.impacted_files
-
-        return self._apply_filters(impacted_files, comparison, filters)
+    ) -> ImpactedFiles:
+        """
+        Returns the impacted files matching the filters, in the requested order.
+        Only the files accessed in the result are loaded.
+        """
+        filters = filters or {}
+        positions = self._ordered_positions(comparison_report, filters)
+        positions = self._apply_filters(
+            positions, comparison_report, comparison, filters
+        )
+        return ImpactedFiles(comparison_report, positions)
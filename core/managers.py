@@ -256,6 +256,34 @@ class RepositoryQuerySet(QuerySet):
             ),
         )
 
+    def with_coverage_summary(self):
+        """
+        Annotates the queryset like `with_recent_coverage` and
+        `with_latest_commit_at` do, from the repositories' denormalized
+        `RepositoryCoverageSummary` instead of subqueries on commits.  The
+        `coverage` and `latest_commit_at` sort keys are the expressions the
+        summaries are indexed on.  Repositories without a summary (one is
+        created along with them) sort as if they had no coverage or commits.
+        """
+        latest_commit_at = F("coverage_summary__latest_commit_at")
+        return self.annotate(
+            recent_commit_totals=F("coverage_summary__recent_commit_totals"),
+            coverage_sha=F("coverage_summary__coverage_sha"),
+            recent_coverage=F("coverage_summary__recent_coverage"),
+            coverage=Coalesce(
+                F("coverage_summary__recent_coverage"),
+                Value(-1),
+                output_field=FloatField(),
+            ),
+            hits=F("coverage_summary__hits"),
+            misses=F("coverage_summary__misses"),
+            lines=F("coverage_summary__lines"),
+            true_latest_commit_at=latest_commit_at,
+            latest_commit_at=Coalesce(
+                latest_commit_at, Value(datetime.datetime(1900, 1, 1))
+            ),
+        )
+
     def with_oldest_commit_at(self):
         """
         Annotates the queryset with the oldest commit timestamp.
@@ -1,15 +1,13 @@
-from typing import Optional
-
-from django.http import HttpRequest
-from django.urls import resolve
+from django.conf import settings
 from django.utils.deprecation import MiddlewareMixin
 from django_prometheus.middleware import (
     Metrics,
     PrometheusAfterMiddleware,
     PrometheusBeforeMiddleware,
 )
+from prometheus_client import Histogram
 
-from utils.services import get_long_service_name
+from codecov.db import start_read_your_writes, stop_read_your_writes
 
 # Prometheus metrics that will be annotated with User-Agent http header as label
 USER_AGENT_METRICS = [
@@ -30,23 +28,12 @@ USER_AGENT_METRICS = [
     "django_http_exceptions_total_by_view",
 ]
 
-
-def get_service_long_name(request: HttpRequest) -> Optional[str]:
-    resolver_match = resolve(request.path_info)
-    service = resolver_match.kwargs.get("service")
-    if service is not None:
-        resolver_match.kwargs["service"] = get_long_service_name(service.lower())
-        service = get_long_service_name(service.lower())
-        return service
-    return None
-
-
-class ServiceMiddleware(MiddlewareMixin):
-    def process_view(self, request, view_func, view_args, view_kwargs):
-        service = get_service_long_name(request)
-        if service:
-            view_kwargs["service"] = service
-        return None
+MIDDLEWARE_DURATION = Histogram(
+    "api_middleware_duration_seconds",
+    "Time in seconds spent in our middlewares before the view is called",
+    ["middleware"],
+    buckets=[0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1],
+)
 
 
 class CustomMetricsWithUA(Metrics):
@@ -87,3 +74,37 @@ class AppMetricsAfterMiddlewareWithUA(PrometheusAfterMiddleware):
         #     new_labels = {"user_agent": request.headers.get("User-Agent", "none")}
         #     new_labels.update(labels)
         return super().label_metric(metric, request, response=response, **new_labels)
+
+
+class ReadYourWritesMiddleware(MiddlewareMixin):
+    """
+    Sends the reads of the models a client wrote to the primary database, rather
+    than to a read replica which may not have caught up with the writes yet.
+
+    Models written to in a request are pinned for the rest of the request, and
+    for `settings.DATABASE_READ_YOUR_WRITES_WINDOW` seconds after it through a
+    cookie listing them.  Clients that don't keep cookies are only covered
+    within a request.  Without a window nothing is pinned, but each request
+    still reads from a single replica.
+    """
+
+    cookie_name = "db_pinned_models"
+
+    def process_request(self, request):
+        if not settings.DATABASE_READ_YOUR_WRITES_WINDOW:
+            start_read_your_writes(pin_writes=False)
+            return
+        pinned = request.COOKIES.get(self.cookie_name)
+        start_read_your_writes(pinned.split(",") if pinned else ())
+
+    def process_response(self, request, response):
+        state = stop_read_your_writes()
+        if state is not None and state.written and state.pin_writes:
+            response.set_cookie(
+                self.cookie_name,
+                ",".join(sorted(state.pinned)),
+                max_age=settings.DATABASE_READ_YOUR_WRITES_WINDOW,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
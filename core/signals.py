@@ -1,11 +1,14 @@
 import json
 
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from google.cloud import pubsub_v1
 
-from core.models import Repository
+from core.models import Branch, Commit, Pull, Repository
+from graphql_api.count_cache import connection_count_cache
+from graphql_api.response_cache import graphql_response_cache
+from repositorysummary.helpers import refresh_summaries
 
 _pubsub_publisher = None
 
@@ -37,3 +40,44 @@ def update_repository(sender, instance: Repository, **kwargs):
                     }
                 ).encode("utf-8"),
             )
+
+
+@receiver(post_save, sender=Branch, dispatch_uid="graphql_response_branch_saved")
+@receiver(post_delete, sender=Branch, dispatch_uid="graphql_response_branch_deleted")
+@receiver(post_save, sender=Commit, dispatch_uid="graphql_response_commit_saved")
+def invalidate_graphql_responses(sender, instance, **kwargs):
+    graphql_response_cache.invalidate(instance.repository_id)
+
+
+@receiver(post_save, sender=Commit, dispatch_uid="connection_count_commit_saved")
+@receiver(post_delete, sender=Commit, dispatch_uid="connection_count_commit_deleted")
+def invalidate_commit_counts(sender, instance: Commit, **kwargs):
+    connection_count_cache.invalidate(f"commits/{instance.repository_id}")
+
+
+@receiver(post_save, sender=Pull, dispatch_uid="connection_count_pull_saved")
+@receiver(post_delete, sender=Pull, dispatch_uid="connection_count_pull_deleted")
+def invalidate_pull_counts(sender, instance: Pull, **kwargs):
+    connection_count_cache.invalidate(f"pulls/{instance.repository_id}")
+
+
+@receiver(post_save, sender=Branch, dispatch_uid="connection_count_branch_saved")
+@receiver(post_delete, sender=Branch, dispatch_uid="connection_count_branch_deleted")
+def invalidate_branch_counts(sender, instance: Branch, **kwargs):
+    connection_count_cache.invalidate(f"branches/{instance.repository_id}")
+
+
+@receiver(post_save, sender=Repository, dispatch_uid="repository_summary_created")
+def create_repository_summary(sender, instance: Repository, created, **kwargs):
+    # repositories created by the worker get theirs from the
+    # `refresh_repository_summaries` command
+    if created and settings.REPOSITORY_COVERAGE_SUMMARY_ENABLED:
+        refresh_summaries([instance.repoid])
+
+
+@receiver(post_save, sender=Commit, dispatch_uid="repository_summary_commit_saved")
+def refresh_repository_summary(sender, instance: Commit, **kwargs):
+    # commits completed by the worker are picked up by the
+    # `refresh_repository_summaries` command
+    if settings.REPOSITORY_COVERAGE_SUMMARY_ENABLED:
+        refresh_summaries([instance.repository_id])
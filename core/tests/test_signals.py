@@ -4,7 +4,9 @@ from unittest.mock import call
 import pytest
 from django.test import override_settings
 
-from core.tests.factories import RepositoryFactory
+from core.models import Commit
+from core.tests.factories import BranchFactory, CommitFactory, RepositoryFactory
+from graphql_api.count_cache import connection_count_cache
 
 
 @override_settings(
@@ -45,3 +47,32 @@ def test_shelter_repo_sync(mocker):
     publish_calls = publish.call_args_list
     # does not trigger another publish
     assert len(publish_calls) == 2
+
+
+@override_settings(GRAPHQL_RESPONSE_CACHE_ENABLED=True)
+@pytest.mark.django_db
+def test_branch_and_commit_save_invalidate_graphql_responses(mocker, mock_redis):
+    invalidate = mocker.patch("core.signals.graphql_response_cache.invalidate")
+
+    branch = BranchFactory(name="main")
+    invalidate.assert_called_with(branch.repository_id)
+
+    commit = CommitFactory(repository=branch.repository)
+    invalidate.assert_called_with(commit.repository_id)
+
+    calls = invalidate.call_count
+    branch.delete()
+    assert invalidate.call_count == calls + 1
+
+
+@override_settings(GRAPHQL_COUNT_CACHE_ENABLED=True)
+@pytest.mark.django_db
+def test_commit_save_invalidates_connection_counts(mock_redis):
+    repo = RepositoryFactory()
+    commits = Commit.objects.filter(repository=repo)
+    scope = f"commits/{repo.repoid}"
+    connection_count_cache.set(scope, commits, 0)
+    assert connection_count_cache.get(scope, commits) == 0
+
+    CommitFactory(repository=repo)
+    assert connection_count_cache.get(scope, commits) is None
@@ -1,3 +1,5 @@
+from django.conf import settings
+
 from codecov_auth.models import Owner
 from core.models import Repository
 
@@ -24,12 +26,19 @@ def apply_filters_to_queryset(queryset, filters):
     return queryset
 
 
+def with_coverage(queryset):
+    """
+    Annotates the repositories with their recent coverage and latest commit,
+    from their coverage summaries when those are enabled.
+    """
+    if settings.REPOSITORY_COVERAGE_SUMMARY_ENABLED:
+        return queryset.with_coverage_summary()
+    return queryset.with_recent_coverage().with_latest_commit_at()
+
+
 def list_repository_for_owner(current_owner: Owner, owner: Owner, filters):
-    queryset = (
-        Repository.objects.viewable_repos(current_owner)
-        .with_recent_coverage()
-        .with_latest_commit_at()
-        .filter(author=owner)
+    queryset = with_coverage(Repository.objects.viewable_repos(current_owner)).filter(
+        author=owner
     )
     queryset = apply_filters_to_queryset(queryset, filters)
     return queryset
@@ -37,11 +46,8 @@ def list_repository_for_owner(current_owner: Owner, owner: Owner, filters):
 
 def search_repos(current_owner, filters):
     authors_from = [current_owner.ownerid] + (current_owner.organizations or [])
-    queryset = (
-        Repository.objects.viewable_repos(current_owner)
-        .with_recent_coverage()
-        .with_latest_commit_at()
-        .filter(author__ownerid__in=authors_from)
+    queryset = with_coverage(Repository.objects.viewable_repos(current_owner)).filter(
+        author__ownerid__in=authors_from
     )
     queryset = apply_filters_to_queryset(queryset, filters)
     return queryset
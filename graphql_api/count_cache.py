@@ -0,0 +1,112 @@
+import hashlib
+import json
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import QuerySet
+
+from services.redis_cache import RedisCache
+
+
+def _query_hash(queryset: QuerySet) -> str:
+    sql, params = queryset.order_by().query.get_compiler(queryset.db).as_sql()
+    return hashlib.sha256(json.dumps([sql, params], default=str).encode()).hexdigest()
+
+
+class ConnectionCountCache(RedisCache):
+    """
+    Redis cache of the exact total counts of connections.  Counts are stored by
+    scope (e.g. the commits of a repository) in a hash keyed by the query, so
+    that all the counts of a scope are invalidated at once when its rows change.
+
+    Rows written by the worker don't go through the signals invalidating scopes,
+    so counts are also only used for `settings.GRAPHQL_COUNT_CACHE_TTL` seconds.
+    """
+
+    enabled_setting = "GRAPHQL_COUNT_CACHE_ENABLED"
+
+    def _key(self, scope: str) -> str:
+        return f"connection_count/{scope}"
+
+    def get(self, scope: str, queryset: QuerySet) -> Optional[int]:
+        if not self.enabled:
+            return None
+        value = None
+        with self.suppress_redis_errors(
+            "Error reading connection count from redis", scope=scope
+        ):
+            value = self.redis.hget(self._key(scope), _query_hash(queryset))
+        if value is None:
+            return None
+
+        count, counted_at = json.loads(value)
+        if time.time() - counted_at > settings.GRAPHQL_COUNT_CACHE_TTL:
+            return None
+        return count
+
+    def set(self, scope: str, queryset: QuerySet, count: int) -> None:
+        if not self.enabled:
+            return
+        key = self._key(scope)
+        with self.suppress_redis_errors(
+            "Error writing connection count to redis", scope=scope
+        ):
+            pipeline = self.redis.pipeline()
+            pipeline.hset(key, _query_hash(queryset), json.dumps([count, time.time()]))
+            pipeline.expire(key, settings.GRAPHQL_COUNT_CACHE_TTL)
+            pipeline.execute()
+
+    def invalidate(self, scope: str) -> None:
+        if not self.enabled:
+            return
+        with self.suppress_redis_errors(
+            "Error invalidating connection counts", scope=scope
+        ):
+            self.redis.delete(self._key(scope))
+
+
+connection_count_cache = ConnectionCountCache()
+
+
+def exact_count(queryset: QuerySet, scope: Optional[str] = None) -> int:
+    """
+    Counts the rows of the queryset, using the `connection_count_cache` when a
+    scope is given.
+    """
+    if scope is None:
+        return queryset.count()
+
+    count = connection_count_cache.get(scope, queryset)
+    if count is None:
+        count = queryset.count()
+        connection_count_cache.set(scope, queryset, count)
+    return count
+
+
+def estimated_count(queryset: QuerySet) -> int:
+    """
+    Estimates the rows of the queryset from Postgres' statistics: the table's
+    `pg_class.reltuples` when the queryset isn't filtered, and the row estimate
+    of the query plan otherwise.
+    """
+    queryset = queryset.order_by()
+    query = queryset.query
+    with connections[queryset.db].cursor() as cursor:
+        if not query.where and not query.distinct:
+            cursor.execute(
+                "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+            # tables that were never analyzed have no estimate
+            if row is not None and row[0] >= 0:
+                return int(row[0])
+
+        sql, params = query.get_compiler(queryset.db).as_sql()
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
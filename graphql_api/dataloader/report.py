@@ -0,0 +1,95 @@
+from typing import Optional
+
+import services.report as report_service
+from codecov.db import sync_to_async
+from services.comparison import Comparison, PullRequestComparison
+
+from .commit import CommitLoader
+from .loader import BaseLoader
+
+
+class ReportLoader(BaseLoader):
+    """
+    Loads the `ReportSource` of commits by commitid.  Commits shared by several
+    comparisons (e.g. a common base) are only fetched once per request and the
+    chunks of a batch are fetched from storage concurrently.
+
+    The loaded sources are shared, so reports must be built from them with
+    `build_report_from_source` rather than being shared themselves.
+    """
+
+    def __init__(self, info, repository_id, *args, **kwargs):
+        self.repository_id = repository_id
+        super().__init__(info, *args, **kwargs)
+
+    async def batch_load_fn(self, keys):
+        commit_loader = CommitLoader.loader(self.info, self.repository_id)
+        commits = await commit_loader.load_many(keys)
+
+        return await self._load_sources(keys, commits)
+
+    @sync_to_async
+    def _load_sources(self, keys, commits):
+        sources = report_service.fetch_report_sources(
+            commit for commit in commits if commit
+        )
+
+        # return sources in the same order as `keys`
+        return [sources.get(key) for key in keys]
+
+
+class ComparisonReportsLoader(BaseLoader):
+    """
+    Loads the `(base, head)` `ReportSource`s of comparisons by their pair of
+    commitids, which the pull and commit resolvers know without querying the
+    database: the comparisons of a list of pulls are thus loaded in one batch.
+    """
+
+    def __init__(self, info, repository_id, *args, **kwargs):
+        self.repository_id = repository_id
+        super().__init__(info, *args, **kwargs)
+
+    async def batch_load_fn(self, keys):
+        commitids = list({commitid for pair in keys for commitid in pair if commitid})
+        report_loader = ReportLoader.loader(self.info, self.repository_id)
+        sources = dict(zip(commitids, await report_loader.load_many(commitids)))
+
+        return [tuple(sources.get(commitid) for commitid in pair) for pair in keys]
+
+
+def _comparison_commit_pair(
+    comparison: Comparison,
+) -> Optional[tuple[int, tuple[Optional[str], Optional[str]]]]:
+    """
+    Returns the repository and `(base, head)` commitids of the comparison, or
+    `None` if they aren't known without querying the database.
+    """
+    if isinstance(comparison, PullRequestComparison):
+        # pseudo comparisons (the default) are against `compared_to`, otherwise
+        # the base report isn't prefetched and is built when needed
+        pull = comparison.pull
+        return pull.repository_id, (pull.compared_to, pull.head)
+
+    base_commit, head_commit = comparison.base_commit, comparison.head_commit
+    if head_commit is None:
+        return None
+    return head_commit.repository_id, (
+        base_commit.commitid if base_commit is not None else None,
+        head_commit.commitid,
+    )
+
+
+async def load_comparison_reports(info, comparison: Comparison) -> None:
+    """
+    Fetches the base and head reports of the given comparison through the
+    request's `ComparisonReportsLoader`.
+    """
+    commit_pair = _comparison_commit_pair(comparison)
+    if commit_pair is None:
+        return
+
+    repository_id, key = commit_pair
+    loader = ComparisonReportsLoader.loader(info, repository_id)
+    for source in await loader.load(key):
+        if source is not None:
+            comparison.prefetched_reports[source.commit.commitid] = source
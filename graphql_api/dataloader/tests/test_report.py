@@ -0,0 +1,130 @@
+import asyncio
+from pathlib import Path
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.test import TransactionTestCase
+
+import services.report as report_service
+from core.tests.factories import CommitFactory, CommitWithReportFactory, PullFactory
+from graphql_api.dataloader.report import ReportLoader, load_comparison_reports
+from services.comparison import Comparison, PullRequestComparison
+from services.report import ReportSource
+
+chunks_path = (
+    Path(__file__).parent.parent.parent.parent / "services/tests/samples/chunks.txt"
+)
+
+
+class GraphQLResolveInfo:
+    def __init__(self):
+        self.context = {}
+
+
+async def load_sources(info, repoid, keys):
+    loader = ReportLoader.loader(info, repoid)
+    return await loader.load_many(keys)
+
+
+@patch("services.archive.ArchiveService.read_chunks")
+class ReportLoaderTestCase(TransactionTestCase):
+    def setUp(self):
+        self.base = CommitWithReportFactory(commitid="abf6d4d")
+        self.head = CommitWithReportFactory(
+            commitid="cdf6d4d", repository=self.base.repository
+        )
+        self.other = CommitWithReportFactory(
+            commitid="efa6d4d", repository=self.base.repository
+        )
+
+    def test_load_many(self, read_chunks):
+        read_chunks.return_value = chunks_path.read_text()
+        info = GraphQLResolveInfo()
+
+        sources = async_to_sync(load_sources)(
+            info,
+            self.base.repository_id,
+            [self.base.commitid, self.head.commitid, "missing"],
+        )
+        assert [source.commit for source in sources[:2]] == [self.base, self.head]
+        assert isinstance(sources[0], ReportSource)
+        assert sources[2] is None
+
+        # sources are shared through the request context
+        sources = async_to_sync(load_sources)(
+            info, self.base.repository_id, [self.base.commitid, self.other.commitid]
+        )
+        assert read_chunks.call_count == 3
+
+    def test_load_comparison_reports(self, read_chunks):
+        read_chunks.return_value = chunks_path.read_text()
+        info = GraphQLResolveInfo()
+
+        comparisons = [
+            Comparison(user=None, base_commit=self.base, head_commit=self.head),
+            Comparison(user=None, base_commit=self.base, head_commit=self.other),
+        ]
+        for comparison in comparisons:
+            async_to_sync(load_comparison_reports)(info, comparison)
+            assert set(comparison.prefetched_reports) == {
+                comparison.base_commit.commitid,
+                comparison.head_commit.commitid,
+            }
+
+        # the common base is only fetched once
+        assert read_chunks.call_count == 3
+
+        with patch("services.report.build_report_from_commit") as build_report:
+            assert comparisons[0].base_report is not comparisons[1].base_report
+            assert comparisons[0].base_report.files == comparisons[1].base_report.files
+            build_report.assert_not_called()
+
+    def test_load_comparison_reports_no_report(self, read_chunks):
+        commit = CommitFactory(repository=self.base.repository)
+        comparison = Comparison(user=None, base_commit=commit, head_commit=self.head)
+        read_chunks.return_value = chunks_path.read_text()
+
+        async_to_sync(load_comparison_reports)(GraphQLResolveInfo(), comparison)
+        assert set(comparison.prefetched_reports) == {self.head.commitid}
+
+    def test_load_comparison_reports_of_pulls(self, read_chunks):
+        read_chunks.return_value = chunks_path.read_text()
+        info = GraphQLResolveInfo()
+        comparisons = [
+            PullRequestComparison(
+                None,
+                PullFactory(
+                    repository=self.base.repository,
+                    compared_to=self.base.commitid,
+                    head=head.commitid,
+                ),
+            )
+            for head in [self.head, self.other]
+        ]
+
+        async def load_all():
+            # like the `compareWithBase` resolvers of a list of pulls
+            await asyncio.gather(
+                *(
+                    load_comparison_reports(info, comparison)
+                    for comparison in comparisons
+                )
+            )
+
+        with patch(
+            "services.report.fetch_report_sources",
+            wraps=report_service.fetch_report_sources,
+        ) as fetch_report_sources:
+            async_to_sync(load_all)()
+
+        # the reports of every pull are fetched in one batch
+        fetch_report_sources.assert_called_once()
+        assert read_chunks.call_count == 3
+        assert set(comparisons[0].prefetched_reports) == {
+            self.base.commitid,
+            self.head.commitid,
+        }
+        assert set(comparisons[1].prefetched_reports) == {
+            self.base.commitid,
+            self.other.commitid,
+        }
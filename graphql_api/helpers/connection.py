@@ -1,11 +1,14 @@
 import enum
 from dataclasses import dataclass
 from functools import cached_property
+from typing import Optional
 
 from cursor_pagination import CursorPage, CursorPaginator
+from django.conf import settings
 from django.db.models import QuerySet
 
 from codecov.db import sync_to_async
+from graphql_api.count_cache import estimated_count, exact_count
 from graphql_api.types.enums import OrderingDirection
 
 
@@ -14,7 +17,7 @@ def build_connection_graphql(connection_name, type_node):
     return f"""
         type {connection_name} {{
           edges: [{edge_name}]
-          totalCount: Int!
+          totalCount(estimate: Boolean = false): Int!
           pageInfo: PageInfo!
         }}
 
@@ -38,6 +41,8 @@ class Connection:
     queryset: QuerySet
     paginator: CursorPaginator
     page: CursorPage
+    # scope the exact count is cached in (see `graphql_api.count_cache`)
+    count_scope: Optional[str] = None
 
     @cached_property
     def edges(self):
@@ -47,8 +52,17 @@ class Connection:
         ]
 
     @sync_to_async
-    def total_count(self, *args, **kwargs):
-        return self.queryset.count()
+    def total_count(self, *args, estimate: bool = False, **kwargs):
+        """
+        The exact count of the queryset, unless an estimate is requested and
+        the planner expects at least `settings.GRAPHQL_COUNT_ESTIMATE_THRESHOLD`
+        rows.
+        """
+        if estimate:
+            count = estimated_count(self.queryset)
+            if count >= settings.GRAPHQL_COUNT_ESTIMATE_THRESHOLD:
+                return count
+        return exact_count(self.queryset, self.count_scope)
 
     @cached_property
     def start_cursor(self):
@@ -77,6 +91,7 @@ def queryset_to_connection_sync(
     after=None,
     last=None,
     before=None,
+    count_scope=None,
 ):
     """
     A method to take a queryset and return it in paginated order based on the cursor pattern.
@@ -87,7 +102,7 @@ def queryset_to_connection_sync(
     ordering = tuple(field_order(field, ordering_direction) for field in ordering)
     paginator = CursorPaginator(queryset, ordering=ordering)
     page = paginator.page(first=first, after=after, last=last, before=before)
-    return Connection(queryset, paginator, page)
+    return Connection(queryset, paginator, page, count_scope=count_scope)
 
 
 @sync_to_async
@@ -0,0 +1,211 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from django.conf import settings
+from graphql import (
+    DocumentNode,
+    FieldNode,
+    GraphQLError,
+    OperationDefinitionNode,
+    parse,
+)
+
+from services.redis_cache import RedisCache
+
+# maximum number of variable sets whose cost is remembered per query
+MAX_COST_CHECKS_PER_QUERY = 100
+
+
+class PersistedQueryError(Exception):
+    def __init__(self, message: str, code: str, status: int = 200):
+        self.message = message
+        self.code = code
+        self.status = status
+        super().__init__(message)
+
+
+def query_hash(query: str) -> str:
+    return hashlib.sha256(query.encode()).hexdigest()
+
+
+@dataclass
+class CachedQuery:
+    """
+    A parsed query document, along with what is derived from it on every request:
+    the type and name of its operations (used as metrics labels) and the variables
+    for which it passed cost validation.
+    """
+
+    hash: str
+    document: DocumentNode
+    cost_checks: OrderedDict = field(default_factory=OrderedDict)
+
+    def operation_type_and_name(
+        self, operation_name: Optional[str] = None
+    ) -> tuple[str, str]:
+        operations = [
+            definition
+            for definition in self.document.definitions
+            if isinstance(definition, OperationDefinitionNode)
+        ]
+        operation = next(
+            (
+                operation
+                for operation in operations
+                if operation_name is None
+                or (operation.name and operation.name.value == operation_name)
+            ),
+            None,
+        )
+        if operation is None:
+            return "unknown_type", "unknown_name"
+
+        if operation.name is not None:
+            return operation.operation.value, operation.name.value
+
+        # anonymous operations (e.g. `{ owner(username: "codecov") { ... } }`) are
+        # named after their first root field
+        root_field = next(
+            (
+                selection
+                for selection in operation.selection_set.selections
+                if isinstance(selection, FieldNode)
+            ),
+            None,
+        )
+        if root_field is None:
+            return operation.operation.value, "unknown_name"
+        return operation.operation.value, root_field.name.value
+
+    def _cost_key(self, schema_key: Any, variables: Optional[dict]) -> tuple:
+        return (
+            schema_key,
+            settings.GRAPHQL_QUERY_COST_THRESHOLD,
+            json.dumps(variables, sort_keys=True, default=str),
+        )
+
+    def is_cost_allowed(self, schema_key: Any, variables: Optional[dict]) -> bool:
+        return self._cost_key(schema_key, variables) in self.cost_checks
+
+    def allow_cost(self, schema_key: Any, variables: Optional[dict]) -> None:
+        self.cost_checks[self._cost_key(schema_key, variables)] = True
+        while len(self.cost_checks) > MAX_COST_CHECKS_PER_QUERY:
+            self.cost_checks.popitem(last=False)
+
+
+class QueryCache(RedisCache):
+    """
+    Process-local LRU of `CachedQuery` by query hash, in front of the redis store
+    of automatic persisted queries: clients sending the
+    `extensions.persistedQuery.sha256Hash` of a query can omit the query itself
+    once it was sent along with its hash.
+    """
+
+    def __init__(self):
+        self._queries: OrderedDict[str, CachedQuery] = OrderedDict()
+        self._texts: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _redis_key(self, hash: str) -> str:
+        return f"graphql/persisted_queries/{hash}"
+
+    def resolve_query(self, data: dict) -> dict:
+        """
+        Returns the request data with the query of persisted query requests filled
+        in.  Raises `PersistedQueryError` for unknown or mismatching hashes.
+        """
+        persisted_query = (data.get("extensions") or {}).get("persistedQuery")
+        if not isinstance(persisted_query, dict):
+            return data
+
+        hash = persisted_query.get("sha256Hash")
+        if persisted_query.get("version") != 1 or not isinstance(hash, str):
+            raise PersistedQueryError(
+                "Unsupported persisted query version",
+                "PERSISTED_QUERY_NOT_SUPPORTED",
+                status=400,
+            )
+
+        query = data.get("query")
+        if isinstance(query, str):
+            if query_hash(query) != hash:
+                raise PersistedQueryError(
+                    "Provided sha does not match query",
+                    "PERSISTED_QUERY_HASH_MISMATCH",
+                    status=400,
+                )
+            self._store_text(hash, query)
+            return data
+
+        query = self._load_text(hash)
+        if query is None:
+            raise PersistedQueryError(
+                "PersistedQueryNotFound", "PERSISTED_QUERY_NOT_FOUND"
+            )
+        return {**data, "query": query}
+
+    def get(self, query: str) -> Optional[CachedQuery]:
+        """
+        Returns the parsed query, or `None` when it is not valid GraphQL, in which
+        case parsing it again reports the error.
+        """
+        hash = query_hash(query)
+        with self._lock:
+            cached = self._queries.get(hash)
+            if cached is not None:
+                self._queries.move_to_end(hash)
+                return cached
+
+        try:
+            document = parse(query)
+        except GraphQLError:
+            return None
+
+        cached = CachedQuery(hash=hash, document=document)
+        with self._lock:
+            cached = self._queries.setdefault(hash, cached)
+            while len(self._queries) > settings.GRAPHQL_QUERY_CACHE_SIZE:
+                self._queries.popitem(last=False)
+        return cached
+
+    def _store_text(self, hash: str, query: str) -> None:
+        # clients only send the query along with its hash when it was not found
+        with self._lock:
+            self._remember_text(hash, query)
+        with self.suppress_redis_errors(
+            "Error storing persisted query in redis", hash=hash
+        ):
+            self.redis.set(
+                self._redis_key(hash), query, ex=settings.GRAPHQL_PERSISTED_QUERIES_TTL
+            )
+
+    def _load_text(self, hash: str) -> Optional[str]:
+        with self._lock:
+            query = self._texts.get(hash)
+        if query is not None:
+            return query
+
+        with self.suppress_redis_errors(
+            "Error reading persisted query from redis", hash=hash
+        ):
+            query = self.redis.get(self._redis_key(hash))
+        if query is None:
+            return None
+
+        query = query.decode()
+        with self._lock:
+            self._remember_text(hash, query)
+        return query
+
+    def _remember_text(self, hash: str, query: str) -> None:
+        self._texts[hash] = query
+        self._texts.move_to_end(hash)
+        while len(self._texts) > settings.GRAPHQL_QUERY_CACHE_SIZE:
+            self._texts.popitem(last=False)
+
+
+query_cache = QueryCache()
@@ -0,0 +1,227 @@
+import asyncio
+import hashlib
+import json
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.db.models import OuterRef, Subquery
+from graphql import (
+    DocumentNode,
+    FieldNode,
+    OperationDefinitionNode,
+    StringValueNode,
+    VariableNode,
+)
+
+from codecov.db import sync_to_async
+from core.models import Branch, Repository
+from services.redis_cache import RedisCache
+from utils.services import get_long_service_name
+
+# how often a request waiting for another one to fill the cache checks for it
+LOCK_POLL_INTERVAL = 0.05
+
+
+def _argument_value(field: FieldNode, name: str, variables: dict) -> Optional[str]:
+    for argument in field.arguments:
+        if argument.name.value != name:
+            continue
+        if isinstance(argument.value, VariableNode):
+            value = variables.get(argument.value.name.value)
+            return value if isinstance(value, str) else None
+        if isinstance(argument.value, StringValueNode):
+            return argument.value.value
+    return None
+
+
+def _fields(selection_set) -> list[FieldNode]:
+    if selection_set is None:
+        return []
+    return [
+        selection
+        for selection in selection_set.selections
+        if isinstance(selection, FieldNode)
+    ]
+
+
+def query_repository(
+    document: DocumentNode, operation_name: Optional[str], variables: Optional[dict]
+) -> Optional[tuple[str, str]]:
+    """
+    Returns the `(owner username, repository name)` of queries of the form
+    `{ owner(username: ...) { repository(name: ...) { ... } } }`, which are the
+    only ones whose responses are cached.
+    """
+    variables = variables or {}
+    operations = [
+        definition
+        for definition in document.definitions
+        if isinstance(definition, OperationDefinitionNode)
+        and (
+            operation_name is None
+            or (definition.name is not None and definition.name.value == operation_name)
+        )
+    ]
+    if len(operations) != 1 or operations[0].operation.value != "query":
+        return None
+
+    root_fields = _fields(operations[0].selection_set)
+    if len(root_fields) != 1 or root_fields[0].name.value != "owner":
+        return None
+    owner = _argument_value(root_fields[0], "username", variables)
+
+    repositories = [
+        field
+        for field in _fields(root_fields[0].selection_set)
+        if field.name.value == "repository"
+    ]
+    if len(repositories) != 1:
+        return None
+    repository = _argument_value(repositories[0], "name", variables)
+
+    if owner is None or repository is None:
+        return None
+    return owner, repository
+
+
+class GraphQLResponseCache(RedisCache):
+    """
+    Redis cache of the serialized responses to anonymous queries about public
+    repositories.
+
+    Entries are keyed by the query hash and variables, and by a marker of the
+    repository's state: its `updatestamp`, the latest `updatestamp` of its
+    branches (which moves with their head) and a generation counter bumped by
+    `invalidate` (see `core.signals`).  Commits, reports and comparisons written
+    by the worker don't go through those signals, so responses about them are
+    only kept fresh by their expiry after `settings.GRAPHQL_RESPONSE_CACHE_TTL`.
+
+    Only one request computes a missing entry at a time, the others `wait` for it
+    for up to `settings.GRAPHQL_RESPONSE_CACHE_LOCK_WAIT` seconds.
+    """
+
+    enabled_setting = "GRAPHQL_RESPONSE_CACHE_ENABLED"
+
+    def _generation_key(self, repoid: int) -> str:
+        return f"graphql_response_generation/{repoid}"
+
+    def cache_key(
+        self, service: str, query_hash: str, repository: tuple[str, str], data: dict
+    ) -> Optional[str]:
+        """
+        Returns the key of the response to the query, or `None` if the response
+        can't be cached (e.g. the repository is private or doesn't exist).
+        """
+        owner_username, repo_name = repository
+        latest_branch_update = (
+            Branch.objects.filter(repository_id=OuterRef("repoid"))
+            .order_by("-updatestamp")
+            .values("updatestamp")[:1]
+        )
+        repo = (
+            Repository.objects.filter(
+                author__service=get_long_service_name(service),
+                author__username=owner_username,
+                name=repo_name,
+                private=False,
+            )
+            .annotate(branches_updatestamp=Subquery(latest_branch_update))
+            .values("repoid", "updatestamp", "branches_updatestamp")
+            .first()
+        )
+        if repo is None:
+            return None
+
+        generation = None
+        with self.suppress_redis_errors(
+            "Error reading graphql response generation from redis",
+            repoid=repo["repoid"],
+        ):
+            generation = int(self.redis.get(self._generation_key(repo["repoid"])) or 0)
+        if generation is None:
+            return None
+
+        marker = f"{repo['updatestamp']}/{repo['branches_updatestamp']}/{generation}"
+        request_hash = hashlib.sha256(
+            json.dumps(
+                [
+                    query_hash,
+                    data.get("operationName"),
+                    data.get("variables"),
+                    marker,
+                ],
+                sort_keys=True,
+                default=str,
+            ).encode()
+        ).hexdigest()
+        return f"graphql_response/{repo['repoid']}/{request_hash}"
+
+    def get_or_lock(self, key: str) -> tuple[Optional[bytes], bool]:
+        """
+        Returns the cached response if there is one, and otherwise whether the
+        caller got the lock and is expected to compute and `set` it.
+        """
+        with self.suppress_redis_errors(
+            "Error reading graphql response from redis", key=key
+        ):
+            content = self.redis.get(key)
+            if content is not None:
+                return content, False
+            locked = self.redis.set(
+                f"{key}/lock",
+                1,
+                nx=True,
+                ex=settings.GRAPHQL_RESPONSE_CACHE_LOCK_TIMEOUT,
+            )
+            return None, bool(locked)
+        return None, False
+
+    async def wait(self, key: str) -> Optional[bytes]:
+        """
+        Waits for the request holding the lock to `set` the response.
+        """
+        deadline = time.monotonic() + settings.GRAPHQL_RESPONSE_CACHE_LOCK_WAIT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+            with self.suppress_redis_errors(
+                "Error waiting for graphql response in redis", key=key
+            ):
+                content = await sync_to_async(self.redis.get)(key)
+                if content is None:
+                    continue
+                return content
+            # there's no point in waiting on a failing redis
+            return None
+        return None
+
+    def set(self, key: str, content: bytes) -> None:
+        with self.suppress_redis_errors(
+            "Error writing graphql response to redis", key=key
+        ):
+            pipeline = self.redis.pipeline()
+            pipeline.set(key, content, ex=settings.GRAPHQL_RESPONSE_CACHE_TTL)
+            pipeline.delete(f"{key}/lock")
+            pipeline.execute()
+
+    def release(self, key: str) -> None:
+        with self.suppress_redis_errors(
+            "Error releasing graphql response lock", key=key
+        ):
+            self.redis.delete(f"{key}/lock")
+
+    def invalidate(self, repoid: int) -> None:
+        if not self.enabled:
+            return
+
+        with self.suppress_redis_errors(
+            "Error invalidating graphql responses", repoid=repoid
+        ):
+            key = self._generation_key(repoid)
+            pipeline = self.redis.pipeline()
+            pipeline.incr(key)
+            pipeline.expire(key, settings.GRAPHQL_RESPONSE_CACHE_TTL)
+            pipeline.execute()
+
+
+graphql_response_cache = GraphQLResponseCache()
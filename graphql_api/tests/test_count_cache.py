@@ -0,0 +1,106 @@
+from unittest.mock import patch
+
+import fakeredis
+from asgiref.sync import async_to_sync
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core.models import Repository
+from core.tests.factories import OwnerFactory, RepositoryFactory
+from graphql_api.count_cache import (
+    connection_count_cache,
+    estimated_count,
+    exact_count,
+)
+from graphql_api.helpers.connection import queryset_to_connection_sync
+from graphql_api.types.enums import OrderingDirection
+
+
+@override_settings(GRAPHQL_COUNT_CACHE_ENABLED=True)
+class ConnectionCountTest(TransactionTestCase):
+    def setUp(self):
+        redis = patch.object(
+            connection_count_cache, "_redis", fakeredis.FakeStrictRedis()
+        )
+        redis.start()
+        self.addCleanup(redis.stop)
+
+        self.owner = OwnerFactory()
+        RepositoryFactory(author=self.owner, name="a")
+        RepositoryFactory(author=self.owner, name="b")
+
+    def test_exact_count(self):
+        repos = Repository.objects.filter(author=self.owner)
+        assert exact_count(repos, "repos") == 2
+
+        RepositoryFactory(author=self.owner, name="c")
+        with self.assertNumQueries(0):
+            assert exact_count(repos, "repos") == 2
+        # counts are by query
+        assert exact_count(repos.filter(name="a"), "repos") == 1
+
+        connection_count_cache.invalidate("repos")
+        assert exact_count(repos, "repos") == 3
+
+    @override_settings(GRAPHQL_COUNT_CACHE_TTL=0)
+    def test_exact_count_expires(self):
+        repos = Repository.objects.filter(author=self.owner)
+        assert exact_count(repos, "repos") == 2
+        RepositoryFactory(author=self.owner, name="c")
+        assert exact_count(repos, "repos") == 3
+
+    def _analyze(self):
+        with connections["default"].cursor() as cursor:
+            cursor.execute(f"ANALYZE {Repository._meta.db_table}")
+
+    def test_estimated_count_from_table_statistics(self):
+        self._analyze()
+        with CaptureQueriesContext(connections["default"]) as queries:
+            assert estimated_count(Repository.objects.all()) == 2
+        assert len(queries) == 1
+        assert "pg_class" in queries[0]["sql"]
+
+        # the statistics are only as recent as the last analyze
+        RepositoryFactory(author=self.owner, name="c")
+        assert estimated_count(Repository.objects.all()) == 2
+
+    def test_estimated_count_from_query_plan(self):
+        self._analyze()
+        repos = Repository.objects.filter(author=self.owner, name="a")
+        with CaptureQueriesContext(connections["default"]) as queries:
+            assert estimated_count(repos) >= 1
+        assert len(queries) == 1
+        assert queries[0]["sql"].startswith("EXPLAIN")
+
+    @override_settings(GRAPHQL_COUNT_ESTIMATE_THRESHOLD=10000)
+    def test_total_count_estimate(self):
+        connection = queryset_to_connection_sync(
+            Repository.objects.filter(author=self.owner),
+            ordering=("repoid",),
+            ordering_direction=OrderingDirection.ASC,
+            count_scope="repos",
+        )
+        # small estimates are replaced by the exact count
+        assert async_to_sync(connection.total_count)(estimate=True) == 2
+
+        with patch(
+            "graphql_api.helpers.connection.estimated_count", return_value=20000
+        ):
+            assert async_to_sync(connection.total_count)(estimate=True) == 20000
+
+    def test_total_count_estimate_threshold(self):
+        self._analyze()
+        RepositoryFactory(author=self.owner, name="c")
+        connection = queryset_to_connection_sync(
+            Repository.objects.all(),
+            ordering=("repoid",),
+            ordering_direction=OrderingDirection.ASC,
+        )
+
+        # the estimate (as of the analyze) is used from the threshold on
+        with override_settings(GRAPHQL_COUNT_ESTIMATE_THRESHOLD=2):
+            assert async_to_sync(connection.total_count)(estimate=True) == 2
+        with override_settings(GRAPHQL_COUNT_ESTIMATE_THRESHOLD=3):
+            assert async_to_sync(connection.total_count)(estimate=True) == 3
+        assert async_to_sync(connection.total_count)() == 3
@@ -65,6 +65,42 @@ query ImpactedFiles(
     }
 """
 
+query_impacted_files_page = """
+query ImpactedFiles(
+    $org: String!
+    $repo: String!
+    $commit: String!
+    $first: Int
+    $after: String
+) {
+    owner(username: $org) {
+        repository(name: $repo) {
+            ... on Repository {
+                commit(id: $commit) {
+                    compareWithParent {
+                        ... on Comparison {
+                            impactedFiles(first: $first, after: $after) {
+                                ... on ImpactedFiles {
+                                    results {
+                                        headName
+                                    }
+                                    totalCount
+                                    pageInfo {
+                                        hasNextPage
+                                        hasPreviousPage
+                                        endCursor
+                                    }
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    }
+}
+"""
+
 query_direct_changed_files_count = """
 query ImpactedFiles(
     $org: String!
@@ -391,6 +427,33 @@ class TestImpactedFile(GraphQLTestHelper, TransactionTestCase):
         self.base_report.return_value = None
         self.addCleanup(self.base_report_patcher.stop)
 
+    @patch("services.archive.ArchiveService.read_file")
+    def test_paginate_impacted_files(self, read_file):
+        read_file.return_value = mock_data_from_archive
+        variables = {
+            "org": self.org.username,
+            "repo": self.repo.name,
+            "commit": self.commit.commitid,
+            "first": 1,
+        }
+        data = self.gql_request(query_impacted_files_page, variables=variables)
+        page = data["owner"]["repository"]["commit"]["compareWithParent"][
+            "impactedFiles"
+        ]
+        assert page["results"] == [{"headName": "fileA"}]
+        assert page["totalCount"] == 2
+        assert page["pageInfo"]["hasNextPage"] is True
+        assert page["pageInfo"]["hasPreviousPage"] is False
+
+        variables["after"] = page["pageInfo"]["endCursor"]
+        data = self.gql_request(query_impacted_files_page, variables=variables)
+        page = data["owner"]["repository"]["commit"]["compareWithParent"][
+            "impactedFiles"
+        ]
+        assert page["results"] == [{"headName": "fileB"}]
+        assert page["pageInfo"]["hasNextPage"] is False
+        assert page["pageInfo"]["hasPreviousPage"] is True
+
     @patch("services.archive.ArchiveService.read_file")
     def test_fetch_impacted_files(self, read_file):
         read_file.return_value = mock_data_from_archive
@@ -0,0 +1,84 @@
+import pytest
+from django.test import override_settings
+
+from ..persisted_queries import PersistedQueryError, QueryCache, query_hash
+
+
+@pytest.mark.parametrize(
+    "query, operation_name, expected",
+    [
+        ("query MySession { me { username } }", None, ("query", "MySession")),
+        (
+            "mutation($input: CancelTrialInput!) { cancelTrial(input: $input) { error } }",
+            None,
+            ("mutation", "cancelTrial"),
+        ),
+        ('{ owner(username: "codecov") { username } }', None, ("query", "owner")),
+        (
+            "query First { me { username } } query Second { config { planAutoActivate } }",
+            "Second",
+            ("query", "Second"),
+        ),
+        (
+            "query First { me { username } }",
+            "Missing",
+            ("unknown_type", "unknown_name"),
+        ),
+    ],
+)
+def test_operation_type_and_name(query, operation_name, expected):
+    cached_query = QueryCache().get(query)
+    assert cached_query.operation_type_and_name(operation_name) == expected
+
+
+def test_get_caches_parsed_documents():
+    cache = QueryCache()
+    query = "{ me { username } }"
+    assert cache.get(query) is cache.get(query)
+    assert cache.get(query).hash == query_hash(query)
+
+
+def test_get_invalid_query():
+    assert QueryCache().get("{ me { username }") is None
+
+
+@override_settings(GRAPHQL_QUERY_CACHE_SIZE=1)
+def test_get_evicts_least_recently_used():
+    cache = QueryCache()
+    first = cache.get("{ me { username } }")
+    cache.get("{ config { planAutoActivate } }")
+    assert cache.get("{ me { username } }") is not first
+
+
+def test_cost_checks():
+    cached_query = QueryCache().get("{ me { username } }")
+    assert not cached_query.is_cost_allowed("schema", {"first": 10})
+    cached_query.allow_cost("schema", {"first": 10})
+    assert cached_query.is_cost_allowed("schema", {"first": 10})
+    assert not cached_query.is_cost_allowed("schema", {"first": 1000})
+    assert not cached_query.is_cost_allowed("other_schema", {"first": 10})
+
+
+def test_resolve_query(mock_redis):
+    query = "{ me { username } }"
+    extensions = {"persistedQuery": {"version": 1, "sha256Hash": query_hash(query)}}
+
+    with pytest.raises(PersistedQueryError) as exc:
+        QueryCache().resolve_query({"extensions": extensions})
+    assert exc.value.code == "PERSISTED_QUERY_NOT_FOUND"
+
+    data = {"query": query, "extensions": extensions}
+    assert QueryCache().resolve_query(data) == data
+    assert QueryCache().resolve_query({"extensions": extensions})["query"] == query
+
+
+def test_resolve_query_unsupported_version(mock_redis):
+    extensions = {"persistedQuery": {"version": 2, "sha256Hash": "abc"}}
+    with pytest.raises(PersistedQueryError) as exc:
+        QueryCache().resolve_query({"extensions": extensions})
+    assert exc.value.status == 400
+
+
+def test_resolve_query_without_persisted_query(mock_redis):
+    data = {"query": "{ me { username } }"}
+    assert QueryCache().resolve_query(data) is data
@@ -72,6 +72,7 @@ class TestMeasurement(TransactionTestCase, GraphQLTestHelper):
             start_date=datetime(2022, 1, 1, 0, 0, 0, tzinfo=timezone.utc),
             end_date=datetime(2022, 1, 3, 0, 0, 0, tzinfo=timezone.utc),
             branch=None,
+            allow_cached_fallback=True,
         )
 
     @override_settings(TIMESERIES_ENABLED=False)
@@ -100,6 +101,7 @@ class TestMeasurement(TransactionTestCase, GraphQLTestHelper):
             start_date=datetime(2022, 1, 1, 0, 0, 0, tzinfo=timezone.utc),
             end_date=datetime(2022, 1, 3, 0, 0, 0, tzinfo=timezone.utc),
             branch=None,
+            allow_cached_fallback=True,
         )
 
     @override_settings(TIMESERIES_ENABLED=True)
@@ -113,4 +115,5 @@ class TestMeasurement(TransactionTestCase, GraphQLTestHelper):
             start_date=datetime(2022, 1, 1, 0, 0, 0, tzinfo=timezone.utc),
             end_date=datetime(2022, 1, 3, 0, 0, 0, tzinfo=timezone.utc),
             branch="foo",
+            allow_cached_fallback=True,
         )
@@ -0,0 +1,116 @@
+import pytest
+from django.test import override_settings
+from graphql import parse
+
+from core.tests.factories import OwnerFactory, RepositoryFactory
+
+from ..response_cache import GraphQLResponseCache, query_repository
+
+
+@pytest.mark.parametrize(
+    "query, operation_name, variables, expected",
+    [
+        (
+            '{ owner(username: "codecov") { repository(name: "api") { name } } }',
+            None,
+            None,
+            ("codecov", "api"),
+        ),
+        (
+            "query Repo($owner: String!, $repo: String!) {"
+            " owner(username: $owner) { repository(name: $repo) { name } } }",
+            "Repo",
+            {"owner": "codecov", "repo": "api"},
+            ("codecov", "api"),
+        ),
+        ("{ me { username } }", None, None, None),
+        ('{ owner(username: "codecov") { username } }', None, None, None),
+        (
+            '{ owner(username: "codecov") { repository(name: "api") { name } } me { username } }',
+            None,
+            None,
+            None,
+        ),
+        (
+            "query Repo($owner: String!) {"
+            ' owner(username: $owner) { repository(name: "api") { name } } }',
+            None,
+            {},
+            None,
+        ),
+        (
+            'mutation { owner(username: "codecov") { repository(name: "api") { name } } }',
+            None,
+            None,
+            None,
+        ),
+    ],
+)
+def test_query_repository(query, operation_name, variables, expected):
+    assert query_repository(parse(query), operation_name, variables) == expected
+
+
+@override_settings(GRAPHQL_RESPONSE_CACHE_ENABLED=True)
+@pytest.mark.django_db
+def test_cache_key(mock_redis):
+    owner = OwnerFactory(service="github", username="codecov")
+    RepositoryFactory(author=owner, name="public", private=False)
+    RepositoryFactory(author=owner, name="private", private=True)
+    cache = GraphQLResponseCache()
+    data = {"variables": {"first": 10}}
+
+    assert cache.cache_key("gh", "hash", ("codecov", "private"), data) is None
+    assert cache.cache_key("gh", "hash", ("codecov", "missing"), data) is None
+
+    key = cache.cache_key("gh", "hash", ("codecov", "public"), data)
+    assert key is not None
+    assert cache.cache_key("gh", "hash", ("codecov", "public"), data) == key
+    assert (
+        cache.cache_key("gh", "hash", ("codecov", "public"), {"variables": {}}) != key
+    )
+    assert cache.cache_key("gh", "other", ("codecov", "public"), data) != key
+
+
+@override_settings(GRAPHQL_RESPONSE_CACHE_ENABLED=True)
+@pytest.mark.django_db
+def test_invalidate_changes_cache_key(mock_redis):
+    repo = RepositoryFactory(private=False)
+    cache = GraphQLResponseCache()
+    repository = (repo.author.username, repo.name)
+
+    key = cache.cache_key("gh", "hash", repository, {})
+    cache.invalidate(repo.repoid)
+    assert cache.cache_key("gh", "hash", repository, {}) != key
+
+
+@override_settings(GRAPHQL_RESPONSE_CACHE_ENABLED=True)
+def test_get_or_lock(mock_redis):
+    cache = GraphQLResponseCache()
+
+    assert cache.get_or_lock("key") == (None, True)
+    # another request waits for the first one to fill the cache
+    assert cache.get_or_lock("key") == (None, False)
+
+    cache.set("key", b'{"data": {}}')
+    assert cache.get_or_lock("key") == (b'{"data": {}}', False)
+
+
+@override_settings(GRAPHQL_RESPONSE_CACHE_ENABLED=True)
+def test_release(mock_redis):
+    cache = GraphQLResponseCache()
+
+    assert cache.get_or_lock("key") == (None, True)
+    cache.release("key")
+    assert cache.get_or_lock("key") == (None, True)
+
+
+@override_settings(
+    GRAPHQL_RESPONSE_CACHE_ENABLED=True, GRAPHQL_RESPONSE_CACHE_LOCK_WAIT=0.2
+)
+@pytest.mark.asyncio
+async def test_wait(mock_redis):
+    cache = GraphQLResponseCache()
+    assert await cache.wait("key") is None
+
+    mock_redis.set("key", b"content")
+    assert await cache.wait("key") == b"content"
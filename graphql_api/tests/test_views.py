@@ -1,15 +1,20 @@
 import json
+from datetime import date, datetime, timezone
+from decimal import Decimal
 from unittest.mock import patch
 
+import fakeredis
 from ariadne import ObjectType, make_executable_schema
 from ariadne.validation import cost_directive
+from django.http import JsonResponse
 from django.test import RequestFactory, TestCase, override_settings
 from django.urls import ResolverMatch
 from prometheus_client import REGISTRY
 
 from codecov.commands.exceptions import Unauthorized
 
-from ..views import AsyncGraphqlView, QueryMetricsExtension
+from ..persisted_queries import query_cache, query_hash
+from ..views import AsyncGraphqlView, QueryMetricsExtension, serialize_result
 from .helper import GraphQLTestHelper
 
 
@@ -40,10 +45,10 @@ def generate_cost_test_schema():
 
 
 class ArianeViewTestCase(GraphQLTestHelper, TestCase):
-    async def do_query(self, schema, query="{ failing }"):
+    async def do_query(self, schema, query="{ failing }", body=None):
         view = AsyncGraphqlView.as_view(schema=schema)
         request = RequestFactory().post(
-            "/graphql/gh", {"query": query}, content_type="application/json"
+            "/graphql/gh", body or {"query": query}, content_type="application/json"
         )
         match = ResolverMatch(func=lambda: None, args=(), kwargs={"service": "github"})
 
@@ -54,46 +59,35 @@ class ArianeViewTestCase(GraphQLTestHelper, TestCase):
         return json.loads(res.content)
 
     @override_settings(DEBUG=True)
-    @patch("logging.Logger.info")
-    async def test_when_debug_is_true(self, patched_log):
-        before = REGISTRY.get_sample_value(
-            "api_gql_counts_hits_total",
-            labels={"operation_type": "unknown_type", "operation_name": "unknown_name"},
+    async def test_when_debug_is_true(self):
+        labels = {"operation_type": "query", "operation_name": "failing"}
+        before = (
+            REGISTRY.get_sample_value("api_gql_counts_hits_total", labels=labels) or 0
         )
-        errors_before = REGISTRY.get_sample_value(
-            "api_gql_counts_errors_total",
-            labels={"operation_type": "unknown_type", "operation_name": "unknown_name"},
+        errors_before = (
+            REGISTRY.get_sample_value("api_gql_counts_errors_total", labels=labels) or 0
         )
-        timer_before = REGISTRY.get_sample_value(
-            "api_gql_timers_full_runtime_seconds_count",
-            labels={"operation_type": "unknown_type", "operation_name": "unknown_name"},
+        timer_before = (
+            REGISTRY.get_sample_value(
+                "api_gql_timers_full_runtime_seconds_count", labels=labels
+            )
+            or 0
         )
         schema = generate_schema_that_raise_with(Exception("hello"))
         data = await self.do_query(schema)
         assert data["errors"] is not None
         assert data["errors"][0]["message"] == "hello"
         assert data["errors"][0]["extensions"] is not None
-        after = REGISTRY.get_sample_value(
-            "api_gql_counts_hits_total",
-            labels={"operation_type": "unknown_type", "operation_name": "unknown_name"},
-        )
+        after = REGISTRY.get_sample_value("api_gql_counts_hits_total", labels=labels)
         errors_after = REGISTRY.get_sample_value(
-            "api_gql_counts_errors_total",
-            labels={"operation_type": "unknown_type", "operation_name": "unknown_name"},
+            "api_gql_counts_errors_total", labels=labels
         )
         timer_after = REGISTRY.get_sample_value(
-            "api_gql_timers_full_runtime_seconds_count",
-            labels={"operation_type": "unknown_type", "operation_name": "unknown_name"},
+            "api_gql_timers_full_runtime_seconds_count", labels=labels
         )
         assert after - before == 1
         assert errors_after - errors_before == 1
         assert timer_after - timer_before == 1
-        patched_log.assert_called_with(
-            "Could not match gql query format for logging",
-            extra=dict(
-                query_slice="{ failing }",
-            ),
-        )
 
     @override_settings(DEBUG=False)
     async def test_when_debug_is_false_and_random_exception(self):
@@ -200,3 +194,107 @@ class ArianeViewTestCase(GraphQLTestHelper, TestCase):
         )
         assert extension.operation_type == "unknown_type"
         assert extension.operation_name == "unknown_name"
+
+    @override_settings(DEBUG=False, GRAPHQL_QUERY_COST_THRESHOLD=1000)
+    @patch("logging.Logger.error")
+    async def test_costly_query_is_not_cached_as_allowed(self, mock_error_logger):
+        schema = generate_cost_test_schema()
+        await self.do_query(schema, "{ stuff }")
+        data = await self.do_query(schema, "{ stuff }")
+        assert data["errors"][0]["extensions"]["cost"]["requestedQueryCost"] == 2000
+
+    async def test_persisted_query(self):
+        schema = generate_schema_that_raise_with(Unauthorized())
+        query = "query PersistedFailing { failing }"
+        extensions = {"persistedQuery": {"version": 1, "sha256Hash": query_hash(query)}}
+
+        with patch.object(query_cache, "_redis", fakeredis.FakeStrictRedis()):
+            data = await self.do_query(
+                schema, body={"query": query, "extensions": extensions}
+            )
+            assert data["errors"][0]["type"] == "Unauthorized"
+
+            # the query itself can now be omitted, also in other processes
+            query_cache._texts.clear()
+            data = await self.do_query(schema, body={"extensions": extensions})
+            assert data["errors"][0]["type"] == "Unauthorized"
+
+    async def test_persisted_query_not_found(self):
+        schema = generate_schema_that_raise_with(Unauthorized())
+        extensions = {"persistedQuery": {"version": 1, "sha256Hash": "abc"}}
+
+        with patch.object(query_cache, "_redis", fakeredis.FakeStrictRedis()):
+            data = await self.do_query(schema, body={"extensions": extensions})
+
+        assert data["errors"] == [
+            {
+                "message": "PersistedQueryNotFound",
+                "extensions": {"code": "PERSISTED_QUERY_NOT_FOUND"},
+            }
+        ]
+
+    async def test_persisted_query_hash_mismatch(self):
+        schema = generate_schema_that_raise_with(Unauthorized())
+        extensions = {"persistedQuery": {"version": 1, "sha256Hash": "abc"}}
+
+        with patch.object(query_cache, "_redis", fakeredis.FakeStrictRedis()):
+            data = await self.do_query(
+                schema, body={"query": "{ failing }", "extensions": extensions}
+            )
+
+        assert data["errors"][0]["extensions"]["code"] == (
+            "PERSISTED_QUERY_HASH_MISMATCH"
+        )
+
+    async def test_invalid_body(self):
+        view = AsyncGraphqlView.as_view(schema=generate_cost_test_schema())
+        request = RequestFactory().post(
+            "/graphql/gh", "{not json", content_type="application/json"
+        )
+        request.user = None
+        res = await view(request, service="gh")
+        assert res.status_code == 400
+        assert json.loads(res.content) == {
+            "errors": [{"message": "Request body is not a valid JSON"}]
+        }
+
+    async def test_unsupported_content_type(self):
+        view = AsyncGraphqlView.as_view(schema=generate_cost_test_schema())
+        request = RequestFactory().post(
+            "/graphql/gh", '{"query": "{ stuff }"}', content_type="text/plain"
+        )
+        request.user = None
+        res = await view(request, service="gh")
+        assert res.status_code == 400
+        error = json.loads(res.content)["errors"][0]
+        assert error["message"].startswith("Posted content must be of type")
+
+    @override_settings(DEBUG=False, GRAPHQL_QUERY_COST_THRESHOLD=1000)
+    @patch("logging.Logger.error")
+    async def test_multipart_body(self, mock_error_logger):
+        view = AsyncGraphqlView.as_view(schema=generate_cost_test_schema())
+        request = RequestFactory().post(
+            "/graphql/gh",
+            {"operations": json.dumps({"query": "{ stuff }"}), "map": "{}"},
+        )
+        request.resolver_match = ResolverMatch(
+            func=lambda: None, args=(), kwargs={"service": "github"}
+        )
+        request.user = None
+        request.current_owner = None
+        res = await view(request, service="gh")
+        assert res.status_code == 400
+        assert b"Your query is too costly." in res.content
+
+
+def test_serialize_result_matches_json_response():
+    result = {
+        "data": {
+            "coverage": Decimal("85.50"),
+            "updatedAt": datetime(2024, 1, 2, 3, 4, 5, 123456, tzinfo=timezone.utc),
+            "day": date(2024, 1, 2),
+            "name": "codecov",
+            "hits": [1, 2.5, None, True],
+        }
+    }
+    assert serialize_result(result) == JsonResponse(result).content.replace(b" ", b"")
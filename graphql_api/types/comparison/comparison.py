@@ -5,11 +5,13 @@ from ariadne import ObjectType, UnionType, convert_kwargs_to_snake_case
 from graphql.type.definition import GraphQLResolveInfo
 
 import services.components as components_service
+from codecov.commands.exceptions import ValidationError
 from codecov.db import sync_to_async
 from compare.commands.compare.compare import CompareCommands
 from compare.models import ComponentComparison, FlagComparison
 from graphql_api.actions.flags import get_flag_comparisons
 from graphql_api.dataloader.commit import CommitLoader
+from graphql_api.dataloader.report import load_comparison_reports
 from graphql_api.types.errors import (
     MissingBaseCommit,
     MissingBaseReport,
@@ -51,8 +53,12 @@ def resolve_impacted_files_deprecated(
 @convert_kwargs_to_snake_case
 @sync_to_async
 def resolve_impacted_files(
-    comparison_report: ComparisonReport, info: GraphQLResolveInfo, filters=None
-) -> List[ImpactedFile]:
+    comparison_report: ComparisonReport,
+    info: GraphQLResolveInfo,
+    filters=None,
+    first: Optional[int] = None,
+    after: Optional[str] = None,
+) -> dict:
     command: CompareCommands = info.context["executor"].get_command("compare")
     comparison: Comparison = info.context.get("comparison", None)
 
@@ -61,8 +67,32 @@ def resolve_impacted_files(
         if flags and set(flags).isdisjoint(set(comparison.head_report.flags)):
             return UnknownFlags()
 
+    if first is not None and first < 0:
+        raise ValidationError("first must be a positive integer")
+
+    impacted_files = command.fetch_impacted_files(
+        comparison_report, comparison, filters
+    )
+    start = 0
+    if after is not None:
+        try:
+            start = impacted_files.offset_after(after)
+        except ValueError:
+            raise ValidationError("Invalid cursor")
+    end = len(impacted_files) if first is None else start + first
+    results = impacted_files[start:end]
+
     return {
-        "results": command.fetch_impacted_files(comparison_report, comparison, filters)
+        "results": results,
+        "total_count": len(impacted_files),
+        "page_info": {
+            "has_next_page": end < len(impacted_files),
+            "has_previous_page": start > 0,
+            "start_cursor": impacted_files.cursor(start) if results else None,
+            "end_cursor": (
+                impacted_files.cursor(start + len(results) - 1) if results else None
+            ),
+        },
     }
 
 
@@ -71,7 +101,7 @@ def resolve_impacted_files(
 def resolve_impacted_files_count(
     comparison: ComparisonReport, info: GraphQLResolveInfo
 ):
-    return len(comparison.impacted_files)
+    return len(comparison.index)
 
 
 @comparison_bindable.field("directChangedFilesCount")
@@ -79,7 +109,7 @@ def resolve_impacted_files_count(
 def resolve_direct_changed_files_count(
     comparison: ComparisonReport, info: GraphQLResolveInfo
 ):
-    return len(comparison.impacted_files_with_direct_changes)
+    return len(comparison.index.direct)
 
 
 @comparison_bindable.field("indirectChangedFilesCount")
@@ -87,7 +117,7 @@ def resolve_direct_changed_files_count(
 def resolve_indirect_changed_files_count(
     comparison: ComparisonReport, info: GraphQLResolveInfo
 ):
-    return len(comparison.impacted_files_with_unintended_changes)
+    return len(comparison.index.unintended)
 
 
 @comparison_bindable.field("impactedFile")
@@ -251,8 +281,7 @@ def resolve_flag_comparisons_count(
 
 
 @comparison_bindable.field("hasDifferentNumberOfHeadAndBaseReports")
-@sync_to_async
-def resolve_has_different_number_of_head_and_base_reports(
+async def resolve_has_different_number_of_head_and_base_reports(
     comparison: ComparisonReport,
     info: GraphQLResolveInfo,
     **kwargs,  # type: ignore
@@ -261,6 +290,12 @@ def resolve_has_different_number_of_head_and_base_reports(
     if "comparison" not in info.context:
         return False
     comparison: Comparison = info.context["comparison"]
+    await load_comparison_reports(info, comparison)
+    return await _has_different_number_of_head_and_base_sessions(comparison)
+
+
+@sync_to_async
+def _has_different_number_of_head_and_base_sessions(comparison: Comparison) -> bool:
     try:
         comparison.validate()
     except MissingComparisonReport:
@@ -6,6 +6,7 @@ from shared.reports.types import ReportTotals
 from shared.torngit.exceptions import TorngitClientError
 
 from codecov.db import sync_to_async
+from graphql_api.dataloader.report import load_comparison_reports
 from graphql_api.types.errors import ProviderError, UnknownPath
 from graphql_api.types.errors.errors import UnknownFlags
 from graphql_api.types.segment_comparison.segment_comparison import SegmentComparisons
@@ -64,9 +65,8 @@ def resolve_hashed_path(impacted_file: ImpactedFile, info) -> str:
 
 
 @impacted_file_bindable.field("segments")
-@sync_to_async
 @convert_kwargs_to_snake_case
-def resolve_segments(
+async def resolve_segments(
     impacted_file: ImpactedFile, info, filters=None
 ) -> Union[UnknownPath, ProviderError, SegmentComparisons]:
     if filters is None:
@@ -75,6 +75,14 @@ def resolve_segments(
         return SegmentComparisons(results=[])
 
     comparison: Comparison = info.context["comparison"]
+    await load_comparison_reports(info, comparison)
+    return await _segments(impacted_file, comparison, filters)
+
+
+@sync_to_async
+def _segments(
+    impacted_file: ImpactedFile, comparison: Comparison, filters: dict
+) -> Union[UnknownPath, ProviderError, SegmentComparisons]:
     try:
         comparison.validate()
     except MissingComparisonReport:
@@ -124,6 +124,7 @@ def resolve_commits(pull: Pull, info, **kwargs):
         queryset,
         ordering=("timestamp",),
         ordering_direction=OrderingDirection.DESC,
+        count_scope=f"commits/{pull.repository_id}",
         **kwargs,
     )
 
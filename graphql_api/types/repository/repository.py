@@ -123,6 +123,7 @@ async def resolve_pulls(
         queryset,
         ordering=("pullid",),
         ordering_direction=ordering_direction,
+        count_scope=f"pulls/{repository.repoid}",
         **kwargs,
     )
 
@@ -137,6 +138,7 @@ async def resolve_commits(
         queryset,
         ordering=("timestamp",),
         ordering_direction=OrderingDirection.DESC,
+        count_scope=f"commits/{repository.repoid}",
         **kwargs,
     )
 
@@ -160,6 +162,7 @@ async def resolve_branches(
         queryset,
         ordering=("updatestamp",),
         ordering_direction=OrderingDirection.DESC,
+        count_scope=f"branches/{repository.repoid}",
         **kwargs,
     )
 
@@ -381,6 +384,7 @@ def resolve_measurements(
             start_date=after,
             end_date=before,
             branch=branch,
+            allow_cached_fallback=True,
         ),
         interval,
         start_date=after,
@@ -1,4 +1,3 @@
-import json
 import logging
 import os
 import socket
@@ -6,14 +5,22 @@ import time
 from asyncio import iscoroutine
 from typing import Any, Collection, Optional
 
+import orjson
 import regex
-from ariadne import format_error
+from ariadne import format_error, graphql
+from ariadne.exceptions import HttpBadRequestError
 from ariadne.types import Extension
 from ariadne.validation import cost_validator
 from ariadne_django.views import GraphQLAsyncView
 from django.conf import settings
-from django.http import HttpResponseBadRequest, HttpResponseNotAllowed, JsonResponse
-from graphql import DocumentNode
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import (
+    HttpResponse,
+    HttpResponseBadRequest,
+    HttpResponseNotAllowed,
+    JsonResponse,
+)
+from graphql import DocumentNode, parse
 from sentry_sdk import capture_exception
 from sentry_sdk import metrics as sentry_metrics
 from shared.metrics import Counter, Histogram
@@ -23,6 +30,8 @@ from codecov.commands.executor import get_executor_from_request
 from codecov.db import sync_to_async
 from services import ServiceException
 
+from .persisted_queries import PersistedQueryError, query_cache
+from .response_cache import graphql_response_cache, query_repository
 from .schema import schema
 
 log = logging.getLogger(__name__)
@@ -102,7 +111,12 @@ class QueryMetricsExtension(Extension):
         """
         Extension hook executed at request's start.
         """
-        self.set_type_and_name(query=context["clean_query"])
+        if context.get("operation_type") is not None:
+            # derived from the parsed query, see `AsyncGraphqlView.execute_query`
+            self.operation_type = context["operation_type"]
+            self.operation_name = context["operation_name"]
+        else:
+            self.set_type_and_name(query=context["clean_query"])
         self.start_timestamp = time.perf_counter()
         GQL_HIT_COUNTER.labels(
             operation_type=self.operation_type, operation_name=self.operation_name
@@ -127,6 +141,22 @@ class QueryMetricsExtension(Extension):
         ).inc(len(errors))
 
 
+_json_encoder = DjangoJSONEncoder()
+
+
+def serialize_result(result: dict) -> bytes:
+    """
+    Serializes a GraphQL result like `JsonResponse` would, but with orjson.
+    Dates, times and the types orjson doesn't know about (e.g. `Decimal`) are
+    handed to Django's encoder so that they are formatted the same way.
+    """
+    return orjson.dumps(
+        result,
+        default=_json_encoder.default,
+        option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+    )
+
+
 class RequestFinalizer:
     """
     A context manager class used as a teardown step after the GraphQL request is fully handled.
@@ -176,6 +206,11 @@ class AsyncGraphqlView(GraphQLAsyncView):
         document: DocumentNode,
         data: dict,
     ) -> Optional[Collection]:
+        cached_query = (context_value or {}).get("cached_query")
+        if cached_query is not None and cached_query.is_cost_allowed(
+            id(self.schema), data.get("variables")
+        ):
+            return []
         return [
             cost_validator(
                 maximum_cost=settings.GRAPHQL_QUERY_COST_THRESHOLD,
@@ -186,6 +221,12 @@ class AsyncGraphqlView(GraphQLAsyncView):
 
     validation_rules = get_validation_rules  # type: ignore
 
+    def query_parser(self, context_value: dict, data: dict) -> DocumentNode:
+        cached_query = context_value.get("cached_query")
+        if cached_query is not None:
+            return cached_query.document
+        return parse(data["query"])
+
     def get_clean_query(self, request_body):
         # clean up graphql query to remove new lines and extra spaces
         if "query" in request_body and isinstance(request_body["query"], str):
@@ -201,16 +242,20 @@ class AsyncGraphqlView(GraphQLAsyncView):
 
     async def post(self, request, *args, **kwargs):
         await self._get_user(request)
-        # get request body information for logging
-        req_body = json.loads(request.body.decode("utf-8")) if request.body else {}
+        # the body is parsed once and shared with `context_value` through the request
+        try:
+            request.graphql_data = self.get_request_data(request)
+        except HttpBadRequestError as e:
+            return self.error_response(e.message, status=400)
 
         # get request path information for logging
         req_path = request.get_full_path()
 
         # clean up graphql query for logging, remove new lines and extra spaces
+        req_body = request.graphql_data
         cleaned_query = self.get_clean_query(req_body)
         if cleaned_query:
-            req_body["query"] = cleaned_query
+            req_body = {**req_body, "query": cleaned_query}
 
         # put everything together for log
         log_data = {
@@ -224,37 +269,166 @@ class AsyncGraphqlView(GraphQLAsyncView):
         sentry_metrics.incr("graphql.info.request_made", tags={"path": req_path})
 
         with RequestFinalizer(request):
-            response = await super().post(request, *args, **kwargs)
-
-            content = response.content.decode("utf-8")
-            data = json.loads(content)
-
-            if "errors" in data:
-                sentry_metrics.incr("graphql.error.all", tags={"path": req_path})
-                try:
-                    if data["errors"][0]["extensions"]["cost"]:
-                        costs = data["errors"][0]["extensions"]["cost"]
-                        log.error(
-                            "Query Cost Exceeded",
-                            extra=dict(
-                                requested_cost=costs.get("requestedQueryCost"),
-                                maximum_cost=costs.get("maximumAvailable"),
-                                request_body=req_body,
-                            ),
-                        )
-                        sentry_metrics.incr(
-                            "graphql.error.query_cost_exceeded",
-                            tags={"path": req_path},
-                        )
-                        return HttpResponseBadRequest(
-                            JsonResponse("Your query is too costly.")
-                        )
-                except Exception:
-                    pass
-            return response
+            try:
+                data = query_cache.resolve_query(request.graphql_data)
+            except PersistedQueryError as e:
+                return self.error_response(
+                    e.message, status=e.status, extensions={"code": e.code}
+                )
+
+            cache_key, fill_cache = None, False
+            if graphql_response_cache.enabled and self.is_anonymous(request):
+                cache_key = await self.get_response_cache_key(request, data)
+            if cache_key is not None:
+                content, fill_cache = await sync_to_async(
+                    graphql_response_cache.get_or_lock
+                )(cache_key)
+                if content is None and not fill_cache:
+                    content = await graphql_response_cache.wait(cache_key)
+                if content is not None:
+                    return HttpResponse(content, content_type="application/json")
+
+            try:
+                response, cacheable = await self.execute_and_respond(
+                    request, data, req_body
+                )
+                if fill_cache and cacheable:
+                    # processing by the worker doesn't invalidate responses, which
+                    # are then only as fresh as `GRAPHQL_RESPONSE_CACHE_TTL` allows
+                    await sync_to_async(graphql_response_cache.set)(
+                        cache_key, response.content
+                    )
+                    fill_cache = False
+                return response
+            finally:
+                if fill_cache:
+                    await sync_to_async(graphql_response_cache.release)(cache_key)
+
+    async def execute_and_respond(
+        self, request, data: dict, req_body: dict
+    ) -> tuple[HttpResponse, bool]:
+        """
+        Executes the query, returning the response and whether it can be cached.
+        """
+        req_path = request.get_full_path()
+        success, result = await self.execute_query(request, data)
+
+        errors = result.get("errors")
+        if errors:
+            sentry_metrics.incr("graphql.error.all", tags={"path": req_path})
+            costs = (errors[0].get("extensions") or {}).get("cost")
+            if costs:
+                log.error(
+                    "Query Cost Exceeded",
+                    extra=dict(
+                        requested_cost=costs.get("requestedQueryCost"),
+                        maximum_cost=costs.get("maximumAvailable"),
+                        request_body=req_body,
+                    ),
+                )
+                sentry_metrics.incr(
+                    "graphql.error.query_cost_exceeded",
+                    tags={"path": req_path},
+                )
+                return (
+                    HttpResponseBadRequest(JsonResponse("Your query is too costly.")),
+                    False,
+                )
+
+        response = HttpResponse(
+            serialize_result(result),
+            status=200 if success else 400,
+            content_type="application/json",
+        )
+        return response, success and not errors
+
+    def is_anonymous(self, request) -> bool:
+        return (not request.user or request.user.is_anonymous) and getattr(
+            request, "current_owner", None
+        ) is None
+
+    async def get_response_cache_key(self, request, data: dict) -> Optional[str]:
+        query = data.get("query")
+        cached_query = query_cache.get(query) if isinstance(query, str) else None
+        if cached_query is None:
+            return None
+        repository = query_repository(
+            cached_query.document, data.get("operationName"), data.get("variables")
+        )
+        if repository is None:
+            return None
+        return await sync_to_async(graphql_response_cache.cache_key)(
+            request.resolver_match.kwargs["service"],
+            cached_query.hash,
+            repository,
+            data,
+        )
+
+    def get_request_data(self, request) -> dict:
+        """
+        Parses the request like `extract_data_from_request` does, only JSON
+        bodies are parsed with orjson.  Other content types are left to the
+        parent, which handles `multipart/form-data` and rejects the rest.
+        """
+        if request.content_type == "application/json":
+            try:
+                data = orjson.loads(request.body)
+            except orjson.JSONDecodeError:
+                raise HttpBadRequestError("Request body is not a valid JSON")
+        else:
+            data = self.extract_data_from_request(request)
+        if not isinstance(data, dict):
+            raise HttpBadRequestError("Request body must be a JSON object")
+        return data
+
+    def error_response(
+        self, message: str, status: int, extensions: Optional[dict] = None
+    ) -> HttpResponse:
+        error = {"message": message}
+        if extensions:
+            error["extensions"] = extensions
+        return HttpResponse(
+            serialize_result({"errors": [error]}),
+            status=status,
+            content_type="application/json",
+        )
+
+    async def execute_query(self, request, data: dict):
+        context_value = self.context_value(request)
+
+        query = data.get("query")
+        cached_query = query_cache.get(query) if isinstance(query, str) else None
+        if cached_query is not None:
+            operation_type, operation_name = cached_query.operation_type_and_name(
+                data.get("operationName")
+            )
+            context_value.update(
+                cached_query=cached_query,
+                operation_type=operation_type,
+                operation_name=operation_name,
+            )
+
+        success, result = await graphql(
+            self.schema,
+            data,
+            context_value=context_value,
+            query_parser=self.query_parser,
+            validation_rules=self.validation_rules,
+            debug=settings.DEBUG,
+            error_formatter=self.error_formatter,
+            extensions=self.extensions,
+        )
+
+        if cached_query is not None and not any(
+            (error.get("extensions") or {}).get("cost")
+            for error in result.get("errors") or []
+        ):
+            cached_query.allow_cost(id(self.schema), data.get("variables"))
+
+        return success, result
 
     def context_value(self, request, *_):
-        request_body = json.loads(request.body.decode("utf-8")) if request.body else {}
+        request_body = getattr(request, "graphql_data", None) or {}
         return {
             "request": request,
             "service": request.resolver_match.kwargs["service"],
@@ -1,9 +1,23 @@
+from datetime import datetime, timezone
+
 from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, set_response_etag
+from django.utils.http import http_date
 from rest_framework import status
 from rest_framework.response import Response
 
 
+def as_utc(value: datetime) -> datetime:
+    # commit timestamps are stored without timezone, in UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
 class GraphBadgeAPIMixin(object):
+    # set by `get_object` when the time the rendered data last changed is known
+    last_modified = None
+
     def get(self, request, *args, **kwargs):
         ext = self.kwargs.get("ext")
         if ext not in self.extensions:
@@ -30,5 +44,30 @@ class GraphBadgeAPIMixin(object):
             response["Access-Control-Expose-Headers"] = (
                 "Content-Type, Cache-Control, Expires, Etag, Last-Modified"
             )
-            response["Cache-Control"] = "no-cache, no-store, must-revalidate, max-age=0"
-        return response
+            if self.request.query_params.get("token"):
+                # responses for private repos must not be kept by shared caches
+                response["Cache-Control"] = (
+                    "no-cache, no-store, must-revalidate, max-age=0"
+                )
+            else:
+                # caches may store the response as long as they revalidate it
+                # (cheaply, through the ETag / Last-Modified headers) on every use
+                response["Cache-Control"] = "no-cache, must-revalidate, max-age=0"
+        return self.conditional_response(request, response)
+
+    def conditional_response(self, request, response):
+        """
+        Adds ETag / Last-Modified headers to the response and turns it into a
+        304 Not Modified if the client's cached copy is still current.
+        """
+        last_modified = None
+        if self.last_modified is not None:
+            last_modified = int(as_utc(self.last_modified).timestamp())
+            response["Last-Modified"] = http_date(last_modified)
+        set_response_etag(response)
+        return get_conditional_response(
+            request,
+            etag=response["ETag"],
+            last_modified=last_modified,
+            response=response,
+        )
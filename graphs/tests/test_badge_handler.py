@@ -1,12 +1,18 @@
+from datetime import timedelta
 from unittest.mock import PropertyMock, patch
 
+import fakeredis
+from django.test import override_settings
 from rest_framework import status
 from rest_framework.test import APITestCase
 from shared.reports.resources import Report, ReportFile, Session, SessionType
 from shared.reports.types import ReportLine, ReportTotals
 
 from codecov_auth.tests.factories import OwnerFactory
+from core.models import Commit, Repository
 from core.tests.factories import BranchFactory, CommitFactory, RepositoryFactory
+from graphs.views import BadgeHandler
+from services.badge_cache import BadgeCoverageCache
 
 
 def sample_report():
@@ -1352,3 +1358,134 @@ class TestBadgeHandler(APITestCase):
         expected_badge = [line.strip() for line in expected_badge.split("\n")]
         assert expected_badge == badge
         assert response.status_code == status.HTTP_200_OK
+
+    @override_settings(BADGE_CACHE_ENABLED=True)
+    @patch("core.models.Commit.full_report", new_callable=PropertyMock)
+    def test_flags_coverage_cached(self, full_report_mock):
+        gh_owner = OwnerFactory(service="github")
+        repo = RepositoryFactory(
+            author=gh_owner, active=True, private=False, name="repo1"
+        )
+        commit = CommitFactory(repository=repo, author=gh_owner)
+        full_report_mock.return_value = sample_report()
+        kwargs = {
+            "service": "gh",
+            "owner_username": gh_owner.username,
+            "repo_name": "repo1",
+            "ext": "txt",
+        }
+
+        with (
+            patch("graphs.views.badge_coverage_cache", BadgeCoverageCache()),
+            patch(
+                "services.redis_cache.get_redis_connection",
+                return_value=fakeredis.FakeStrictRedis(),
+            ),
+        ):
+            response = self._get(kwargs=kwargs, data={"flag": "unittests"})
+            assert response.content.decode("utf-8") == "100"
+            response = self._get(kwargs=kwargs, data={"flag": "integration"})
+            assert response.content.decode("utf-8") == "None"
+            # the full report is only built once for all the flags
+            full_report_mock.assert_called_once()
+
+            # the worker bumps the updatestamp of commits whose report changed
+            Commit.objects.filter(pk=commit.pk).update(
+                updatestamp=commit.updatestamp + timedelta(minutes=1)
+            )
+            response = self._get(kwargs=kwargs, data={"flag": "unittests"})
+            assert response.content.decode("utf-8") == "100"
+            assert full_report_mock.call_count == 2
+
+    @patch("core.models.Commit.full_report", new_callable=PropertyMock)
+    def test_flags_coverage_single_flag(self, full_report_mock):
+        full_report_mock.return_value = sample_report()
+        commit = CommitFactory()
+
+        with patch(
+            "shared.helpers.flag.Flag.totals", new_callable=PropertyMock
+        ) as totals_mock:
+            totals_mock.return_value = ReportTotals(coverage="100")
+            assert BadgeHandler().flags_coverage(commit, "unittests") == {
+                "unittests": "100"
+            }
+            assert BadgeHandler().flags_coverage(commit, "unknown") == {}
+            # only the totals of the requested flag are computed
+            totals_mock.assert_called_once()
+
+    def test_private_badge_not_stored(self):
+        gh_owner = OwnerFactory(service="github")
+        RepositoryFactory(
+            author=gh_owner,
+            active=True,
+            private=True,
+            name="repo1",
+            image_token="12345678",
+        )
+        kwargs = {
+            "service": "gh",
+            "owner_username": gh_owner.username,
+            "repo_name": "repo1",
+            "ext": "svg",
+        }
+
+        response = self._get(kwargs=kwargs, data={"token": "12345678"})
+        assert (
+            response["Cache-Control"]
+            == "no-cache, no-store, must-revalidate, max-age=0"
+        )
+
+    def test_badge_not_modified(self):
+        gh_owner = OwnerFactory(service="github")
+        repo = RepositoryFactory(
+            author=gh_owner, active=True, private=False, name="repo1"
+        )
+        CommitFactory(repository=repo, author=gh_owner)
+        kwargs = {
+            "service": "gh",
+            "owner_username": gh_owner.username,
+            "repo_name": "repo1",
+            "ext": "svg",
+        }
+
+        response = self._get(kwargs=kwargs)
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Cache-Control"] == "no-cache, must-revalidate, max-age=0"
+        etag = response["ETag"]
+        assert response["Last-Modified"]
+
+        response = self.client.get(
+            f"/gh/{gh_owner.username}/repo1/graphs/badge.svg",
+            HTTP_IF_NONE_MATCH=etag,
+        )
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.content == b""
+        assert response["ETag"] == etag
+
+        response = self.client.get(
+            f"/gh/{gh_owner.username}/repo1/graphs/badge.svg",
+            HTTP_IF_NONE_MATCH='"outdated"',
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_badge_modified_by_coverage_range(self):
+        gh_owner = OwnerFactory(service="github")
+        repo = RepositoryFactory(
+            author=gh_owner, active=True, private=False, name="repo1"
+        )
+        commit = CommitFactory(repository=repo, author=gh_owner)
+        url = f"/gh/{gh_owner.username}/repo1/graphs/badge.svg"
+
+        response = self.client.get(url)
+        last_modified = response["Last-Modified"]
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+        # changing the coverage range of the repository changes the badge color
+        Repository.objects.filter(pk=repo.pk).update(
+            yaml={"coverage": {"range": [90, 100]}},
+            updatestamp=commit.updatestamp + timedelta(minutes=1),
+        )
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Last-Modified"] != last_modified
@@ -1,5 +1,7 @@
 from unittest.mock import patch
 
+import fakeredis
+from django.test import override_settings
 from rest_framework import status
 from rest_framework.test import APITestCase
 
@@ -11,6 +13,8 @@ from core.tests.factories import (
     PullFactory,
     RepositoryFactory,
 )
+from graphs.views import bucket_dimension
+from services.report import build_report_from_commit
 
 
 @patch("services.archive.ArchiveService.read_chunks", lambda obj, _: "")
@@ -690,3 +694,71 @@ class TestGraphHandler(APITestCase):
             response.data["detail"]
             == "Not found. Note: file for chunks not found in storage"
         )
+
+    @override_settings(GRAPH_CACHE_ENABLED=True)
+    def test_commit_graph_cached(self):
+        gh_owner = OwnerFactory(service="github")
+        repo = RepositoryFactory(
+            author=gh_owner, active=True, private=False, name="repo1"
+        )
+        commit = CommitWithReportFactory(repository=repo, author=gh_owner)
+        kwargs = {
+            "service": "gh",
+            "owner_username": gh_owner.username,
+            "repo_name": "repo1",
+            "ext": "svg",
+            "commit": commit.commitid,
+        }
+
+        with (
+            patch(
+                "services.redis_cache.get_redis_connection",
+                return_value=fakeredis.FakeStrictRedis(),
+            ),
+            patch(
+                "services.report.build_report_from_commit",
+                wraps=build_report_from_commit,
+            ) as build_report,
+        ):
+            response = self._get_commit("tree", kwargs=kwargs, data={"width": 310})
+            assert response.status_code == status.HTTP_200_OK
+            assert 'width="300"' in response.content.decode("utf-8")
+
+            # same size bucket
+            cached = self._get_commit("tree", kwargs=kwargs, data={"width": 290})
+            assert cached.content == response.content
+
+            # the flare is shared by the other graph types
+            response = self._get_commit("sunburst", kwargs=kwargs)
+            assert response.status_code == status.HTTP_200_OK
+
+            build_report.assert_called_once()
+
+    @override_settings(GRAPH_CACHE_ENABLED=False)
+    def test_commit_graph_exact_size_when_not_cached(self):
+        gh_owner = OwnerFactory(service="github")
+        repo = RepositoryFactory(
+            author=gh_owner, active=True, private=False, name="repo1"
+        )
+        commit = CommitWithReportFactory(repository=repo, author=gh_owner)
+        kwargs = {
+            "service": "gh",
+            "owner_username": gh_owner.username,
+            "repo_name": "repo1",
+            "ext": "svg",
+            "commit": commit.commitid,
+        }
+
+        response = self._get_commit(
+            "tree", kwargs=kwargs, data={"width": 310, "height": 2500}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert 'width="310" height="2500"' in response.content.decode("utf-8")
+
+
+def test_bucket_dimension():
+    assert bucket_dimension(300) == 300
+    assert bucket_dimension(312) == 300
+    assert bucket_dimension(330) == 350
+    assert bucket_dimension(0) == 50
+    assert bucket_dimension(100000) == 2000
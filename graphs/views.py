@@ -1,6 +1,5 @@
 import logging
 
-from django.core.exceptions import ObjectDoesNotExist
 from django.db import connection
 from django.http import Http404
 from rest_framework import exceptions
@@ -14,13 +13,25 @@ import services.report as report_service
 from api.shared.mixins import RepoPropertyMixin
 from core.models import Branch, Pull
 from graphs.settings import settings
+from services.badge_cache import badge_coverage_cache
+from services.graph_cache import graph_cache
 
 from .helpers.badge import format_coverage_precision, get_badge
 from .helpers.graphs import icicle, sunburst, tree
-from .mixins import GraphBadgeAPIMixin
+from .mixins import GraphBadgeAPIMixin, as_utc
 
 log = logging.getLogger(__name__)
 
+# when graphs are cached, their sizes are rounded to a multiple of this (and
+# capped) to keep the number of distinct renders of a given flare bounded
+GRAPH_DIMENSION_STEP = 50
+GRAPH_MAX_DIMENSION = 2000
+
+
+def bucket_dimension(value: int) -> int:
+    bucketed = round(value / GRAPH_DIMENSION_STEP) * GRAPH_DIMENSION_STEP
+    return min(max(bucketed, GRAPH_DIMENSION_STEP), GRAPH_MAX_DIMENSION)
+
 
 class IgnoreClientContentNegotiation(DefaultContentNegotiation):
     def select_parser(self, request, parsers):
@@ -89,7 +100,45 @@ class BadgeHandler(APIView, RepoPropertyMixin, GraphBadgeAPIMixin):
             )
             return None, coverage_range
 
+        if repo.yaml and repo.yaml.get("coverage", {}).get("range") is not None:
+            coverage_range = repo.yaml.get("coverage", {}).get("range")
+
         branch_name = self.kwargs.get("branch") or repo.branch
+        commit = self.get_head_commit(repo, branch_name)
+        if commit is None:
+            return None, coverage_range
+        # the colors of the badge also depend on the coverage range in the yaml
+        # of the repository, which bumps its updatestamp when changed
+        updatestamps = [
+            as_utc(updatestamp)
+            for updatestamp in (commit.updatestamp, repo.updatestamp)
+            if updatestamp is not None
+        ]
+        self.last_modified = max(updatestamps, default=None)
+
+        flag = self.request.query_params.get("flag")
+        if flag:
+            return self.flag_coverage(repo, commit, flag), coverage_range
+
+        coverage = commit.totals.get("c") if commit.totals is not None else None
+        return coverage, coverage_range
+
+    def flag_coverage(self, repo, commit, flag_name):
+        if not badge_coverage_cache.enabled:
+            # the coverage of the other flags couldn't be reused
+            return self.flags_coverage(commit, flag_name).get(flag_name)
+
+        flags = badge_coverage_cache.get(
+            repo.repoid, commit.commitid, commit.updatestamp
+        )
+        if flags is None:
+            flags = self.flags_coverage(commit)
+            badge_coverage_cache.set(
+                repo.repoid, commit.commitid, commit.updatestamp, flags
+            )
+        return flags.get(flag_name)
+
+    def get_head_commit(self, repo, branch_name):
         branch = Branch.objects.filter(
             name=branch_name, repository_id=repo.repoid
         ).first()
@@ -98,49 +147,30 @@ class BadgeHandler(APIView, RepoPropertyMixin, GraphBadgeAPIMixin):
             log.warning(
                 "Branch not found", extra=dict(branch_name=branch_name, repo=repo)
             )
-            return None, coverage_range
-        try:
-            commit = repo.commits.filter(commitid=branch.head).first()
-        except ObjectDoesNotExist:
-            # if commit does not exist return None coverage
-            log.warning("Commit not found", extra=dict(commit=branch.head))
-            return None, coverage_range
-
-        if repo.yaml and repo.yaml.get("coverage", {}).get("range") is not None:
-            coverage_range = repo.yaml.get("coverage", {}).get("range")
-
-        flag = self.request.query_params.get("flag")
-        if flag:
-            return self.flag_coverage(flag, commit), coverage_range
-
-        coverage = (
-            commit.totals.get("c")
-            if commit is not None and commit.totals is not None
-            else None
-        )
+            return None
 
-        return coverage, coverage_range
+        commit = repo.commits.filter(commitid=branch.head).first()
+        if commit is None:
+            log.warning("Commit not found", extra=dict(commit=branch.head))
+        return commit
 
-    def flag_coverage(self, flag_name, commit):
+    def flags_coverage(self, commit, flag_name=None):
         """
-        Looks into a commit's report sessions and returns the coverage for a perticular flag
+        Looks into a commit's report sessions and returns the coverage of each of its flags
 
         Parameters
-        flag_name (string): name of flag
         commit (obj): commit object containing report
+        flag_name (string): name of the only flag to compute the coverage of, if given
         """
         if commit.full_report is None:
-            log.warning(
-                "Commit's report not found", extra=dict(commit=commit, flag=flag_name)
-            )
-            return None
+            log.warning("Commit's report not found", extra=dict(commit=commit))
+            return {}
         flags = commit.full_report.flags
         if flags is None:
-            return None
-        flag = flags.get(flag_name)
-        if flag:
-            return flag.totals.coverage
-        return None
+            return {}
+        if flag_name is not None:
+            flags = {flag_name: flags[flag_name]} if flag_name in flags else {}
+        return {name: flag.totals.coverage for name, flag in flags.items()}
 
 
 class GraphHandler(APIView, RepoPropertyMixin, GraphBadgeAPIMixin):
@@ -149,63 +179,42 @@ class GraphHandler(APIView, RepoPropertyMixin, GraphBadgeAPIMixin):
     extensions = ["svg"]
     filename = "graph"
 
+    renderers = {"tree": tree, "icicle": icicle, "sunburst": sunburst}
+
     def get_object(self, request, *args, **kwargs):
-        options = dict()
         graph = self.kwargs.get("graph")
+        source, build_flare = self.get_flare_source()
+        if graph not in self.renderers:
+            return None
 
-        flare = self.get_flare()
+        # the tree graph uses the sunburst default size
+        defaults = settings["icicle" if graph == "icicle" else "sunburst"]["options"]
+        width = int(self.request.query_params.get("width", defaults["width"]))
+        height = int(self.request.query_params.get("height", defaults["height"]))
+        if graph_cache.enabled:
+            width, height = bucket_dimension(width), bucket_dimension(height)
 
-        if graph == "tree":
-            options["width"] = int(
-                self.request.query_params.get(
-                    "width", settings["sunburst"]["options"]["width"]
-                )
-            )
-            options["height"] = int(
-                self.request.query_params.get(
-                    "height", settings["sunburst"]["options"]["height"]
-                )
-            )
-            return tree(flare, None, None, **options)
-        elif graph == "icicle":
-            options["width"] = int(
-                self.request.query_params.get(
-                    "width", settings["icicle"]["options"]["width"]
-                )
-            )
-            options["height"] = int(
-                self.request.query_params.get(
-                    "height", settings["icicle"]["options"]["height"]
-                )
-            )
-            return icicle(flare, **options)
-        elif graph == "sunburst":
-            options["width"] = int(
-                self.request.query_params.get(
-                    "width", settings["sunburst"]["options"]["width"]
-                )
-            )
-            options["height"] = int(
-                self.request.query_params.get(
-                    "height", settings["sunburst"]["options"]["height"]
-                )
-            )
-            return sunburst(flare, **options)
+        def render():
+            flare = graph_cache.get_or_build_flare(source, build_flare)
+            return self.renderers[graph](flare, width=width, height=height)
+
+        return graph_cache.get_or_render(source, graph, width, height, render)
 
-    def get_flare(self):
+    def get_flare_source(self):
+        """
+        Returns a key identifying the flare to render (or `None` if it cannot be
+        cached) along with a callable building that flare.
+        """
         pullid = self.kwargs.get("pullid")
 
-        if not pullid:
-            return self.get_commit_flare()
-        else:
-            pull_flare = self.get_pull_flare(pullid)
-            if pull_flare is None:
-                raise NotFound(
-                    "Not found. Note: private repositories require ?token arguments"
-                )
-            return pull_flare
-
-    def get_commit_flare(self):
+        if pullid:
+            pull = self.get_pull(pullid)
+            if pull is not None and (
+                pull._flare is not None or pull._flare_storage_path is not None
+            ):
+                source = f"pull/{pull.repository_id}/{pull.pullid}/{pull.head}/{pull._flare_storage_path or ''}"
+                return source, lambda: self.get_pull_flare(pull)
+
         commit = self.get_commit()
 
         if commit is None:
@@ -213,6 +222,12 @@ class GraphHandler(APIView, RepoPropertyMixin, GraphBadgeAPIMixin):
                 "Not found. Note: private repositories require ?token arguments"
             )
 
+        source = None
+        if commit.updatestamp is not None:
+            source = f"commit/{commit.repository_id}/{commit.commitid}/{commit.updatestamp.isoformat()}"
+        return source, lambda: self.get_commit_flare(commit)
+
+    def get_commit_flare(self, commit):
         report = report_service.build_report_from_commit(commit)
 
         if report is None:
@@ -220,16 +235,20 @@ class GraphHandler(APIView, RepoPropertyMixin, GraphBadgeAPIMixin):
 
         return report.flare(None, [70, 100])
 
-    def get_pull_flare(self, pullid):
+    def get_pull_flare(self, pull):
+        pull_flare = pull.flare
+        if pull_flare is None:
+            raise NotFound(
+                "Not found. Note: private repositories require ?token arguments"
+            )
+        return pull_flare
+
+    def get_pull(self, pullid):
         try:
             repo = self.repo
         except Http404:
             return None
-        pull = Pull.objects.filter(pullid=pullid, repository_id=repo.repoid).first()
-        if pull is not None:
-            if pull._flare is not None or pull._flare_storage_path is not None:
-                return pull.flare
-        return self.get_commit_flare()
+        return Pull.objects.filter(pullid=pullid, repository_id=repo.repoid).first()
 
     def get_commit(self):
         try:
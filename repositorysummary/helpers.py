@@ -0,0 +1,43 @@
+from typing import Iterable
+
+from core.models import Repository
+from repositorysummary.models import RepositoryCoverageSummary
+
+# fields of `RepositoryCoverageSummary` copied from the repository annotations
+SUMMARY_FIELDS = (
+    "coverage_sha",
+    "recent_commit_totals",
+    "recent_coverage",
+    "hits",
+    "misses",
+    "lines",
+)
+
+
+def refresh_summaries(repoids: Iterable[int]) -> int:
+    """
+    Recomputes the `RepositoryCoverageSummary` of the given repositories from
+    their commits, creating the missing ones.  Returns the number of summaries
+    written.
+    """
+    repositories = (
+        Repository.objects.filter(repoid__in=list(repoids))
+        .with_recent_coverage()
+        .with_latest_commit_at()
+        .values("repoid", "true_latest_commit_at", *SUMMARY_FIELDS)
+    )
+    summaries = [
+        RepositoryCoverageSummary(
+            repository_id=repository["repoid"],
+            latest_commit_at=repository["true_latest_commit_at"],
+            **{field: repository[field] for field in SUMMARY_FIELDS},
+        )
+        for repository in repositories
+    ]
+    RepositoryCoverageSummary.objects.bulk_create(
+        summaries,
+        update_conflicts=True,
+        unique_fields=["repository"],
+        update_fields=[*SUMMARY_FIELDS, "latest_commit_at", "updated_at"],
+    )
+    return len(summaries)
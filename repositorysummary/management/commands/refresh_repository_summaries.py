@@ -0,0 +1,54 @@
+import logging
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.db.models import Q
+from django.utils import timezone
+
+from core.models import Commit, Repository
+from repositorysummary.helpers import refresh_summaries
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Refreshes the coverage summaries of the repositories with recent commits "
+        "and creates the missing ones.  Meant to be run periodically, since the "
+        "recent coverage of a repository comes from commits over an hour old."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--minutes",
+            type=int,
+            default=90,
+            help="refresh repositories with commits from the last hour and this "
+            "many minutes",
+        )
+        parser.add_argument(
+            "--all", action="store_true", help="refresh every repository"
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options) -> None:
+        batch_size = options["batch_size"]
+
+        repositories = Repository.objects.all()
+        if not options["all"]:
+            since = timezone.now() - timedelta(hours=1, minutes=options["minutes"])
+            recent_repoids = (
+                Commit.objects.filter(timestamp__gte=since)
+                .values("repository_id")
+                .distinct()
+            )
+            repositories = repositories.filter(
+                Q(repoid__in=recent_repoids) | Q(coverage_summary__isnull=True)
+            )
+
+        repoids = list(repositories.values_list("repoid", flat=True))
+        refreshed = 0
+        for start in range(0, len(repoids), batch_size):
+            refreshed += refresh_summaries(repoids[start : start + batch_size])
+
+        log.info("Refreshed repository summaries", extra=dict(count=refreshed))
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.11 on 2026-10-18 09:12
+
+import uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = [
+        ("core", "0014_pull_pulls_author_updatestamp"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RepositoryCoverageSummary",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("external_id", models.UUIDField(default=uuid.uuid4, editable=False)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("coverage_sha", models.TextField(null=True)),
+                ("recent_commit_totals", models.JSONField(null=True)),
+                ("recent_coverage", models.FloatField(null=True)),
+                ("hits", models.IntegerField(null=True)),
+                ("misses", models.IntegerField(null=True)),
+                ("lines", models.IntegerField(null=True)),
+                ("latest_commit_at", models.DateTimeField(null=True)),
+                (
+                    "repository",
+                    models.OneToOneField(
+                        db_column="repoid",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="coverage_summary",
+                        to="core.repository",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["recent_coverage"],
+                        name="repo_summary_recent_coverage",
+                    ),
+                    models.Index(
+                        fields=["latest_commit_at"],
+                        name="repo_summary_latest_commit_at",
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.11 on 2026-10-18 21:40
+
+import datetime
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("repositorysummary", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="repositorycoveragesummary",
+            name="repo_summary_recent_coverage",
+        ),
+        migrations.RemoveIndex(
+            model_name="repositorycoveragesummary",
+            name="repo_summary_latest_commit_at",
+        ),
+        migrations.AddIndex(
+            model_name="repositorycoveragesummary",
+            index=models.Index(
+                django.db.models.functions.comparison.Coalesce(
+                    "recent_coverage",
+                    models.Value(-1),
+                    output_field=models.FloatField(),
+                ),
+                name="repo_summary_recent_coverage",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="repositorycoveragesummary",
+            index=models.Index(
+                django.db.models.functions.comparison.Coalesce(
+                    "latest_commit_at",
+                    models.Value(datetime.datetime(1900, 1, 1, 0, 0)),
+                ),
+                name="repo_summary_latest_commit_at",
+            ),
+        ),
+    ]
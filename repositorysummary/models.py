@@ -0,0 +1,49 @@
+import datetime
+
+from django.db import models
+from django.db.models import FloatField, Value
+from django.db.models.functions import Coalesce
+from django_prometheus.models import ExportModelOperationsMixin
+
+from codecov.models import BaseCodecovModel
+
+
+class RepositoryCoverageSummary(
+    ExportModelOperationsMixin("repositorysummary.repository_coverage_summary"),
+    BaseCodecovModel,
+):
+    """
+    Denormalized copy of the `with_recent_coverage` and `with_latest_commit_at`
+    annotations of a repository, so that repository lists can be sorted and
+    filtered without subqueries on commits.  See `helpers.refresh_summaries`.
+    """
+
+    repository = models.OneToOneField(
+        "core.Repository",
+        db_column="repoid",
+        on_delete=models.CASCADE,
+        related_name="coverage_summary",
+    )
+    # the latest complete commit of the default branch that is over an hour old
+    coverage_sha = models.TextField(null=True)
+    recent_commit_totals = models.JSONField(null=True)
+    recent_coverage = models.FloatField(null=True)
+    hits = models.IntegerField(null=True)
+    misses = models.IntegerField(null=True)
+    lines = models.IntegerField(null=True)
+    # the timestamp of the latest commit of any branch
+    latest_commit_at = models.DateTimeField(null=True)
+
+    class Meta:
+        # repository lists sort on these exact expressions, see
+        # `RepositoryQuerySet.with_coverage_summary`
+        indexes = [
+            models.Index(
+                Coalesce("recent_coverage", Value(-1), output_field=FloatField()),
+                name="repo_summary_recent_coverage",
+            ),
+            models.Index(
+                Coalesce("latest_commit_at", Value(datetime.datetime(1900, 1, 1))),
+                name="repo_summary_latest_commit_at",
+            ),
+        ]
@@ -0,0 +1,120 @@
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.models import Repository
+from core.tests.factories import CommitFactory, OwnerFactory, RepositoryFactory
+from graphql_api.actions.repository import list_repository_for_owner
+from repositorysummary.helpers import refresh_summaries
+from repositorysummary.models import RepositoryCoverageSummary
+
+ANNOTATIONS = (
+    "recent_commit_totals",
+    "coverage_sha",
+    "recent_coverage",
+    "coverage",
+    "hits",
+    "misses",
+    "lines",
+    "true_latest_commit_at",
+    "latest_commit_at",
+)
+
+
+class RepositoryCoverageSummaryTest(TestCase):
+    def setUp(self):
+        self.owner = OwnerFactory()
+        self.repo = RepositoryFactory(author=self.owner, branch="main")
+        self.other_repo = RepositoryFactory(author=self.owner)
+        CommitFactory(
+            repository=self.repo,
+            branch="main",
+            state="complete",
+            timestamp=timezone.now() - timedelta(hours=2),
+            totals={"n": 10, "h": 8, "m": 2, "p": 0, "c": 80.0},
+        )
+        # too recent to be the repository's recent coverage
+        CommitFactory(
+            repository=self.repo,
+            branch="main",
+            state="complete",
+            timestamp=timezone.now() - timedelta(minutes=10),
+            totals={"n": 10, "h": 5, "m": 5, "p": 0, "c": 50.0},
+        )
+
+    def _annotations(self, queryset):
+        return list(queryset.order_by("repoid").values("repoid", *ANNOTATIONS))
+
+    def test_matches_subqueries(self):
+        assert refresh_summaries([self.repo.repoid, self.other_repo.repoid]) == 2
+
+        repositories = Repository.objects.filter(author=self.owner)
+        expected = self._annotations(
+            repositories.with_recent_coverage().with_latest_commit_at()
+        )
+        assert self._annotations(repositories.with_coverage_summary()) == expected
+        assert expected[0]["recent_coverage"] == 80.0
+        assert expected[1]["coverage"] == -1
+
+    def test_refresh_updates_summaries(self):
+        refresh_summaries([self.repo.repoid])
+        CommitFactory(
+            repository=self.repo,
+            branch="main",
+            state="complete",
+            timestamp=timezone.now() - timedelta(minutes=90),
+            totals={"n": 10, "h": 9, "m": 1, "p": 0, "c": 90.0},
+        )
+        refresh_summaries([self.repo.repoid])
+
+        summary = RepositoryCoverageSummary.objects.get(repository=self.repo)
+        assert summary.recent_coverage == 90.0
+        assert summary.hits == 9
+        assert RepositoryCoverageSummary.objects.count() == 1
+
+    def test_command(self):
+        call_command("refresh_repository_summaries")
+        assert set(
+            RepositoryCoverageSummary.objects.values_list("repository_id", flat=True)
+        ) >= {self.repo.repoid, self.other_repo.repoid}
+
+    @override_settings(REPOSITORY_COVERAGE_SUMMARY_ENABLED=True)
+    def test_list_repository_for_owner(self):
+        repos = list_repository_for_owner(self.owner, self.owner, {})
+        # repositories without a summary have no coverage yet
+        assert repos.get(repoid=self.repo.repoid).recent_coverage is None
+
+        refresh_summaries([self.repo.repoid])
+        assert repos.get(repoid=self.repo.repoid).recent_coverage == 80.0
+
+    @override_settings(REPOSITORY_COVERAGE_SUMMARY_ENABLED=True)
+    def test_commit_save_refreshes_summary(self):
+        CommitFactory(repository=self.other_repo)
+        summary = RepositoryCoverageSummary.objects.get(repository=self.other_repo)
+        assert summary.latest_commit_at is not None
+
+    @override_settings(REPOSITORY_COVERAGE_SUMMARY_ENABLED=True)
+    def test_repository_creation_creates_summary(self):
+        repo = RepositoryFactory(author=self.owner)
+        summary = RepositoryCoverageSummary.objects.get(repository=repo)
+        assert summary.recent_coverage is None
+        assert summary.latest_commit_at is None
+
+    def test_sorts_on_indexed_expressions(self):
+        refresh_summaries([self.repo.repoid, self.other_repo.repoid])
+        repositories = Repository.objects.filter(
+            author=self.owner
+        ).with_coverage_summary()
+
+        by_coverage = repositories.order_by("-coverage", "repoid")
+        assert [repo.repoid for repo in by_coverage] == [
+            self.repo.repoid,
+            self.other_repo.repoid,
+        ]
+        sql = str(by_coverage.query)
+        assert (
+            'COALESCE("repositorysummary_repositorycoveragesummary"."recent_coverage", -1)'
+            in sql
+        )
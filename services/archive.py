@@ -8,16 +8,68 @@ from uuid import uuid4
 from django.conf import settings
 from django.utils import timezone
 from minio import Minio
+from shared.reports.resources import END_OF_CHUNK
+from shared.storage.exceptions import FileNotInStorageError
 from shared.utils.ReportEncoder import ReportEncoder
 
+from services.report_cache import report_chunks_cache
 from services.storage import StorageService
 from utils.config import get_config
 
 log = logging.getLogger(__name__)
 
+# newer archives are prefixed with a JSON header terminated by this marker
+END_OF_HEADER = "\n<<<<< end_of_header >>>>>\n"
+
+
+def header_size(data: bytes) -> int:
+    """
+    Returns the size in bytes of the header (marker included) the encoded
+    contents of a `chunks.txt` file start with, if any.
+    """
+    separator = END_OF_HEADER.encode()
+    if not data.startswith(b"{"):
+        return 0
+    end = data.find(separator)
+    return 0 if end == -1 else end + len(separator)
+
+
+def chunk_offsets(data: bytes, start: int = 0) -> list[tuple[int, int]]:
+    """
+    Returns the `(start, end)` byte offsets of every chunk in the encoded
+    contents of a `chunks.txt` file, indexed by `file_index`.  Chunks start
+    after `start`, the size of the header.
+    """
+    separator = END_OF_CHUNK.encode()
+    offsets = []
+    while True:
+        end = data.find(separator, start)
+        if end == -1:
+            offsets.append((start, len(data)))
+            return offsets
+        offsets.append((start, end))
+        start = end + len(separator)
+
+
+def merge_ranges(ranges: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """
+    Merges overlapping or adjacent `(start, end)` ranges so they can be fetched
+    with as few requests as possible.  Chunks are only separated by a short
+    marker, so ranges closer than that are merged as well.
+    """
+    gap = len(END_OF_CHUNK.encode())
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start - merged[-1][1] <= gap:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
 
 class MinioEndpoints(Enum):
     chunks = "{version}/repos/{repo_hash}/commits/{commitid}/chunks.txt"
+    chunks_index = "{version}/repos/{repo_hash}/commits/{commitid}/chunks_index.json"
     json_data = "{version}/repos/{repo_hash}/commits/{commitid}/json_data/{table}/{field}/{external_id}.json"
     json_data_no_commit = (
         "{version}/repos/{repo_hash}/json_data/{table}/{field}/{external_id}.json"
@@ -70,6 +122,7 @@ class ArchiveService(object):
         # Set TTL from config and default to existing value
         self.ttl = ttl or int(get_config("services", "minio", "ttl", default=self.ttl))
         self.storage = StorageService()
+        self.repoid = repository.repoid
         self.storage_hash = self.get_archive_hash(repository)
 
     """
@@ -198,6 +251,8 @@ class ArchiveService(object):
         )
 
         self.write_file(path, data)
+        self.write_chunks_index(commit_sha, data)
+        report_chunks_cache.invalidate(self.repoid, commit_sha)
         return path
 
     """
@@ -236,6 +291,99 @@ class ArchiveService(object):
         log.info("Downloading chunks from path %s for commit %s", path, commit_sha)
         return self.read_file(path)
 
+    """
+    Writes the sidecar index of chunk byte offsets used by `read_chunk_range`,
+    which also holds the header of the chunks.
+    """
+
+    def write_chunks_index(self, commit_sha, data):
+        if isinstance(data, str):
+            data = data.encode()
+        path = MinioEndpoints.chunks_index.get_path(
+            version="v4", repo_hash=self.storage_hash, commitid=commit_sha
+        )
+        size = header_size(data)
+        index = dict(
+            size=len(data),
+            header=data[:size].decode(),
+            offsets=chunk_offsets(data, size),
+        )
+        self.write_file(path, json.dumps(index))
+        return path
+
+    """
+    Convenience method to read the sidecar index of a chunks file, or `None`
+    if there is none (e.g. the chunks were written by the worker).
+    """
+
+    def read_chunks_index(self, commit_sha):
+        path = MinioEndpoints.chunks_index.get_path(
+            version="v4", repo_hash=self.storage_hash, commitid=commit_sha
+        )
+        try:
+            return json.loads(self.read_file(path))
+        except FileNotInStorageError:
+            return None
+
+    """
+    Reads only the chunks for the given file indexes, using ranged GETs
+    against `chunks.txt` that are merged when the chunks are adjacent.
+    Falls back to reading the whole chunks file when there is no index, the
+    index is stale or the file is gzipped, in which case every chunk is
+    returned.  Returns a dict of file index -> chunk.
+    """
+
+    def read_chunk_range(self, commit_sha, file_indexes, index=None):
+        path = MinioEndpoints.chunks.get_path(
+            version="v4", repo_hash=self.storage_hash, commitid=commit_sha
+        )
+        if index is None:
+            index = self.read_chunks_index(commit_sha)
+        if index is None:
+            log.info(
+                "No chunks index found, reading whole chunks file",
+                extra=dict(commit=commit_sha),
+            )
+            return self._read_chunks_from_whole_file(commit_sha)
+
+        offsets = index["offsets"]
+        requested = {
+            file_index: tuple(offsets[file_index])
+            for file_index in file_indexes
+            if 0 <= file_index < len(offsets)
+        }
+        result = {}
+        for start, end in merge_ranges(list(requested.values())):
+            try:
+                data, total_size = self.storage.read_file_range(
+                    self.root, path, start, end - start
+                )
+            except ValueError:
+                log.info(
+                    "Chunks file is gzipped, reading whole chunks file",
+                    extra=dict(commit=commit_sha),
+                )
+                return self._read_chunks_from_whole_file(commit_sha)
+            if total_size is not None and total_size != index["size"]:
+                # the chunks were rewritten without updating the index
+                log.warning(
+                    "Stale chunks index found, reading whole chunks file",
+                    extra=dict(commit=commit_sha),
+                )
+                return self._read_chunks_from_whole_file(commit_sha)
+            for file_index, (chunk_start, chunk_end) in requested.items():
+                if start <= chunk_start and chunk_end <= end:
+                    result[file_index] = data[
+                        chunk_start - start : chunk_end - start
+                    ].decode()
+        return result
+
+    def _read_chunks_from_whole_file(self, commit_sha):
+        chunks = self.read_chunks(commit_sha)
+        if chunks.startswith("{") and END_OF_HEADER in chunks:
+            chunks = chunks.split(END_OF_HEADER, 1)[1]
+        return dict(enumerate(chunks.split(END_OF_CHUNK)))
+
     """
     Delete a chunk file from the archive
     """
@@ -244,6 +392,7 @@ class ArchiveService(object):
         path = "v4/repos/{}/commits/{}/chunks.txt".format(self.storage_hash, commit_sha)
 
         self.delete_file(path)
+        report_chunks_cache.invalidate(self.repoid, commit_sha)
 
     def create_presigned_put(self, path):
         return self.storage.create_presigned_put(self.root, path, self.ttl)
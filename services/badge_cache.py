@@ -0,0 +1,101 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Union
+
+from django.conf import settings
+
+from services.redis_cache import RedisCache
+
+FlagsCoverage = dict[str, Optional[Union[str, float]]]
+
+
+class BadgeCoverageCache(RedisCache):
+    """
+    Denormalized `(repoid, commitid, updatestamp) -> {flag: coverage}` store
+    backing the flag badges, which otherwise need the full report of the commit.
+    The worker bumps the `updatestamp` of a commit whenever its report changes,
+    so entries never go stale and are looked up by the current head commit of
+    the badge's branch.
+
+    Entries live in Redis (with `settings.BADGE_CACHE_REDIS_TTL`) and in a small
+    process-local tier with a much shorter TTL.
+    """
+
+    enabled_setting = "BADGE_CACHE_ENABLED"
+
+    def __init__(self):
+        self._memory: OrderedDict[tuple, tuple[float, FlagsCoverage]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _redis_key(self, repoid: int, commitid: str, updatestamp: datetime) -> str:
+        return f"badge_flags_coverage/{repoid}/{commitid}/{updatestamp.isoformat()}"
+
+    def get(
+        self, repoid: int, commitid: str, updatestamp: Optional[datetime]
+    ) -> Optional[FlagsCoverage]:
+        if not self.enabled or updatestamp is None:
+            return None
+
+        key = (repoid, commitid, updatestamp)
+        flags = self._get_from_memory(key)
+        if flags is not None:
+            return flags
+
+        serialized = None
+        with self.suppress_redis_errors(
+            "Error reading badge coverage from redis", repoid=repoid, commitid=commitid
+        ):
+            serialized = self.redis.get(self._redis_key(*key))
+        if serialized is None:
+            return None
+
+        flags = json.loads(serialized)
+        self._set_in_memory(key, flags)
+        return flags
+
+    def set(
+        self,
+        repoid: int,
+        commitid: str,
+        updatestamp: Optional[datetime],
+        flags: FlagsCoverage,
+    ) -> None:
+        if not self.enabled or updatestamp is None:
+            return
+
+        key = (repoid, commitid, updatestamp)
+        self._set_in_memory(key, flags)
+        with self.suppress_redis_errors(
+            "Error writing badge coverage to redis", repoid=repoid, commitid=commitid
+        ):
+            self.redis.set(
+                self._redis_key(*key),
+                json.dumps(flags),
+                ex=settings.BADGE_CACHE_REDIS_TTL,
+            )
+
+    def _get_from_memory(self, key: tuple) -> Optional[FlagsCoverage]:
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is None:
+                return None
+            expires_at, flags = cached
+            if expires_at < time.monotonic():
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            return flags
+
+    def _set_in_memory(self, key: tuple, flags: FlagsCoverage) -> None:
+        expires_at = time.monotonic() + settings.BADGE_CACHE_MEMORY_TTL
+        with self._lock:
+            self._memory[key] = (expires_at, flags)
+            self._memory.move_to_end(key)
+            while len(self._memory) > settings.BADGE_CACHE_MEMORY_MAX_ENTRIES:
+                self._memory.popitem(last=False)
+
+
+badge_coverage_cache = BadgeCoverageCache()
@@ -1,12 +1,12 @@
 import asyncio
-import copy
 import functools
 import json
 import logging
-from collections import Counter
+from collections import Counter, deque
+from collections.abc import Sequence
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import List, Optional, Tuple
+from typing import Iterable, List, Optional, Tuple
 
 import minio
 import pytz
@@ -24,6 +24,11 @@ from core.models import Commit
 from reports.models import CommitReport, ReportDetails
 from services import ServiceException
 from services.archive import ArchiveService
+from services.git_comparison_cache import git_comparison_cache
+from services.impacted_files_index import (
+    ImpactedFilesIndex,
+    impacted_files_index_cache,
+)
 from services.redis_configuration import get_redis_connection
 from services.repo_providers import RepoProviderService
 from utils.config import get_config
@@ -116,16 +121,43 @@ class FileComparisonTraverseManager:
         """
         self.head_file_eof = head_file_eof
         self.base_file_eof = base_file_eof
-        self.segments = copy.deepcopy(segments)
+        # Segments are consumed from the front, and the lines of the current
+        # segment are read through a cursor rather than popped off the list.
+        # This avoids both copying the segments and the quadratic cost of
+        # `list.pop(0)` on large segments.
+        self.segments = deque(segments)
+        self._line_index = 0
+        self._segment_range = self._current_segment_range()
         self.src = src
 
         if self.segments:
             # Base offsets can be 0 if files are added or removed
-            self.base_ln = min(1, int(self.segments[0]["header"][0]))
-            self.head_ln = min(1, int(self.segments[0]["header"][2]))
+            self.base_ln = min(1, self._segment_range[0])
+            self.head_ln = min(1, self._segment_range[2])
         else:
             self.base_ln, self.head_ln = 1, 1
 
+    def _current_segment_range(self):
+        """
+        Parses the header of the current segment once into
+        (base start, base end, head start, head end) line numbers.
+        """
+        if not self.segments:
+            return None
+        header = self.segments[0]["header"]
+        base_start, head_start = int(header[0]), int(header[2])
+        return (
+            base_start,
+            base_start + int(header[1] or 1),
+            head_start,
+            head_start + int(header[3] or 1),
+        )
+
+    def _next_segment(self):
+        self.segments.popleft()
+        self._line_index = 0
+        self._segment_range = self._current_segment_range()
+
     def traverse_finished(self):
         if self.segments:
             return False
@@ -134,30 +166,27 @@ class FileComparisonTraverseManager:
         return self.head_ln >= self.head_file_eof and self.base_ln >= self.base_file_eof
 
     def traversing_diff(self):
-        if self.segments == []:
+        if not self.segments:
             return False
 
-        base_ln_within_offset = (
-            int(self.segments[0]["header"][0])
-            <= self.base_ln
-            < int(self.segments[0]["header"][0])
-            + int(self.segments[0]["header"][1] or 1)
-        )
-        head_ln_within_offset = (
-            int(self.segments[0]["header"][2])
-            <= self.head_ln
-            < int(self.segments[0]["header"][2])
-            + int(self.segments[0]["header"][3] or 1)
+        base_start, base_end, head_start, head_end = self._segment_range
+        return (
+            base_start <= self.base_ln < base_end
+            or head_start <= self.head_ln < head_end
         )
-        return base_ln_within_offset or head_ln_within_offset
 
-    def pop_line(self):
-        if self.traversing_diff():
-            return self.segments[0]["lines"].pop(0)
+    def _line_value(self, is_diff):
+        if is_diff:
+            line_value = self.segments[0]["lines"][self._line_index]
+            self._line_index += 1
+            return line_value
 
         if self.src:
             return self.src[self.head_ln - 1]
 
+    def pop_line(self):
+        return self._line_value(self.traversing_diff())
+
     def apply(self, visitors):
         """
         Traverses the lines in a file comparison while accounting for the diff.
@@ -169,8 +198,8 @@ class FileComparisonTraverseManager:
         visitors -- A list of visitors applied to each line.
         """
         while not self.traverse_finished():
-            line_value = self.pop_line()
             is_diff = self.traversing_diff()
+            line_value = self._line_value(is_diff)
 
             for visitor in visitors:
                 visitor(
@@ -188,11 +217,11 @@ class FileComparisonTraverseManager:
                 self.head_ln += 1
                 self.base_ln += 1
 
-            if self.segments and not self.segments[0]["lines"]:
+            if self.segments and self._line_index >= len(self.segments[0]["lines"]):
                 # Either the segment has no lines (and is therefore of no use)
-                # or all lines have been popped and visited, which means we are
-                # done traversing it
-                self.segments.pop(0)
+                # or all lines have been visited, which means we are done
+                # traversing it
+                self._next_segment()
 
 
 class FileComparisonVisitor:
@@ -637,6 +666,8 @@ class Comparison(object):
         self.user = user
         self._base_commit = base_commit
         self._head_commit = head_commit
+        # report sources fetched ahead of time (e.g. by a batched loader) by commitid
+        self.prefetched_reports: dict[str, report_service.ReportSource] = {}
 
     def validate(self):
         # make sure head and base reports exist (will throw an error if not)
@@ -693,10 +724,16 @@ class Comparison(object):
     def git_comparison(self):
         return self._fetch_comparison_and_reverse_comparison[0]
 
+    def _build_report(self, commit):
+        source = self.prefetched_reports.get(commit.commitid)
+        if source is not None:
+            return report_service.build_report_from_source(source, lazy=True)
+        return report_service.build_report_from_commit(commit, lazy=True)
+
     @cached_property
     def base_report(self):
         try:
-            return report_service.build_report_from_commit(self.base_commit)
+            return self._build_report(self.base_commit)
         except minio.error.S3Error as e:
             if e.code == "NoSuchKey":
                 raise MissingComparisonReport("Missing base report")
@@ -706,7 +743,7 @@ class Comparison(object):
     @cached_property
     def head_report(self):
         try:
-            report = report_service.build_report_from_commit(self.head_commit)
+            report = self._build_report(self.head_commit)
         except minio.error.S3Error as e:
             if e.code == "NoSuchKey":
                 raise MissingComparisonReport("Missing head report")
@@ -766,23 +803,64 @@ class Comparison(object):
     def _fetch_comparison_and_reverse_comparison(self):
         """
         Fetches comparison and reverse comparison concurrently, then
-        caches the result. Returns (comparison, reverse_comparison).
+        caches the result. Returns (comparison, has_unmerged_base_commits).
+
+        Both are kept in the `git_comparison_cache` so that they're only
+        fetched from the provider once per pair of commits.
+        """
+        repoid = self.base_commit.repository_id
+        base, head = self.base_commit.commitid, self.head_commit.commitid
+        comparison = git_comparison_cache.get(repoid, base, head)
+        unmerged = git_comparison_cache.get_unmerged_base_commits(repoid, base, head)
+        if comparison is not None and unmerged is not None:
+            return comparison, unmerged
+
+        with git_comparison_cache.single_flight(repoid, base, head):
+            # another request may have fetched them while we were waiting
+            if comparison is None:
+                comparison = git_comparison_cache.get(repoid, base, head)
+            if unmerged is None:
+                unmerged = git_comparison_cache.get_unmerged_base_commits(
+                    repoid, base, head
+                )
+
+            if comparison is None or unmerged is None:
+                fetched, reverse_comparison = self._fetch_git_comparisons(
+                    comparison is None, unmerged is None
+                )
+                if fetched is not None:
+                    comparison = fetched
+                    git_comparison_cache.set(repoid, base, head, comparison)
+                if reverse_comparison is not None:
+                    # torngit injects the base commit into the commits array
+                    unmerged = len(reverse_comparison["commits"]) > 1
+                    git_comparison_cache.set_unmerged_base_commits(
+                        repoid, base, head, unmerged
+                    )
+
+        return comparison, unmerged
+
+    def _fetch_git_comparisons(
+        self, comparison: bool, reverse_comparison: bool
+    ) -> Tuple[Optional[dict], Optional[dict]]:
+        """
+        Fetches the requested comparisons from the provider concurrently.
         """
         adapter = RepoProviderService().get_adapter(
             self.user, self.base_commit.repository
         )
-        comparison_coro = adapter.get_compare(
-            self.base_commit.commitid, self.head_commit.commitid
-        )
-
-        reverse_comparison_coro = adapter.get_compare(
-            self.head_commit.commitid, self.base_commit.commitid
-        )
+        base, head = self.base_commit.commitid, self.head_commit.commitid
+        coros = {}
+        if comparison:
+            coros["comparison"] = adapter.get_compare(base, head)
+        if reverse_comparison:
+            coros["reverse_comparison"] = adapter.get_compare(head, base)
 
         async def runnable():
-            return await asyncio.gather(comparison_coro, reverse_comparison_coro)
+            return await asyncio.gather(*coros.values())
 
-        return async_to_sync(runnable)()
+        results = dict(zip(coros, async_to_sync(runnable)()))
+        return results.get("comparison"), results.get("reverse_comparison")
 
     def flag_comparison(self, flag_name):
         return FlagComparison(self, flag_name)
@@ -802,7 +880,7 @@ class Comparison(object):
         We compare with 1 because torngit injects the base commit into the commits
         array because reasons.
         """
-        return len(self._fetch_comparison_and_reverse_comparison[1]["commits"]) > 1
+        return self._fetch_comparison_and_reverse_comparison[1]
 
 
 class FlagComparison(object):
@@ -974,31 +1052,85 @@ class ComparisonReport(object):
     commit_comparison: CommitComparison = None
 
     @cached_property
-    def files(self) -> List[ImpactedFile]:
+    def _cache_key(self) -> str:
+        return "/".join(
+            (
+                "impacted_files",
+                str(self.commit_comparison.pk),
+                str(self.commit_comparison.updated_at.timestamp()),
+            )
+        )
+
+    @cached_property
+    def _raw_files(self) -> List[dict]:
         if not self.commit_comparison.report_storage_path:
             return []
+        return self._fetch_raw_comparison_data().get("files", [])
+
+    @cached_property
+    def _loaded_files(self) -> dict[int, ImpactedFile]:
+        # impacted files already created, by position
+        return {}
 
-        comparison_data = self._fetch_raw_comparison_data()
-        return [
-            ImpactedFile.create(**data) for data in comparison_data.get("files", [])
-        ]
+    @cached_property
+    def index(self) -> ImpactedFilesIndex:
+        """
+        Index of the impacted files, shared across requests through the
+        `impacted_files_index_cache` so that lookups, orderings and filters
+        don't need the comparison data.
+        """
+        if not self.commit_comparison.report_storage_path:
+            return ImpactedFilesIndex.build([])
+
+        index = impacted_files_index_cache.get_index(self._cache_key)
+        if index is not None:
+            return index
+
+        files = self.impacted_files_at(range(len(self._raw_files)))
+        index = ImpactedFilesIndex.build(files)
+        # no data means it couldn't be fetched, so it shouldn't be cached
+        if self._raw_files:
+            impacted_files_index_cache.set(self._cache_key, index, self._raw_files)
+        return index
+
+    def impacted_files_at(self, positions: Iterable[int]) -> List[ImpactedFile]:
+        """
+        Returns the impacted files at the given positions of the comparison
+        data, only creating the ones not created yet.
+        """
+        positions = list(positions)
+        missing = [pos for pos in positions if pos not in self._loaded_files]
+        if missing:
+            data = None
+            # once the comparison data is fetched there's no need for redis
+            if "_raw_files" not in self.__dict__:
+                data = impacted_files_index_cache.get_files(self._cache_key, missing)
+            if data is None:
+                data = [self._raw_files[pos] for pos in missing]
+            for pos, file_data in zip(missing, data):
+                self._loaded_files[pos] = ImpactedFile.create(**file_data)
+        return [self._loaded_files[pos] for pos in positions]
+
+    @property
+    def files(self) -> List[ImpactedFile]:
+        return self.impacted_files_at(range(len(self.index)))
 
     def impacted_file(self, path: str) -> Optional[ImpactedFile]:
-        for file in self.files:
-            if file.head_name == path:
-                return file
+        position = self.index.positions.get(path)
+        if position is not None:
+            return self.impacted_files_at([position])[0]
 
-    @cached_property
+    @property
     def impacted_files(self) -> List[ImpactedFile]:
         return self.files
 
-    @cached_property
+    @property
     def impacted_files_with_unintended_changes(self) -> List[ImpactedFile]:
-        return [file for file in self.files if file.has_changes]
+        return self.impacted_files_at(self.index.unintended)
 
-    @cached_property
+    @property
     def impacted_files_with_direct_changes(self) -> List[ImpactedFile]:
-        return [file for file in self.files if file.has_diff or not file.has_changes]
+        return self.impacted_files_at(self.index.direct)
 
     def _fetch_raw_comparison_data(self) -> dict:
         """
@@ -1016,6 +1148,39 @@ class ComparisonReport(object):
             return {}
 
 
+class ImpactedFiles(Sequence):
+    """
+    Impacted files of a `ComparisonReport` at the given positions, in that
+    order.  Files are only created when accessed, and are referred to by
+    cursors that don't depend on the ordering or filters.
+    """
+
+    def __init__(self, comparison_report: ComparisonReport, positions: List[int]):
+        self.comparison_report = comparison_report
+        self.positions = positions
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return self.comparison_report.impacted_files_at(self.positions[item])
+        return self.comparison_report.impacted_files_at([self.positions[item]])[0]
+
+    def __iter__(self):
+        return iter(self.comparison_report.impacted_files_at(self.positions))
+
+    def cursor(self, item: int) -> str:
+        return str(self.positions[item])
+
+    def offset_after(self, cursor: str) -> int:
+        """
+        Returns the offset of the file following the one with the given cursor,
+        raising `ValueError` when there is no such file.
+        """
+        return self.positions.index(int(cursor)) + 1
+
+
 class PullRequestComparison(Comparison):
     """
     A Comparison instantiated with a Pull. Contains relevant additional processing
@@ -1159,8 +1324,13 @@ class PullRequestComparison(Comparison):
         'self.pull.base' field.
         """
         adapter = RepoProviderService().get_adapter(self.user, self.pull.repository)
-        return async_to_sync(adapter.get_compare)(
-            self.pull.compared_to, self.pull.base
+        return git_comparison_cache.get_or_fetch(
+            self.pull.repository_id,
+            self.pull.compared_to,
+            self.pull.base,
+            lambda: async_to_sync(adapter.get_compare)(
+                self.pull.compared_to, self.pull.base
+            ),
         )["diff"]
 
     @cached_property
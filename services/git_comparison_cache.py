@@ -0,0 +1,149 @@
+import json
+import threading
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+from django.conf import settings
+
+from services.redis_cache import RedisCache
+
+
+class GitComparisonCache(RedisCache):
+    """
+    Cache of the comparisons returned by the git providers, addressed by the
+    repository and the `(base, head)` commit SHAs: since the SHAs identify the
+    content being compared, entries never go stale and only expire after
+    `settings.GIT_COMPARISON_CACHE_TTL` to bound the space they use.
+
+    Entries are zlib-compressed JSON kept in Redis, fronted by a process-local LRU
+    of `settings.GIT_COMPARISON_CACHE_MEMORY_MAX_ENTRIES` entries.  Whether the
+    base has commits the head doesn't (derived from the reverse comparison) is
+    cached on its own so that the reverse comparison itself needn't be.
+
+    `single_flight` makes concurrent requests for a missing comparison in this
+    process wait for the one fetching it instead of all calling the provider.
+    Requests of other processes aren't coordinated with: waiting on a slow
+    provider across processes would hold up worker threads.
+    """
+
+    enabled_setting = "GIT_COMPARISON_CACHE_ENABLED"
+
+    def __init__(self):
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+        self._flights: dict[str, list] = {}
+
+    def _key(self, repoid: int, base: str, head: str) -> str:
+        return f"git_comparison/{repoid}/{base}/{head}"
+
+    def get(self, repoid: int, base: str, head: str) -> Optional[dict]:
+        if not self.enabled:
+            return None
+
+        key = self._key(repoid, base, head)
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+        if value is None:
+            value = self._get_from_redis(key)
+            if value is None:
+                return None
+            self._set_in_memory(key, value)
+        return json.loads(zlib.decompress(value))
+
+    def set(self, repoid: int, base: str, head: str, comparison: dict) -> None:
+        if not self.enabled:
+            return
+
+        key = self._key(repoid, base, head)
+        value = zlib.compress(json.dumps(comparison).encode())
+        self._set_in_memory(key, value)
+        with self.suppress_redis_errors(
+            "Error writing git comparison to redis", key=key
+        ):
+            self.redis.set(key, value, ex=settings.GIT_COMPARISON_CACHE_TTL)
+
+    def get_unmerged_base_commits(
+        self, repoid: int, base: str, head: str
+    ) -> Optional[bool]:
+        if not self.enabled:
+            return None
+        value = self._get_from_redis(f"{self._key(repoid, base, head)}/unmerged")
+        return None if value is None else value == b"1"
+
+    def set_unmerged_base_commits(
+        self, repoid: int, base: str, head: str, unmerged: bool
+    ) -> None:
+        if not self.enabled:
+            return
+        key = f"{self._key(repoid, base, head)}/unmerged"
+        with self.suppress_redis_errors(
+            "Error writing unmerged base commits to redis", key=key
+        ):
+            self.redis.set(
+                key, "1" if unmerged else "0", ex=settings.GIT_COMPARISON_CACHE_TTL
+            )
+
+    def get_or_fetch(
+        self, repoid: int, base: str, head: str, fetch: Callable[[], dict]
+    ) -> dict:
+        """
+        Returns the cached comparison, fetching it with `fetch` if it is missing.
+        """
+        if not self.enabled or not base or not head:
+            return fetch()
+
+        comparison = self.get(repoid, base, head)
+        if comparison is not None:
+            return comparison
+
+        with self.single_flight(repoid, base, head):
+            # another request may have fetched it while we were waiting
+            comparison = self.get(repoid, base, head)
+            if comparison is None:
+                comparison = fetch()
+                self.set(repoid, base, head, comparison)
+        return comparison
+
+    @contextmanager
+    def single_flight(self, repoid: int, base: str, head: str):
+        """
+        Only lets one request of this process at a time in for the given
+        comparison.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        key = self._key(repoid, base, head)
+        with self._lock:
+            flight = self._flights.setdefault(key, [threading.Lock(), 0])
+            flight[1] += 1
+        try:
+            with flight[0]:
+                yield
+        finally:
+            with self._lock:
+                flight[1] -= 1
+                if flight[1] == 0:
+                    del self._flights[key]
+
+    def _get_from_redis(self, key: str) -> Optional[bytes]:
+        with self.suppress_redis_errors(
+            "Error reading git comparison from redis", key=key
+        ):
+            return self.redis.get(key)
+        return None
+
+    def _set_in_memory(self, key: str, value: bytes) -> None:
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > settings.GIT_COMPARISON_CACHE_MEMORY_MAX_ENTRIES:
+                self._memory.popitem(last=False)
+
+
+git_comparison_cache = GitComparisonCache()
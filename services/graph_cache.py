@@ -0,0 +1,73 @@
+import json
+import zlib
+from typing import Callable, Optional
+
+from django.conf import settings
+
+from services.redis_cache import RedisCache
+
+
+class GraphCache(RedisCache):
+    """
+    Redis cache for the flares and rendered SVGs served by the graph endpoints.
+
+    Both are keyed by a `source` string identifying the flare, which must change
+    whenever the flare itself does (e.g. it contains the commit's `updatestamp`),
+    so entries never need to be invalidated and simply expire after
+    `settings.GRAPH_CACHE_TTL`.  The flare is shared by every graph type and size
+    rendered from the same source.
+    """
+
+    enabled_setting = "GRAPH_CACHE_ENABLED"
+
+    def get_or_build_flare(
+        self, source: Optional[str], build: Callable[[], list]
+    ) -> list:
+        if not self.enabled or source is None:
+            return build()
+
+        key = f"graphs/{source}/flare"
+        cached = self._get(key)
+        if cached is not None:
+            return json.loads(cached)
+
+        flare = build()
+        self._set(key, json.dumps(flare))
+        return flare
+
+    def get_or_render(
+        self,
+        source: Optional[str],
+        graph: str,
+        width: int,
+        height: int,
+        render: Callable[[], str],
+    ) -> str:
+        if not self.enabled or source is None:
+            return render()
+
+        key = f"graphs/{source}/{graph}/{width}x{height}"
+        cached = self._get(key)
+        if cached is not None:
+            return cached
+
+        svg = render()
+        self._set(key, svg)
+        return svg
+
+    def _get(self, key: str) -> Optional[str]:
+        compressed = None
+        with self.suppress_redis_errors("Error reading graph from redis", key=key):
+            compressed = self.redis.get(key)
+        if compressed is None:
+            return None
+        return zlib.decompress(compressed).decode()
+
+    def _set(self, key: str, value: str) -> None:
+        with self.suppress_redis_errors("Error writing graph to redis", key=key):
+            self.redis.set(
+                key, zlib.compress(value.encode()), ex=settings.GRAPH_CACHE_TTL
+            )
+
+
+graph_cache = GraphCache()
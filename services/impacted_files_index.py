@@ -0,0 +1,163 @@
+import json
+import zlib
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, List, Optional
+
+from django.conf import settings
+
+from services.redis_cache import RedisCache
+
+# attributes impacted files can be ordered by, by `ImpactedFileParameter` value
+IMPACTED_FILE_ORDERINGS: dict[str, Callable] = {
+    "file_name": lambda file: file.file_name,
+    "change_coverage": lambda file: file.change_coverage,
+    "head_coverage": lambda file: (
+        file.head_coverage.coverage if file.head_coverage is not None else None
+    ),
+    "misses_count": lambda file: file.misses_count,
+    "patch_coverage": lambda file: (
+        file.patch_coverage.coverage if file.patch_coverage is not None else None
+    ),
+}
+
+
+@dataclass
+class ImpactedFilesIndex:
+    """
+    Index of the impacted files of a comparison, which are referred to by their
+    position in the comparison data: their head names, the positions of the
+    files with unintended and with direct changes, and their positions ordered
+    by each of `IMPACTED_FILE_ORDERINGS` in both directions (with the files
+    without a value last).
+
+    Orderings are only sorted when requested, from the impacted files the index
+    was built from, or all at once when the index is serialized to be stored.
+    """
+
+    head_names: List[Optional[str]]
+    unintended: List[int]
+    direct: List[int]
+    orderings: dict[str, dict[str, List[int]]] = field(default_factory=dict)
+    files: Optional[list] = field(default=None, repr=False, compare=False)
+    positions: dict[str, int] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # the first file with a given head name is the one found by its path
+        self.positions = {}
+        for pos, head_name in enumerate(self.head_names):
+            if head_name is not None:
+                self.positions.setdefault(head_name, pos)
+
+    @classmethod
+    def build(cls, files: list) -> "ImpactedFilesIndex":
+        return cls(
+            head_names=[file.head_name for file in files],
+            unintended=[pos for pos, file in enumerate(files) if file.has_changes],
+            direct=[
+                pos
+                for pos, file in enumerate(files)
+                if file.has_diff or not file.has_changes
+            ],
+            files=files,
+        )
+
+    def __len__(self) -> int:
+        return len(self.head_names)
+
+    def _sort(self, parameter: str) -> dict[str, List[int]]:
+        attribute = IMPACTED_FILE_ORDERINGS[parameter]
+        values = [attribute(file) for file in self.files]
+        with_value = [pos for pos, value in enumerate(values) if value is not None]
+        without_value = [pos for pos, value in enumerate(values) if value is None]
+        return {
+            direction: sorted(
+                with_value,
+                key=lambda pos: values[pos],
+                reverse=direction == "descending",
+            )
+            + without_value
+            for direction in ("ascending", "descending")
+        }
+
+    def ordering(self, parameter: str, direction: str) -> List[int]:
+        if parameter not in self.orderings:
+            self.orderings[parameter] = self._sort(parameter)
+        return self.orderings[parameter][direction]
+
+    def to_dict(self) -> dict:
+        # stored indexes have no files to sort later on
+        for parameter in IMPACTED_FILE_ORDERINGS:
+            if parameter not in self.orderings:
+                self.orderings[parameter] = self._sort(parameter)
+        return {
+            "head_names": self.head_names,
+            "orderings": self.orderings,
+            "unintended": self.unintended,
+            "direct": self.direct,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ImpactedFilesIndex":
+        return cls(**data)
+
+
+class ImpactedFilesIndexCache(RedisCache):
+    """
+    Redis store of the `ImpactedFilesIndex` of comparisons along with their
+    impacted files, kept in a hash by position so that only the requested ones
+    are loaded.  Entries expire after `settings.IMPACTED_FILES_INDEX_TTL`.
+    """
+
+    enabled_setting = "IMPACTED_FILES_INDEX_CACHE_ENABLED"
+
+    def get_index(self, key: str) -> Optional[ImpactedFilesIndex]:
+        if not self.enabled:
+            return None
+        value = None
+        with self.suppress_redis_errors(
+            "Error reading impacted files index from redis", key=key
+        ):
+            value = self.redis.get(f"{key}/index")
+        if value is None:
+            return None
+        return ImpactedFilesIndex.from_dict(json.loads(zlib.decompress(value)))
+
+    def get_files(self, key: str, positions: Iterable[int]) -> Optional[List[dict]]:
+        """
+        Returns the impacted files at the given positions, or `None` if any of
+        them is missing.
+        """
+        positions = list(positions)
+        if not self.enabled or not positions:
+            return None
+        with self.suppress_redis_errors(
+            "Error reading impacted files from redis", key=key
+        ):
+            values = self.redis.hmget(f"{key}/files", positions)
+            if all(value is not None for value in values):
+                return [json.loads(value) for value in values]
+        return None
+
+    def set(self, key: str, index: ImpactedFilesIndex, files: List[dict]) -> None:
+        if not self.enabled:
+            return
+        with self.suppress_redis_errors(
+            "Error writing impacted files index to redis", key=key
+        ):
+            pipeline = self.redis.pipeline()
+            if files:
+                pipeline.hset(
+                    f"{key}/files",
+                    mapping={pos: json.dumps(data) for pos, data in enumerate(files)},
+                )
+                pipeline.expire(f"{key}/files", settings.IMPACTED_FILES_INDEX_TTL)
+            # the index is written last so that its files are there when it is
+            pipeline.set(
+                f"{key}/index",
+                zlib.compress(json.dumps(index.to_dict()).encode()),
+                ex=settings.IMPACTED_FILES_INDEX_TTL,
+            )
+            pipeline.execute()
+
+
+impacted_files_index_cache = ImpactedFilesIndexCache()
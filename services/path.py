@@ -1,8 +1,8 @@
 import re
 from collections import defaultdict
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from functools import cached_property
-from typing import Iterable, List, Optional, Union
+from typing import Callable, Iterable, List, Optional, Union
 
 import sentry_sdk
 from asgiref.sync import async_to_sync
@@ -70,9 +70,16 @@ class Dir(PathNode):
 
     full_path: str
     children: List[PathNode]
+    # totals already aggregated by a `PathTree`
+    precomputed_totals: Optional[ReportTotals] = field(
+        default=None, compare=False, repr=False
+    )
 
     @cached_property
     def totals(self):
+        if self.precomputed_totals is not None:
+            return self.precomputed_totals
+
         # A dir's totals are sum of its children's totals
         totals = ReportTotals.default_totals()
         for child in self.children:
@@ -117,6 +124,139 @@ class PrefixedPath:
             return name
 
 
+class PathTreeNode:
+    """
+    Node of a `PathTree`.  File nodes have no `children` and keep the `index`
+    of the file in the report so that listings preserve the report's ordering.
+    Totals are only computed when first needed: files get theirs from the
+    tree's totals function and directories sum up their children's.
+    """
+
+    __slots__ = ("full_path", "children", "index", "_get_totals", "_totals")
+
+    def __init__(
+        self,
+        full_path: str,
+        index: int = None,
+        get_totals: Callable[[str], Optional[ReportTotals]] = None,
+    ):
+        self.full_path = full_path
+        self.children = None if index is not None else {}
+        self.index = index
+        self._get_totals = get_totals
+        self._totals = None
+
+    @property
+    def is_file(self) -> bool:
+        return self.children is None
+
+    @property
+    def totals(self) -> ReportTotals:
+        if self._totals is not None:
+            return self._totals
+
+        if self.is_file:
+            # files without totals in the report count as empty
+            totals = self._get_totals(self.full_path)
+            if totals is None:
+                totals = ReportTotals.default_totals()
+        else:
+            totals = ReportTotals.default_totals()
+            for child in self.children.values():
+                totals.lines += child.totals.lines or 0
+                totals.hits += child.totals.hits or 0
+                totals.partials += child.totals.partials or 0
+                totals.misses += child.totals.misses or 0
+        self._totals = totals
+        return totals
+
+    def file_nodes(self) -> List["PathTreeNode"]:
+        """
+        All the file nodes under this node, in report order.
+        """
+        if self.is_file:
+            return [self]
+        nodes, stack = [], [self]
+        while stack:
+            node = stack.pop()
+            for child in node.children.values():
+                if child.is_file:
+                    nodes.append(child)
+                else:
+                    stack.append(child)
+        return sorted(nodes, key=lambda node: node.index)
+
+    def to_path_node(self) -> Union[File, Dir]:
+        if self.is_file:
+            return File(full_path=self.full_path, totals=self.totals)
+        return Dir(
+            full_path=self.full_path,
+            children=[child.to_path_node() for child in self.children.values()],
+            precomputed_totals=self.totals,
+        )
+
+
+class PathTree:
+    """
+    Prefix tree of the files in a report.  The totals of a directory are
+    aggregated the first time they are needed and kept on its node, so listing
+    a directory or getting its totals only costs time proportional to the
+    entries under it, and files outside of it are never looked at.
+
+    A file whose path is also a directory (e.g. `a` and `a/b`) is listed as a
+    child of that directory, keyed by `None`.
+    """
+
+    def __init__(
+        self,
+        files: Iterable[str],
+        totals: Callable[[str], Optional[ReportTotals]],
+    ):
+        self.root = PathTreeNode("")
+        for index, full_path in enumerate(files):
+            self._insert(PathTreeNode(full_path, index=index, get_totals=totals))
+
+    def _insert(self, file_node: PathTreeNode) -> None:
+        *dirnames, filename = file_node.full_path.split("/")
+        node = self.root
+        for depth, dirname in enumerate(dirnames):
+            child = node.children.get(dirname)
+            if child is None or child.is_file:
+                child = self._dir_node("/".join(dirnames[: depth + 1]), child)
+                node.children[dirname] = child
+            node = child
+
+        existing = node.children.get(filename)
+        if existing is not None and not existing.is_file:
+            existing.children[None] = file_node
+        else:
+            node.children[filename] = file_node
+
+    def _dir_node(
+        self, full_path: str, file_node: Optional[PathTreeNode]
+    ) -> PathTreeNode:
+        node = PathTreeNode(full_path)
+        if file_node is not None:
+            # a file already took the directory's name
+            node.children[None] = file_node
+        return node
+
+    def find(self, path: str) -> Optional[PathTreeNode]:
+        """
+        Returns the node for the given file or directory path, if any.
+        """
+        node = self.root
+        if not path:
+            return node
+        for name in path.split("/"):
+            if node.is_file:
+                return None
+            node = node.children.get(name)
+            if node is None:
+                return None
+        return node
+
+
 def is_subpath(full_path: str, subpath: str):
     if not subpath:
         return True
@@ -157,6 +297,7 @@ class ReportPaths:
         self.filter_flags = filter_flags
         self.filter_paths = filter_paths
         self.prefix = path or ""
+        self.search_term = search_term
 
         # Filter report if flags or paths exist
         if self.filter_flags or self.filter_paths:
@@ -164,19 +305,41 @@ class ReportPaths:
                 paths=self.filter_paths, flags=self.filter_flags
             )
 
-        self._paths = [
-            PrefixedPath(full_path=full_path, prefix=self.prefix)
-            for full_path in self.files
-            if is_subpath(full_path, self.prefix)
-        ]
+        prefix_node = self.tree.find(self.prefix)
+        self._nodes = prefix_node.file_nodes() if prefix_node else []
 
         if search_term:
-            self._paths = [
-                path
-                for path in self.paths
-                if search_term.lower() in path.relative_path.lower()
+            self._nodes = [
+                node
+                for node in self._nodes
+                if search_term.lower()
+                in PrefixedPath(node.full_path, self.prefix).relative_path.lower()
             ]
 
+        self._paths = [
+            PrefixedPath(full_path=node.full_path, prefix=self.prefix)
+            for node in self._nodes
+        ]
+
+    @cached_property
+    def tree(self) -> PathTree:
+        """
+        The prefix tree of the (filtered) report files.  Unfiltered reports
+        keep their tree around so it is only built once per report.
+        """
+        if self.filter_flags or self.filter_paths:
+            # filtered totals can't be shared - only index what's under the prefix
+            return PathTree(
+                [path for path in self.files if is_subpath(path, self.prefix)],
+                self._totals,
+            )
+
+        tree = getattr(self.report, "_path_tree", None)
+        if not isinstance(tree, PathTree):
+            tree = PathTree(self.files, self._totals)
+            self.report._path_tree = tree
+        return tree
+
     @cached_property
     def files(self) -> List[str]:
         # No filtering, just return files in Report
@@ -212,30 +375,36 @@ class ReportPaths:
         """
         Return a flat file list of all files under the specified `path` prefix/directory.
         """
-        return [
-            File(full_path=path.full_path, totals=self._totals(path))
-            for path in self.paths
-        ]
+        return [node.to_path_node() for node in self._nodes]
 
     @sentry_sdk.trace
     def single_directory(self) -> Iterable[Union[File, Dir]]:
         """
         Return a single directory (specified by `path`) of mixed file/directory results.
         """
-        return self._single_directory_recursive(self.paths)
-
-    def _totals(self, path: PrefixedPath) -> ReportTotals:
+        if self.search_term:
+            # directory totals only include the files matching the search
+            return self._single_directory_recursive(self.paths)
+
+        node = self.tree.find(self.prefix)
+        if node is None:
+            return []
+        if node.is_file:
+            return [node.to_path_node()]
+        return [child.to_path_node() for child in node.children.values()]
+
+    def _totals(self, full_path: str) -> ReportTotals:
         """
-        Returns the report totals for a given prefixed path.
+        Returns the report totals for a given file path.
         """
         # Fixes an issue when filtering by flags does not work in the case where
         # one flag covers half of the file and another flag covers another half.
         # Using get_file_totals will return the totals for coverage of all flags
         # applied to the file instead of just the filter flags being queried
         if self.filter_flags:
-            return self.report.get(path.full_path).totals
+            return self.report.get(full_path).totals
         else:
-            return self.report.get_file_totals(path.full_path)
+            return self.report.get_file_totals(full_path)
 
     def _single_directory_recursive(
         self, paths: Iterable[PrefixedPath]
@@ -251,7 +420,7 @@ class ReportPaths:
             if len(paths) == 1 and paths[0].is_file:
                 path = paths[0]
                 results.append(
-                    File(full_path=path.full_path, totals=self._totals(path))
+                    File(full_path=path.full_path, totals=self._totals(path.full_path))
                 )
             else:
                 children = self._single_directory_recursive(
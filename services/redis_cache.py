@@ -0,0 +1,47 @@
+import logging
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from django.conf import settings
+from redis.exceptions import RedisError
+
+from services.redis_configuration import get_redis_connection
+
+
+class RedisCache:
+    """
+    Base of the caches and stores kept in redis.  The connection is only opened
+    when first used, and the cache is turned on by the setting named by
+    `enabled_setting` (caches without one are always on).
+
+    Redis is never the source of truth of these caches, so their redis calls
+    go in `suppress_redis_errors` blocks: errors are logged (to the logger of
+    the subclass' module) and the caller carries on as if the data was missing.
+    """
+
+    enabled_setting: Optional[str] = None
+
+    _redis = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.enabled_setting is None or getattr(settings, self.enabled_setting)
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_redis_connection()
+        return self._redis
+
+    @contextmanager
+    def suppress_redis_errors(self, message: str, **extra) -> Iterator[None]:
+        """
+        Logs and swallows the redis errors raised in the block.  A `return` in
+        the block is skipped on error, so what follows the block is the fallback.
+        """
+        try:
+            yield
+        except RedisError as e:
+            logging.getLogger(type(self).__module__).warning(
+                message, extra=dict(extra, error=str(e))
+            )
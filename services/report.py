@@ -1,24 +1,38 @@
 import logging
+import zlib
+from collections import defaultdict
+from collections.abc import Iterable, MutableSequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from typing import List, Optional
 
 import sentry_sdk
 from django.conf import settings
 from django.db.models import Prefetch, Q
 from django.utils.functional import cached_property
+from minio.error import S3Error
 from shared.helpers.flag import Flag
 from shared.reports.readonly import ReadOnlyReport as SharedReadOnlyReport
-from shared.reports.resources import Report
+from shared.reports.resources import END_OF_CHUNK, Report
 from shared.reports.types import ReportFileSummary, ReportTotals
 from shared.storage.exceptions import FileNotInStorageError
 from shared.utils.sessions import Session, SessionType
+from urllib3.exceptions import HTTPError
 
 from core.models import Commit
 from reports.models import AbstractTotals, CommitReport, ReportDetails, ReportSession
-from services.archive import ArchiveService
+from services.archive import END_OF_HEADER, ArchiveService
+from services.report_cache import report_chunks_cache
 from utils.config import RUN_ENV
 
 log = logging.getLogger(__name__)
 
+# maximum number of reports whose chunks are fetched from storage at once
+REPORT_FETCH_CONCURRENCY = 8
+
+# ranged reads of the chunks of a report before the rest are read all at once
+MAX_RANGED_READS = 8
+
 
 class ReportMixin:
     def file_reports(self):
@@ -51,22 +65,179 @@ class ReadOnlyReport(ReportMixin, SharedReadOnlyReport):
     pass
 
 
+class LazyChunks(MutableSequence):
+    """
+    Sequence of report chunks backed by the raw `chunks.txt` contents.
+
+    Instead of splitting the whole archive up front, the boundaries of every
+    chunk are indexed on first access and a chunk is only sliced out of the raw
+    contents when its `file_index` is requested.  Looking up a single file
+    therefore only costs memory proportional to that file's chunk.
+    """
+
+    def __init__(self, raw: str):
+        self._raw = raw
+        self._offsets = None
+        # chunks replaced by the report (i.e. bound `ReportFile`s)
+        self._replaced = {}
+        # set once the sequence is structurally modified
+        self._materialized = None
+
+    @property
+    def offsets(self) -> list[tuple[int, int]]:
+        if self._offsets is None:
+            offsets, start = [], 0
+            while True:
+                end = self._raw.find(END_OF_CHUNK, start)
+                if end == -1:
+                    offsets.append((start, len(self._raw)))
+                    break
+                offsets.append((start, end))
+                start = end + len(END_OF_CHUNK)
+            self._offsets = offsets
+        return self._offsets
+
+    def _materialize(self) -> list:
+        if self._materialized is None:
+            self._materialized = [self[i] for i in range(len(self))]
+            self._raw, self._offsets, self._replaced = "", [], {}
+        return self._materialized
+
+    def __len__(self):
+        if self._materialized is not None:
+            return len(self._materialized)
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        if self._materialized is not None:
+            return self._materialized[index]
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("chunk index out of range")
+        if index in self._replaced:
+            return self._replaced[index]
+        return self._chunk(index)
+
+    def _chunk(self, index: int) -> str:
+        start, end = self.offsets[index]
+        return self._raw[start:end]
+
+    def __setitem__(self, index, value):
+        if self._materialized is not None or isinstance(index, slice):
+            self._materialize()[index] = value
+            return
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("chunk assignment index out of range")
+        self._replaced[index] = value
+
+    def __delitem__(self, index):
+        del self._materialize()[index]
+
+    def insert(self, index, value):
+        self._materialize().insert(index, value)
+
+
+class RangedChunks(LazyChunks):
+    """
+    `LazyChunks` read from archive storage as they are accessed, through ranged
+    reads of `chunks.txt` located by its sidecar index (see
+    `ArchiveService.read_chunk_range`).
+
+    Once `MAX_RANGED_READS` reads were made the remaining chunks are read at
+    once, as a report accessing that many files is likely to access them all.
+    """
+
+    def __init__(self, archive_service: ArchiveService, commit_sha: str, index):
+        super().__init__("")
+        self._archive_service = archive_service
+        self._commit_sha = commit_sha
+        self._index = index
+        self._offsets = index["offsets"]
+        self._fetched = {}
+        self._reads = 0
+
+    def _fetch(self, indexes: Iterable[int]) -> None:
+        missing = [index for index in indexes if index not in self._fetched]
+        if not missing:
+            return
+        self._reads += 1
+        chunks = self._archive_service.read_chunk_range(
+            self._commit_sha, missing, index=self._index
+        )
+        if len(chunks) > len(missing):
+            # the whole file was read instead, which a stale index may not match
+            self._offsets = [None] * len(chunks)
+        self._fetched.update(chunks)
+
+    def _chunk(self, index: int) -> str:
+        if index not in self._fetched:
+            if self._reads < MAX_RANGED_READS:
+                self._fetch([index])
+            else:
+                self._fetch(range(len(self)))
+        return self._fetched.get(index, "")
+
+    def _materialize(self) -> list:
+        if self._materialized is None:
+            self._fetch(range(len(self)))
+        return super()._materialize()
+
+
 @sentry_sdk.trace
-def build_report(chunks, files, sessions, totals, report_class=None):
+def build_report(chunks, files, sessions, totals, report_class=None, lazy=False):
+    """
+    Builds a report of the given class from its chunks, files, sessions and totals.
+
+    When `lazy` is set the chunks are wrapped in `LazyChunks` so that only the
+    chunks of the files actually accessed are ever split out of the archive.
+    This is only supported for Python `Report`s - `ReadOnlyReport` hands the
+    chunks over to its Rust parser as a whole.
+    """
     if report_class is None:
         report_class = SerializableReport
-    return report_class.from_chunks(
-        chunks=chunks, files=files, sessions=sessions, totals=totals
+    if not lazy:
+        return report_class.from_chunks(
+            chunks=chunks, files=files, sessions=sessions, totals=totals
+        )
+
+    if issubclass(report_class, SharedReadOnlyReport):
+        raise ValueError("Lazy chunks are not supported for read-only reports")
+
+    header = ""
+    if chunks.startswith("{") and END_OF_HEADER in chunks:
+        header, chunks = chunks.split(END_OF_HEADER, 1)
+        header += END_OF_HEADER
+    report = report_class.from_chunks(
+        chunks=header, files=files, sessions=sessions, totals=totals
     )
+    report._chunks = LazyChunks(chunks)
+    return report
 
 
-@sentry_sdk.trace
-def build_report_from_commit(commit: Commit, report_class=None):
+@dataclass
+class ReportSource:
+    """
+    Everything needed to build the report of a commit: the chunks fetched from
+    archive storage along with the files, sessions and totals from the database.
     """
-    Builds a `shared.reports.resources.Report` from a given commit.
 
-    Chunks are fetched from archive storage and the rest of the data is sourced
-    from various `reports_*` tables in the database.
+    commit: Commit
+    chunks: str
+    files: dict
+    sessions: dict
+    totals: Optional[ReportTotals]
+    version: Optional[str]
+
+
+def _fetch_report_metadata(commit: Commit) -> Optional[tuple]:
+    """
+    Returns the `(files, sessions, totals, version)` of the given commit's report
+    or `None` if the commit has no report.
     """
 
     # TODO: this can be removed once confirmed working well on prod
@@ -94,20 +265,181 @@ def build_report_from_commit(commit: Commit, report_class=None):
             sessions = commit.report["sessions"]
             totals = commit.totals
 
+    return files, sessions, totals, chunks_version(commit, commit_report)
+
+
+def _fetch_chunks(
+    commit: Commit,
+    version: Optional[str],
+    archive_service: Optional[ArchiveService] = None,
+) -> str:
+    def fetch():
+        service = archive_service or ArchiveService(commit.repository)
+        return service.read_chunks(commit.commitid)
+
+    with sentry_sdk.start_span(description="Fetch chunks"):
+        return report_chunks_cache.get_or_fetch(
+            commit.repository_id, commit.commitid, version, fetch
+        )
+
+
+def _log_missing_chunks(commit: Commit) -> None:
+    log.warning(
+        "File for chunks not found in storage",
+        extra=dict(
+            commit=commit.commitid,
+            repo=commit.repository_id,
+        ),
+    )
+
+
+def build_report_from_source(
+    source: ReportSource, report_class=None, lazy=False
+) -> Report:
+    """
+    Builds a report from a `ReportSource` (see `fetch_report_sources`).  A new
+    report is returned every time so callers are free to modify it.
+    """
+    report = build_report(
+        source.chunks,
+        source.files,
+        source.sessions,
+        source.totals,
+        report_class=report_class,
+        lazy=lazy,
+    )
+    if source.version is not None:
+        # lets data derived from the report be cached alongside its chunks
+        report._report_cache_key = (
+            source.commit.repository_id,
+            source.commit.commitid,
+            source.version,
+        )
+    return report
+
+
+@sentry_sdk.trace
+def build_report_from_commit(commit: Commit, report_class=None, lazy=False):
+    """
+    Builds a `shared.reports.resources.Report` from a given commit.
+
+    Chunks are fetched from archive storage and the rest of the data is sourced
+    from various `reports_*` tables in the database.  See `build_report` for the
+    `lazy` mode.
+    """
+    metadata = _fetch_report_metadata(commit)
+    if metadata is None:
+        return None
+
+    files, sessions, totals, version = metadata
+    if lazy and settings.REPORT_CHUNKS_RANGE_READS_ENABLED:
+        report = _build_ranged_report(
+            commit, files, sessions, totals, version, report_class=report_class
+        )
+        if report is not None:
+            return report
+
     try:
-        with sentry_sdk.start_span(description="Fetch chunks"):
-            chunks = ArchiveService(commit.repository).read_chunks(commit.commitid)
-        return build_report(chunks, files, sessions, totals, report_class=report_class)
+        chunks = _fetch_chunks(commit, version)
     except FileNotInStorageError:
-        log.warning(
-            "File for chunks not found in storage",
-            extra=dict(
-                commit=commit.commitid,
-                repo=commit.repository_id,
-            ),
-        )
+        _log_missing_chunks(commit)
+        return None
+
+    source = ReportSource(commit, chunks, files, sessions, totals, version)
+    return build_report_from_source(source, report_class=report_class, lazy=lazy)
+
+
+def _build_ranged_report(
+    commit: Commit,
+    files: dict,
+    sessions: dict,
+    totals: Optional[ReportTotals],
+    version: Optional[str],
+    report_class=None,
+) -> Optional[Report]:
+    """
+    Builds a lazy report whose chunks are read from storage as they are accessed
+    (see `RangedChunks`), or returns `None` when the chunks are cached or have
+    no sidecar index to locate them with.
+    """
+    if report_chunks_cache.get(commit.repository_id, commit.commitid, version):
         return None
 
+    archive_service = ArchiveService(commit.repository)
+    index = archive_service.read_chunks_index(commit.commitid)
+    if index is None:
+        return None
+
+    source = ReportSource(commit, index["header"], files, sessions, totals, version)
+    report = build_report_from_source(source, report_class=report_class, lazy=True)
+    report._chunks = RangedChunks(archive_service, commit.commitid, index)
+    return report
+
+
+@sentry_sdk.trace
+def fetch_report_sources(commits: Iterable[Commit]) -> dict[str, ReportSource]:
+    """
+    Fetches what is needed to build the reports of many commits at once (see
+    `build_report_from_source`), keyed by commitid.
+
+    Commits are deduplicated and the chunks of every report are fetched from
+    storage concurrently.  Commits without a report, or whose chunks could not be
+    fetched, are left out of the result.
+    """
+    commits = list({commit.commitid: commit for commit in commits}.values())
+
+    # database access stays on the calling thread
+    pending, archive_services = [], {}
+    for commit in commits:
+        metadata = _fetch_report_metadata(commit)
+        if metadata is None:
+            continue
+        if commit.repository_id not in archive_services:
+            archive_services[commit.repository_id] = ArchiveService(commit.repository)
+        pending.append((commit, metadata, archive_services[commit.repository_id]))
+    if not pending:
+        return {}
+
+    def fetch(item):
+        commit, (files, sessions, totals, version), archive_service = item
+        try:
+            chunks = _fetch_chunks(commit, version, archive_service)
+        except FileNotInStorageError:
+            _log_missing_chunks(commit)
+            return None
+        except (S3Error, HTTPError, UnicodeDecodeError, zlib.error):
+            log.warning(
+                "Error fetching report chunks",
+                extra=dict(commit=commit.commitid, repo=commit.repository_id),
+                exc_info=True,
+            )
+            return None
+        return ReportSource(commit, chunks, files, sessions, totals, version)
+
+    max_workers = min(len(pending), REPORT_FETCH_CONCURRENCY)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        sources = executor.map(fetch, pending)
+
+    return {source.commit.commitid: source for source in sources if source is not None}
+
+
+def chunks_version(
+    commit: Commit, commit_report: Optional[CommitReport]
+) -> Optional[str]:
+    """
+    Returns a marker that changes whenever the chunks for the given commit are
+    rewritten.  The worker updates the report details alongside the chunks, with
+    the commit itself as the fallback for reports that predate report details.
+    """
+    if commit_report is not None:
+        try:
+            return commit_report.reportdetails.updated_at.isoformat()
+        except CommitReport.reportdetails.RelatedObjectDoesNotExist:
+            pass
+    if commit.updatestamp is not None:
+        return commit.updatestamp.isoformat()
+    return None
+
 
 def fetch_commit_report(commit: Commit) -> Optional[CommitReport]:
     """
@@ -255,18 +587,88 @@ def sessions_with_specific_flags(
     return dict(sessions)
 
 
+def session_files_index(commit_report: Report) -> dict[int, set[int]]:
+    """
+    Returns a mapping of session id -> positions (in `commit_report.files`) of the
+    files that have coverage from that session.
+
+    Building this requires scanning every line of the report, so the index is
+    kept on the report and, for reports built by `build_report_from_commit`, in
+    the report cache next to the chunks.
+    """
+    index = getattr(commit_report, "_session_files_index", None)
+    if isinstance(index, dict):
+        return index
+
+    cache_key = getattr(commit_report, "_report_cache_key", None)
+    if not isinstance(cache_key, tuple):
+        cache_key = None
+
+    cached = None
+    if cache_key is not None:
+        cached = report_chunks_cache.get_extra(*cache_key, "session_files")
+
+    if cached is not None:
+        index = {
+            int(session_id): set(positions) for session_id, positions in cached.items()
+        }
+    else:
+        index = defaultdict(set)
+        for position, filename in enumerate(commit_report.files):
+            for line in commit_report.get(filename):
+                if line:
+                    for session in line.sessions:
+                        index[session.id].add(position)
+        index = dict(index)
+        if cache_key is not None:
+            report_chunks_cache.set_extra(
+                *cache_key,
+                "session_files",
+                {
+                    session_id: sorted(positions)
+                    for session_id, positions in index.items()
+                },
+            )
+
+    commit_report._session_files_index = index
+    return index
+
+
+def _has_session_files_index(commit_report: Report) -> bool:
+    """
+    Whether `session_files_index` is worth using for the given report: building
+    it scans every line, which only pays off when it's already built or can be
+    cached for later requests.
+    """
+    if isinstance(getattr(commit_report, "_session_files_index", None), dict):
+        return True
+    cache_key = getattr(commit_report, "_report_cache_key", None)
+    return isinstance(cache_key, tuple) and report_chunks_cache.enabled
+
+
 def files_in_sessions(commit_report: Report, session_ids: List[int]) -> List[str]:
-    files, session_ids = [], set(session_ids)
-    for file in commit_report:
-        found = False
-        for line in file:
-            if line:
-                for session in line.sessions:
-                    if session.id in session_ids:
-                        found = True
-                        break
+    if not _has_session_files_index(commit_report):
+        files, session_ids = [], set(session_ids)
+        for file in commit_report:
+            found = False
+            for line in file:
+                if line:
+                    for session in line.sessions:
+                        if session.id in session_ids:
+                            found = True
+                            break
+                if found:
+                    break
             if found:
-                break
-        if found:
-            files.append(file.name)
-    return files
+                files.append(file.name)
+        return files
+
+    index = session_files_index(commit_report)
+    positions = set()
+    for session_id in session_ids:
+        positions |= index.get(session_id, set())
+    return [
+        filename
+        for position, filename in enumerate(commit_report.files)
+        if position in positions
+    ]
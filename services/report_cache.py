@@ -0,0 +1,197 @@
+import json
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+from django.conf import settings
+
+from services.redis_cache import RedisCache
+
+
+class LRUByteCache:
+    """
+    A thread-safe, process-local LRU cache of strings bounded by their total size
+    rather than by the number of entries.  Sizes are approximated by the length
+    of each value.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries: OrderedDict[tuple, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[str]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: tuple, value: str) -> None:
+        size = len(value)
+        if size > self.max_bytes:
+            # a single entry this large would evict everything else
+            return
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= len(self._entries.pop(key))
+            self._entries[key] = value
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= len(evicted)
+
+    def delete_matching(self, predicate: Callable[[tuple], bool]) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                self.current_bytes -= len(self._entries.pop(key))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+
+class ReportChunksCache(RedisCache):
+    """
+    Two-tier cache for the `chunks.txt` contents of commit reports.
+
+    Entries are keyed by `(repoid, commitid, version)` where `version` changes
+    whenever the worker rewrites the report (we use the `updated_at` of the
+    report details for that).  The first tier is a process-local LRU bounded by
+    `settings.REPORT_CACHE_MEMORY_LIMIT`, the second tier is a Redis hash per
+    commit holding the zlib-compressed chunks of the latest version only, along
+    with any data derived from them (see `set_extra`).
+    """
+
+    enabled_setting = "REPORT_CACHE_ENABLED"
+
+    def __init__(self):
+        self._memory = None
+
+    @property
+    def memory(self) -> LRUByteCache:
+        if self._memory is None:
+            self._memory = LRUByteCache(settings.REPORT_CACHE_MEMORY_LIMIT)
+        return self._memory
+
+    def _redis_key(self, repoid: int, commitid: str) -> str:
+        return f"report_chunks/{repoid}/{commitid}"
+
+    def get_or_fetch(
+        self,
+        repoid: int,
+        commitid: str,
+        version: Optional[str],
+        fetch: Callable[[], str],
+    ) -> str:
+        """
+        Returns the cached chunks for the given commit report version, calling
+        `fetch` (and populating both tiers) on a miss.
+        """
+        if not self.enabled or version is None:
+            return fetch()
+
+        chunks = self.get(repoid, commitid, version)
+        if chunks is None:
+            chunks = fetch()
+            self._set_in_redis(repoid, commitid, version, chunks)
+            self.memory.set((repoid, commitid, version), chunks)
+        return chunks
+
+    def get(self, repoid: int, commitid: str, version: Optional[str]) -> Optional[str]:
+        """
+        Returns the cached chunks for the given commit report version, if any.
+        """
+        if not self.enabled or version is None:
+            return None
+
+        key = (repoid, commitid, version)
+        chunks = self.memory.get(key)
+        if chunks is None:
+            chunks = self._get_from_redis(repoid, commitid, version)
+            if chunks is not None:
+                self.memory.set(key, chunks)
+        return chunks
+
+    def invalidate(self, repoid: int, commitid: str) -> None:
+        """
+        Drops every cached version of the chunks for the given commit.
+        """
+        if not self.enabled:
+            return
+
+        self.memory.delete_matching(lambda key: key[:2] == (repoid, commitid))
+        with self.suppress_redis_errors(
+            "Error invalidating report chunks in redis",
+            repoid=repoid,
+            commitid=commitid,
+        ):
+            self.redis.delete(self._redis_key(repoid, commitid))
+
+    def get_extra(
+        self, repoid: int, commitid: str, version: str, name: str
+    ) -> Optional[Any]:
+        """
+        Returns data derived from the chunks of the given report version (e.g.
+        indexes), stored next to the chunks with `set_extra`.
+        """
+        if not self.enabled:
+            return None
+        compressed = self._hget(repoid, commitid, f"{version}/{name}")
+        if compressed is None:
+            return None
+        return json.loads(zlib.decompress(compressed))
+
+    def set_extra(
+        self, repoid: int, commitid: str, version: str, name: str, data: Any
+    ) -> None:
+        if not self.enabled:
+            return
+        key = self._redis_key(repoid, commitid)
+        with self.suppress_redis_errors(
+            "Error writing report data to redis",
+            repoid=repoid,
+            commitid=commitid,
+            data_name=name,
+        ):
+            pipeline = self.redis.pipeline()
+            pipeline.hset(
+                key, f"{version}/{name}", zlib.compress(json.dumps(data).encode())
+            )
+            pipeline.expire(key, settings.REPORT_CACHE_REDIS_TTL)
+            pipeline.execute()
+
+    def _hget(self, repoid: int, commitid: str, field: str) -> Optional[bytes]:
+        with self.suppress_redis_errors(
+            "Error reading report chunks from redis", repoid=repoid, commitid=commitid
+        ):
+            return self.redis.hget(self._redis_key(repoid, commitid), field)
+        return None
+
+    def _get_from_redis(
+        self, repoid: int, commitid: str, version: str
+    ) -> Optional[str]:
+        compressed = self._hget(repoid, commitid, version)
+        if compressed is None:
+            return None
+        return zlib.decompress(compressed).decode()
+
+    def _set_in_redis(
+        self, repoid: int, commitid: str, version: str, chunks: str
+    ) -> None:
+        key = self._redis_key(repoid, commitid)
+        with self.suppress_redis_errors(
+            "Error writing report chunks to redis", repoid=repoid, commitid=commitid
+        ):
+            # only the latest version is kept - older ones can never be hit again
+            pipeline = self.redis.pipeline()
+            pipeline.delete(key)
+            pipeline.hset(key, version, zlib.compress(chunks.encode()))
+            pipeline.expire(key, settings.REPORT_CACHE_REDIS_TTL)
+            pipeline.execute()
+
+
+report_chunks_cache = ReportChunksCache()
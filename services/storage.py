@@ -1,6 +1,8 @@
 import logging
 from datetime import timedelta
 
+from minio.error import S3Error
+from shared.storage.exceptions import FileNotInStorageError
 from shared.storage.minio import MinioStorageService
 
 from utils.config import get_config
@@ -54,3 +56,29 @@ class StorageService(MinioStorageService):
     def create_presigned_get(self, bucket, path, expires):
         expires = timedelta(seconds=expires)
         return self.minio_client.presigned_get_object(bucket, path, expires)
+
+    def read_file_range(self, bucket, path, offset, length):
+        """
+        Reads `length` bytes of the object at `path` starting at `offset` through
+        a single ranged GET.  Returns the bytes along with the total size of the
+        object (taken from the `Content-Range` header) so callers can detect an
+        object that changed since they computed their offsets.
+        """
+        try:
+            response = self.minio_client.get_object(
+                bucket, path, offset=offset, length=length
+            )
+        except S3Error as e:
+            if e.code == "NoSuchKey":
+                raise FileNotInStorageError(f"File {path} does not exist in {bucket}")
+            raise e
+        try:
+            if response.headers.get("Content-Encoding") == "gzip":
+                # ranges of a compressed object can't be decompressed on their own
+                raise ValueError(f"Cannot range-read gzipped file {path}")
+            content_range = response.headers.get("Content-Range", "")
+            total_size = content_range.rsplit("/", 1)[-1]
+            return response.read(), int(total_size) if total_size.isdigit() else None
+        finally:
+            response.close()
+            response.release_conn()
@@ -0,0 +1,294 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+from celery import Celery, signature
+from celery.canvas import Signature
+from django.conf import settings
+from prometheus_client import Counter, Gauge, Histogram
+
+log = logging.getLogger(__name__)
+
+TASK_PUBLISHER_QUEUE_DEPTH = Gauge(
+    "api_task_publisher_queue_depth",
+    "Number of task messages waiting to be published to the broker",
+    multiprocess_mode="livesum",
+)
+
+TASK_PUBLISHER_LATENCY = Histogram(
+    "api_task_publisher_publish_seconds",
+    "Time in seconds between a task message being enqueued and published",
+    buckets=[0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30],
+)
+
+TASK_PUBLISHER_FAILURES = Counter(
+    "api_task_publisher_failures",
+    "Number of task messages that could not be published and were spooled to disk",
+)
+
+
+@dataclass(eq=False)
+class PendingTask:
+    signature: Signature
+    options: dict
+    enqueued_at: float = field(default_factory=time.monotonic)
+    on_spool: Optional[Callable[[], None]] = None
+
+
+class TaskPublisher:
+    """
+    Publishes task messages to the broker from a background thread, so that
+    broker latency doesn't add to the response time of the request enqueuing
+    them.
+
+    Messages are kept in a bounded in-process buffer and published in batches
+    over a single producer connection.  When the buffer is full, the message is
+    published from the calling thread instead (back-pressure).  Messages that
+    can't be published after `settings.TASK_PUBLISHER_MAX_RETRIES` retries are
+    appended to a spool file in `settings.TASK_PUBLISHER_SPOOL_DIR`, which any
+    process replays every `settings.TASK_PUBLISHER_SPOOL_REPLAY_INTERVAL` seconds.
+
+    A `countdown` is converted to an `eta` when the message is enqueued so that
+    the time spent buffered or spooled doesn't delay the task further.
+    """
+
+    def __init__(self, app: Celery):
+        self.app = app
+        self._lock = threading.Lock()
+        self._spool_lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._thread = None
+
+    @property
+    def enabled(self) -> bool:
+        return settings.TASK_PUBLISHER_ENABLED
+
+    def publish(
+        self, sig: Signature, on_spool: Optional[Callable[[], None]] = None, **options
+    ):
+        """
+        Publishes the task message, returning its `AsyncResult` only when it was
+        published synchronously.  `on_spool` is called if the message ends up
+        spooled, as it will then only be published once the spool is replayed.
+        """
+        if not self.enabled:
+            return sig.apply_async(**options)
+
+        countdown = options.pop("countdown", None)
+        if countdown:
+            options["eta"] = datetime.now(timezone.utc) + timedelta(seconds=countdown)
+
+        task = PendingTask(signature=sig, options=options, on_spool=on_spool)
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(task)
+        except queue.Full:
+            log.warning(
+                "Task publisher buffer is full, publishing synchronously",
+                extra=dict(task_name=sig.task),
+            )
+            self._publish_batch([task])
+        TASK_PUBLISHER_QUEUE_DEPTH.set(self._queue.qsize())
+        return None
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits for the buffered messages to be published (or spooled), returning
+        whether they all were within `timeout` seconds.
+        """
+        if self._queue is None or self._pid != os.getpid():
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _ensure_started(self) -> None:
+        # forked processes (e.g. gunicorn workers) don't inherit the thread
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=settings.TASK_PUBLISHER_MAX_SIZE)
+            self._thread = threading.Thread(
+                target=self._run, name="task-publisher", daemon=True
+            )
+            self._thread.start()
+            if self._pid is None:
+                atexit.register(self._shutdown)
+            self._pid = os.getpid()
+
+    def _shutdown(self) -> None:
+        if self.flush(timeout=settings.TASK_PUBLISHER_SHUTDOWN_TIMEOUT):
+            return
+        # the publisher thread is a daemon: spool what it didn't get to
+        while True:
+            try:
+                self._spool(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+    def _run(self) -> None:
+        task_queue = self._queue
+        next_replay = time.monotonic()
+        while True:
+            # the spool is replayed on a timer so a busy buffer doesn't hold it up
+            if time.monotonic() >= next_replay:
+                try:
+                    self._replay_spool()
+                except Exception:
+                    log.exception("Unexpected error replaying spooled tasks")
+                next_replay = (
+                    time.monotonic() + settings.TASK_PUBLISHER_SPOOL_REPLAY_INTERVAL
+                )
+
+            try:
+                batch = [task_queue.get(timeout=max(next_replay - time.monotonic(), 0))]
+            except queue.Empty:
+                continue
+
+            while len(batch) < settings.TASK_PUBLISHER_BATCH_SIZE:
+                try:
+                    batch.append(task_queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                self._publish_batch(batch)
+            except Exception:
+                log.exception("Unexpected error publishing tasks")
+            finally:
+                for _ in batch:
+                    task_queue.task_done()
+                TASK_PUBLISHER_QUEUE_DEPTH.set(task_queue.qsize())
+
+    def _publish_batch(self, batch: list[PendingTask]) -> None:
+        remaining = batch
+        for attempt in range(settings.TASK_PUBLISHER_MAX_RETRIES + 1):
+            if attempt > 0:
+                # exponential backoff with jitter so that processes don't retry
+                # against a recovering broker in lockstep
+                delay = settings.TASK_PUBLISHER_RETRY_BACKOFF * 2 ** (attempt - 1)
+                time.sleep(delay * random.uniform(0.5, 1.5))
+
+            published, failed = [], []
+            try:
+                with self.app.producer_or_acquire() as producer:
+                    for task in remaining:
+                        try:
+                            task.signature.apply_async(
+                                producer=producer, **task.options
+                            )
+                            published.append(task)
+                            TASK_PUBLISHER_LATENCY.observe(
+                                time.monotonic() - task.enqueued_at
+                            )
+                        except Exception as e:
+                            log.warning(
+                                "Error publishing task",
+                                extra=dict(
+                                    task_name=task.signature.task,
+                                    attempt=attempt,
+                                    error=str(e),
+                                ),
+                            )
+                            failed.append(task)
+            except Exception as e:
+                log.warning(
+                    "Error connecting to the broker",
+                    extra=dict(attempt=attempt, error=str(e)),
+                )
+                failed = [task for task in remaining if task not in published]
+
+            if not failed:
+                return
+            remaining = failed
+
+        for task in remaining:
+            self._spool(task)
+
+    def _spool(self, task: PendingTask) -> None:
+        TASK_PUBLISHER_FAILURES.inc()
+        if task.on_spool is not None:
+            try:
+                task.on_spool()
+            except Exception:
+                log.exception(
+                    "Error running spool callback",
+                    extra=dict(task_name=task.signature.task),
+                )
+
+        options = dict(task.options)
+        if isinstance(options.get("eta"), datetime):
+            options["eta"] = options["eta"].isoformat()
+        line = json.dumps(dict(signature=dict(task.signature), options=options))
+
+        spool_dir = settings.TASK_PUBLISHER_SPOOL_DIR
+        try:
+            os.makedirs(spool_dir, exist_ok=True)
+            with self._spool_lock:
+                path = os.path.join(spool_dir, f"{os.getpid()}.jsonl")
+                with open(path, "a") as spool:
+                    spool.write(line + "\n")
+        except (OSError, TypeError, ValueError) as e:
+            log.error(
+                "Error spooling task, task is lost",
+                extra=dict(task_name=task.signature.task, error=str(e)),
+            )
+
+    def _replay_spool(self) -> None:
+        spool_dir = settings.TASK_PUBLISHER_SPOOL_DIR
+        try:
+            filenames = [
+                filename
+                for filename in os.listdir(spool_dir)
+                if filename.endswith(".jsonl")
+            ]
+        except FileNotFoundError:
+            return
+
+        for filename in filenames:
+            # claim the file, in case another process is replaying it too
+            claimed = os.path.join(spool_dir, f"{filename}.{os.getpid()}.replaying")
+            try:
+                os.rename(os.path.join(spool_dir, filename), claimed)
+            except FileNotFoundError:
+                continue
+
+            try:
+                with open(claimed) as spool:
+                    tasks = [self._load_spooled(line) for line in spool if line.strip()]
+                log.info(
+                    "Replaying spooled tasks",
+                    extra=dict(count=len(tasks), spool=filename),
+                )
+                # tasks that still can't be published are spooled again
+                self._publish_batch(tasks)
+            except Exception:
+                # hand the file back to the next replay, under a new name as
+                # `filename` may have been spooled to again in the meantime
+                os.rename(claimed, os.path.join(spool_dir, f"{uuid.uuid4()}.jsonl"))
+                raise
+            os.remove(claimed)
+
+    def _load_spooled(self, line: str) -> PendingTask:
+        data = json.loads(line)
+        options = data["options"]
+        if options.get("eta"):
+            options["eta"] = datetime.fromisoformat(options["eta"])
+        return PendingTask(
+            signature=signature(data["signature"], app=self.app), options=options
+        )
@@ -12,12 +12,15 @@ from sentry_sdk.integrations.celery import _wrap_apply_async
 from shared import celery_config
 
 from core.models import Repository
+from services.task.publisher import TaskPublisher
 from services.task.task_router import route_task
 from timeseries.models import Dataset, MeasurementName
 
 celery_app = Celery("tasks")
 celery_app.config_from_object("shared.celery_config:BaseCeleryConfig")
 
+task_publisher = TaskPublisher(celery_app)
+
 log = logging.getLogger(__name__)
 
 if settings.SENTRY_ENV:
@@ -64,10 +67,12 @@ class TaskService(object):
         ).apply_async(**apply_async_kwargs)
 
     def compute_comparison(self, comparison_id):
-        self._create_signature(
-            celery_config.compute_comparison_task_name,
-            kwargs=dict(comparison_id=comparison_id),
-        ).apply_async()
+        task_publisher.publish(
+            self._create_signature(
+                celery_config.compute_comparison_task_name,
+                kwargs=dict(comparison_id=comparison_id),
+            )
+        )
 
     def compute_comparisons(self, comparison_ids: List[int]):
         """
@@ -104,7 +109,7 @@ class TaskService(object):
                     "Triggering compute comparison task",
                     extra=dict(comparison_id=comparison_id),
                 )
-            group(signatures).apply_async()
+            task_publisher.publish(group(signatures))
 
     def normalize_profiling_upload(self, profiling_upload_id):
         return self._create_signature(
@@ -119,15 +124,17 @@ class TaskService(object):
         ).apply_async()
 
     def status_set_pending(self, repoid, commitid, branch, on_a_pull_request):
-        self._create_signature(
-            "app.tasks.status.SetPending",
-            kwargs=dict(
-                repoid=repoid,
-                commitid=commitid,
-                branch=branch,
-                on_a_pull_request=on_a_pull_request,
-            ),
-        ).apply_async()
+        task_publisher.publish(
+            self._create_signature(
+                "app.tasks.status.SetPending",
+                kwargs=dict(
+                    repoid=repoid,
+                    commitid=commitid,
+                    branch=branch,
+                    on_a_pull_request=on_a_pull_request,
+                ),
+            )
+        )
 
     def upload_signature(
         self,
@@ -171,6 +178,30 @@ class TaskService(object):
             rebuild=rebuild,
         ).apply_async(countdown=countdown)
 
+    def publish_upload(
+        self,
+        repoid,
+        commitid,
+        report_type=None,
+        report_code=None,
+        countdown=0,
+        on_spool=None,
+    ):
+        """
+        Like `upload`, but publishes the task through the `task_publisher` so
+        that the caller doesn't wait on the broker.  Nothing is returned.
+        """
+        task_publisher.publish(
+            self.upload_signature(
+                repoid,
+                commitid,
+                report_type=report_type,
+                report_code=report_code,
+            ),
+            on_spool=on_spool,
+            countdown=countdown,
+        )
+
     def notify_signature(self, repoid, commitid, current_yaml=None, empty_upload=None):
         return self._create_signature(
             "app.tasks.notify.Notify",
@@ -183,14 +214,18 @@ class TaskService(object):
         )
 
     def notify(self, repoid, commitid, current_yaml=None, empty_upload=None):
-        self.notify_signature(
-            repoid, commitid, current_yaml=current_yaml, empty_upload=empty_upload
-        ).apply_async()
+        task_publisher.publish(
+            self.notify_signature(
+                repoid, commitid, current_yaml=current_yaml, empty_upload=empty_upload
+            )
+        )
 
     def pulls_sync(self, repoid, pullid):
-        self._create_signature(
-            "app.tasks.pulls.Sync", kwargs=dict(repoid=repoid, pullid=pullid)
-        ).apply_async()
+        task_publisher.publish(
+            self._create_signature(
+                "app.tasks.pulls.Sync", kwargs=dict(repoid=repoid, pullid=pullid)
+            )
+        )
 
     def refresh(
         self,
@@ -238,16 +273,20 @@ class TaskService(object):
         return chain(*chain_to_call).apply_async()
 
     def sync_plans(self, sender=None, account=None, action=None):
-        self._create_signature(
-            celery_config.ghm_sync_plans_task_name,
-            kwargs=dict(sender=sender, account=account, action=action),
-        ).apply_async()
+        task_publisher.publish(
+            self._create_signature(
+                celery_config.ghm_sync_plans_task_name,
+                kwargs=dict(sender=sender, account=account, action=action),
+            )
+        )
 
     def delete_owner(self, ownerid):
         log.info(f"Triggering delete_owner task for owner: {ownerid}")
-        self._create_signature(
-            "app.tasks.delete_owner.DeleteOwner", kwargs=dict(ownerid=ownerid)
-        ).apply_async()
+        task_publisher.publish(
+            self._create_signature(
+                "app.tasks.delete_owner.DeleteOwner", kwargs=dict(ownerid=ownerid)
+            )
+        )
 
     def backfill_repo(
         self,
@@ -297,7 +336,7 @@ class TaskService(object):
 
             task_end_date = task_start_date
 
-        group(signatures).apply_async()
+        task_publisher.publish(group(signatures))
 
     def backfill_dataset(
         self,
@@ -314,116 +353,138 @@ class TaskService(object):
             ),
         )
 
-        self._create_signature(
-            "app.tasks.timeseries.backfill_dataset",
-            kwargs=dict(
-                dataset_id=dataset.pk,
-                start_date=start_date.isoformat(),
-                end_date=end_date.isoformat(),
-            ),
-        ).apply_async()
+        task_publisher.publish(
+            self._create_signature(
+                "app.tasks.timeseries.backfill_dataset",
+                kwargs=dict(
+                    dataset_id=dataset.pk,
+                    start_date=start_date.isoformat(),
+                    end_date=end_date.isoformat(),
+                ),
+            )
+        )
 
     def delete_timeseries(self, repository_id: int):
         log.info(
             "Delete repository timeseries data",
             extra=dict(repository_id=repository_id),
         )
-        self._create_signature(
-            celery_config.timeseries_delete_task_name,
-            kwargs=dict(repository_id=repository_id),
-        ).apply_async()
+        task_publisher.publish(
+            self._create_signature(
+                celery_config.timeseries_delete_task_name,
+                kwargs=dict(repository_id=repository_id),
+            )
+        )
 
     def update_commit(self, commitid, repoid):
-        self._create_signature(
-            "app.tasks.commit_update.CommitUpdate",
-            kwargs=dict(commitid=commitid, repoid=repoid),
-        ).apply_async()
+        task_publisher.publish(
+            self._create_signature(
+                "app.tasks.commit_update.CommitUpdate",
+                kwargs=dict(commitid=commitid, repoid=repoid),
+            )
+        )
 
     def create_report_results(self, commitid, repoid, report_code, current_yaml=None):
-        self._create_signature(
-            "app.tasks.reports.save_report_results",
-            kwargs=dict(
-                commitid=commitid,
-                repoid=repoid,
-                report_code=report_code,
-                current_yaml=current_yaml,
-            ),
-        ).apply_async()
+        task_publisher.publish(
+            self._create_signature(
+                "app.tasks.reports.save_report_results",
+                kwargs=dict(
+                    commitid=commitid,
+                    repoid=repoid,
+                    report_code=report_code,
+                    current_yaml=current_yaml,
+                ),
+            )
+        )
 
     def http_request(self, url, method="POST", headers=None, data=None, timeout=None):
-        self._create_signature(
-            "app.tasks.http_request.HTTPRequest",
-            kwargs=dict(
-                url=url,
-                method=method,
-                headers=headers,
-                data=data,
-                timeout=timeout,
-            ),
-        ).apply_async()
+        task_publisher.publish(
+            self._create_signature(
+                "app.tasks.http_request.HTTPRequest",
+                kwargs=dict(
+                    url=url,
+                    method=method,
+                    headers=headers,
+                    data=data,
+                    timeout=timeout,
+                ),
+            )
+        )
 
     def flush_repo(self, repository_id: int):
-        self._create_signature(
-            "app.tasks.flush_repo.FlushRepo",
-            kwargs=dict(repoid=repository_id),
-        ).apply_async()
+        task_publisher.publish(
+            self._create_signature(
+                "app.tasks.flush_repo.FlushRepo",
+                kwargs=dict(repoid=repository_id),
+            )
+        )
 
     def manual_upload_completion_trigger(
         self, repoid, commitid, report_code=None, current_yaml=None
     ):
-        self._create_signature(
-            "app.tasks.upload.ManualUploadCompletionTrigger",
-            kwargs=dict(
-                commitid=commitid,
-                repoid=repoid,
-                report_code=report_code,
-                current_yaml=current_yaml,
-            ),
-        ).apply_async()
+        task_publisher.publish(
+            self._create_signature(
+                "app.tasks.upload.ManualUploadCompletionTrigger",
+                kwargs=dict(
+                    commitid=commitid,
+                    repoid=repoid,
+                    report_code=report_code,
+                    current_yaml=current_yaml,
+                ),
+            )
+        )
 
     def backfill_commit_data(self, commit_id: int):
-        self._create_signature(
-            "app.tasks.archive.BackfillCommitDataToStorage",
-            kwargs=dict(
-                commitid=commit_id,
-            ),
-        ).apply_async()
+        task_publisher.publish(
+            self._create_signature(
+                "app.tasks.archive.BackfillCommitDataToStorage",
+                kwargs=dict(
+                    commitid=commit_id,
+                ),
+            )
+        )
 
     def preprocess_upload(self, repoid, commitid, report_code):
-        self._create_signature(
-            "app.tasks.upload.PreProcessUpload",
-            kwargs=dict(
-                repoid=repoid,
-                commitid=commitid,
-                report_code=report_code,
-            ),
-        ).apply_async()
+        task_publisher.publish(
+            self._create_signature(
+                "app.tasks.upload.PreProcessUpload",
+                kwargs=dict(
+                    repoid=repoid,
+                    commitid=commitid,
+                    report_code=report_code,
+                ),
+            )
+        )
 
     def send_email(
         self, ownerid, template_name: str, from_addr: str, subject: str, **kwargs
     ):
-        self._create_signature(
-            "app.tasks.send_email.SendEmail",
-            kwargs=dict(
-                ownerid=ownerid,
-                template_name=template_name,
-                from_addr=from_addr,
-                subject=subject,
-                **kwargs,
-            ),
-        ).apply_async()
+        task_publisher.publish(
+            self._create_signature(
+                "app.tasks.send_email.SendEmail",
+                kwargs=dict(
+                    ownerid=ownerid,
+                    template_name=template_name,
+                    from_addr=from_addr,
+                    subject=subject,
+                    **kwargs,
+                ),
+            )
+        )
 
     def delete_component_measurements(self, repoid: int, component_id: str) -> None:
         log.info(
             "Delete component measurements data",
             extra=dict(repository_id=repoid, component_id=component_id),
         )
-        self._create_signature(
-            celery_config.timeseries_delete_task_name,
-            kwargs=dict(
-                repository_id=repoid,
-                measurement_only=True,
-                measurement_type=MeasurementName.COMPONENT_COVERAGE.value,
-                measurement_id=component_id,
-            ),
-        ).apply_async()
+        task_publisher.publish(
+            self._create_signature(
+                celery_config.timeseries_delete_task_name,
+                kwargs=dict(
+                    repository_id=repoid,
+                    measurement_only=True,
+                    measurement_type=MeasurementName.COMPONENT_COVERAGE.value,
+                    measurement_id=component_id,
+                ),
+            )
+        )
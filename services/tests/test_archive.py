@@ -5,9 +5,11 @@ from unittest.mock import patch
 
 from django.test import TestCase
 from shared.storage import MinioStorageService
+from shared.storage.exceptions import FileNotInStorageError
 
 from core.tests.factories import RepositoryFactory
-from services.archive import ArchiveService
+from services.archive import ArchiveService, chunk_offsets, merge_ranges
+from services.storage import StorageService
 
 current_file = Path(__file__)
 
@@ -117,3 +119,141 @@ class TestWriteData(object):
             gzipped=False,
             reduced_redundancy=False,
         )
+
+
+CHUNKS = (
+    '{}\n[1]\n<<<<< end_of_chunk >>>>>\n{}\n[0, "é"]\n<<<<< end_of_chunk >>>>>\n{}\n[1]'
+)
+
+
+def test_chunk_offsets():
+    data = CHUNKS.encode()
+    offsets = chunk_offsets(data)
+    assert len(offsets) == 3
+    assert [data[start:end].decode() for start, end in offsets] == CHUNKS.split(
+        "\n<<<<< end_of_chunk >>>>>\n"
+    )
+
+
+def test_merge_ranges():
+    separator_length = len("\n<<<<< end_of_chunk >>>>>\n")
+    assert merge_ranges([(100, 110), (0, 10), (10 + separator_length, 40)]) == [
+        (0, 40),
+        (100, 110),
+    ]
+
+
+class TestReadChunkRange(object):
+    def test_write_chunks_writes_index(self, mocker, db):
+        repo = RepositoryFactory()
+        mock_write_file = mocker.patch.object(MinioStorageService, "write_file")
+        archive_service = ArchiveService(repository=repo)
+
+        archive_service.write_chunks("abc", CHUNKS)
+
+        index_path = (
+            f"v4/repos/{archive_service.storage_hash}/commits/abc/chunks_index.json"
+        )
+        data = CHUNKS.encode()
+        mock_write_file.assert_called_with(
+            archive_service.root,
+            index_path,
+            json.dumps(dict(size=len(data), header="", offsets=chunk_offsets(data))),
+            gzipped=False,
+            reduced_redundancy=False,
+        )
+
+    def test_write_chunks_index_with_header(self, mocker, db):
+        repo = RepositoryFactory()
+        mock_write_file = mocker.patch.object(MinioStorageService, "write_file")
+        archive_service = ArchiveService(repository=repo)
+        header = '{"labels_index": {}}\n<<<<< end_of_header >>>>>\n'
+
+        archive_service.write_chunks_index("abc", header + CHUNKS)
+
+        index = json.loads(mock_write_file.call_args[0][2])
+        data = (header + CHUNKS).encode()
+        assert index["header"] == header
+        assert [data[start:end].decode() for start, end in index["offsets"]] == (
+            CHUNKS.split("\n<<<<< end_of_chunk >>>>>\n")
+        )
+
+    def test_read_chunk_range(self, mocker, db):
+        repo = RepositoryFactory()
+        archive_service = ArchiveService(repository=repo)
+        data = CHUNKS.encode()
+        offsets = chunk_offsets(data)
+        mocker.patch.object(
+            ArchiveService,
+            "read_file",
+            return_value=json.dumps(dict(size=len(data), offsets=offsets)),
+        )
+        read_file_range = mocker.patch.object(
+            StorageService,
+            "read_file_range",
+            side_effect=lambda bucket, path, offset, length: (
+                data[offset : offset + length],
+                len(data),
+            ),
+        )
+
+        res = archive_service.read_chunk_range("abc", [1, 2, 5])
+
+        assert res == {1: '{}\n[0, "é"]', 2: "{}\n[1]"}
+        # adjacent chunks are fetched with a single request
+        read_file_range.assert_called_once_with(
+            archive_service.root,
+            f"v4/repos/{archive_service.storage_hash}/commits/abc/chunks.txt",
+            offsets[1][0],
+            offsets[2][1] - offsets[1][0],
+        )
+
+    def test_read_chunk_range_no_index(self, mocker, db):
+        repo = RepositoryFactory()
+        archive_service = ArchiveService(repository=repo)
+        mocker.patch.object(
+            ArchiveService, "read_file", side_effect=FileNotInStorageError()
+        )
+        mocker.patch.object(ArchiveService, "read_chunks", return_value=CHUNKS)
+        read_file_range = mocker.patch.object(StorageService, "read_file_range")
+
+        # the whole file is read, so every chunk is returned
+        assert archive_service.read_chunk_range("abc", [0]) == {
+            0: "{}\n[1]",
+            1: '{}\n[0, "é"]',
+            2: "{}\n[1]",
+        }
+        assert not read_file_range.called
+
+    def test_read_chunk_range_gzipped(self, mocker, db):
+        repo = RepositoryFactory()
+        archive_service = ArchiveService(repository=repo)
+        data = CHUNKS.encode()
+        index = dict(size=len(data), header="", offsets=chunk_offsets(data))
+        mocker.patch.object(ArchiveService, "read_chunks", return_value=CHUNKS)
+        mocker.patch.object(
+            StorageService, "read_file_range", side_effect=ValueError("gzipped")
+        )
+
+        res = archive_service.read_chunk_range("abc", [1], index=index)
+
+        assert res[1] == '{}\n[0, "é"]'
+        assert len(res) == 3
+
+    def test_read_chunk_range_stale_index(self, mocker, db):
+        repo = RepositoryFactory()
+        archive_service = ArchiveService(repository=repo)
+        data = CHUNKS.encode()
+        mocker.patch.object(
+            ArchiveService,
+            "read_file",
+            return_value=json.dumps(
+                dict(size=len(data) - 1, offsets=chunk_offsets(data))
+            ),
+        )
+        mocker.patch.object(ArchiveService, "read_chunks", return_value=CHUNKS)
+        mocker.patch.object(
+            StorageService, "read_file_range", return_value=(b"garbage", len(data))
+        )
+
+        assert archive_service.read_chunk_range("abc", [2])[2] == "{}\n[1]"
@@ -0,0 +1,79 @@
+from datetime import datetime
+from unittest.mock import patch
+
+from django.test import override_settings
+from redis.exceptions import ConnectionError
+
+from services.badge_cache import BadgeCoverageCache
+
+UPDATESTAMP = datetime(2024, 1, 2, 3, 4, 5)
+
+
+@override_settings(BADGE_CACHE_ENABLED=False)
+def test_disabled(mock_redis):
+    cache = BadgeCoverageCache()
+    cache.set(1, "abc", UPDATESTAMP, {"unit": 90.0})
+    assert cache.get(1, "abc", UPDATESTAMP) is None
+    assert mock_redis.keys("badge_flags_coverage/*") == []
+
+
+@override_settings(BADGE_CACHE_ENABLED=True)
+def test_set_and_get_memory_tier(mock_redis):
+    cache = BadgeCoverageCache()
+    flags = {"unit": 90.0}
+    cache.set(1, "abc", UPDATESTAMP, flags)
+    assert cache.get(1, "abc", UPDATESTAMP) is flags
+    assert cache.get(1, "def", UPDATESTAMP) is None
+
+
+@override_settings(BADGE_CACHE_ENABLED=True)
+def test_redis_tier_shared_across_processes(mock_redis):
+    flags = {"unit": 90.0, "integration": None}
+    BadgeCoverageCache().set(1, "abc", UPDATESTAMP, flags)
+    assert BadgeCoverageCache().get(1, "abc", UPDATESTAMP) == flags
+    assert mock_redis.ttl(f"badge_flags_coverage/1/abc/{UPDATESTAMP.isoformat()}") > 0
+
+
+@override_settings(BADGE_CACHE_ENABLED=True)
+def test_keyed_on_updatestamp(mock_redis):
+    cache = BadgeCoverageCache()
+    cache.set(1, "abc", UPDATESTAMP, {"unit": 90.0})
+    assert cache.get(1, "abc", datetime(2024, 1, 2, 3, 4, 6)) is None
+
+    # commits without an updatestamp can't be told apart from their updates
+    cache.set(1, "abc", None, {"unit": 90.0})
+    assert cache.get(1, "abc", None) is None
+
+
+@override_settings(BADGE_CACHE_ENABLED=True, BADGE_CACHE_MEMORY_TTL=10)
+def test_memory_tier_expires(mock_redis):
+    cache = BadgeCoverageCache()
+    with patch("services.badge_cache.time.monotonic", return_value=100):
+        cache.set(1, "abc", UPDATESTAMP, {"unit": 90.0})
+    mock_redis.delete(f"badge_flags_coverage/1/abc/{UPDATESTAMP.isoformat()}")
+    with patch("services.badge_cache.time.monotonic", return_value=105):
+        assert cache.get(1, "abc", UPDATESTAMP) is not None
+    with patch("services.badge_cache.time.monotonic", return_value=111):
+        assert cache.get(1, "abc", UPDATESTAMP) is None
+
+
+@override_settings(BADGE_CACHE_ENABLED=True, BADGE_CACHE_MEMORY_MAX_ENTRIES=2)
+def test_memory_tier_bounded(mock_redis):
+    cache = BadgeCoverageCache()
+    for commitid in ["a", "b", "c"]:
+        cache.set(1, commitid, UPDATESTAMP, {"unit": 90.0})
+    assert list(cache._memory) == [(1, "b", UPDATESTAMP), (1, "c", UPDATESTAMP)]
+
+
+@override_settings(BADGE_CACHE_ENABLED=True)
+def test_redis_unavailable(mocker):
+    redis = mocker.MagicMock()
+    redis.get.side_effect = ConnectionError()
+    redis.set.side_effect = ConnectionError()
+    mocker.patch("services.redis_cache.get_redis_connection", return_value=redis)
+
+    cache = BadgeCoverageCache()
+    assert cache.get(1, "abc", UPDATESTAMP) is None
+    cache.set(1, "abc", UPDATESTAMP, {"unit": 90.0})
+    cache._memory.clear()
+    assert cache.get(1, "abc", UPDATESTAMP) is None
@@ -1,14 +1,15 @@
 import asyncio
 import enum
 import json
-from collections import Counter
+from collections import Counter, OrderedDict
 from datetime import datetime
 from unittest.mock import PropertyMock, patch
 
+import fakeredis
 import minio
 import pytest
 import pytz
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from shared.reports.resources import ReportFile
 from shared.reports.types import ReportTotals
 from shared.utils.merge import LineType
@@ -33,6 +34,7 @@ from services.comparison import (
     MissingComparisonReport,
     PullRequestComparison,
 )
+from services.git_comparison_cache import git_comparison_cache
 from services.report import SerializableReport
 
 # Pulled from core.tests.factories.CommitFactory files.
@@ -244,6 +246,33 @@ class FileComparisonTraverseManagerTests(TestCase):
         manager.apply([visitor])
         assert visitor.line_numbers == [(1, 1), (2, 2), (3, None), (None, 3)]
 
+    def test_apply_does_not_mutate_segments(self):
+        segments = [
+            {"header": ["1", "1", "1", "2"], "lines": ["-a", "+b", "+c"]},
+            {"header": ["5", "1", "6", "1"], "lines": ["-d", "+e"]},
+        ]
+        manager = FileComparisonTraverseManager(
+            head_file_eof=8, base_file_eof=7, segments=segments
+        )
+
+        visitor = LineNumberCollector()
+        manager.apply([visitor])
+        assert visitor.line_numbers == [
+            (1, None),
+            (None, 1),
+            (None, 2),
+            (2, 3),
+            (3, 4),
+            (4, 5),
+            (5, None),
+            (None, 6),
+            (6, 7),
+        ]
+        assert segments == [
+            {"header": ["1", "1", "1", "2"], "lines": ["-a", "+b", "+c"]},
+            {"header": ["5", "1", "6", "1"], "lines": ["-d", "+e"]},
+        ]
+
     def test_can_traverse_diff_with_difflike_lines(self):
         src = [
             "- line 1",  # not part of diff
@@ -1334,6 +1363,27 @@ class ComparisonHasUnmergedBaseCommitsTests(TestCase):
         )
         assert self.comparison.has_unmerged_base_commits is False
 
+    @override_settings(GIT_COMPARISON_CACHE_ENABLED=True)
+    def test_uses_cached_comparisons(self, get_adapter_mock):
+        get_adapter_mock.return_value = (
+            ComparisonHasUnmergedBaseCommitsTests.MockFetchDiffCoro(["a", "b"])
+        )
+        with (
+            patch.object(git_comparison_cache, "_redis", fakeredis.FakeStrictRedis()),
+            patch.object(git_comparison_cache, "_memory", OrderedDict()),
+        ):
+            assert self.comparison.has_unmerged_base_commits is True
+
+            comparison = Comparison(
+                user=self.comparison.user,
+                base_commit=self.comparison.base_commit,
+                head_commit=self.comparison.head_commit,
+            )
+            assert comparison.has_unmerged_base_commits is True
+            assert comparison.git_comparison == {"commits": ["a", "b"]}
+
+        get_adapter_mock.assert_called_once()
+
 
 class SegmentTests(TestCase):
     def _report_lines(self, hits):
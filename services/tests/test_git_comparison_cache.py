@@ -0,0 +1,90 @@
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+from django.test import override_settings
+
+from services.git_comparison_cache import GitComparisonCache
+
+comparison = {"diff": {"files": {"a.py": {"type": "modified"}}}, "commits": []}
+
+
+@pytest.fixture
+def cache_settings():
+    with override_settings(
+        GIT_COMPARISON_CACHE_ENABLED=True,
+        GIT_COMPARISON_CACHE_MEMORY_MAX_ENTRIES=1,
+    ):
+        yield
+
+
+@override_settings(GIT_COMPARISON_CACHE_ENABLED=False)
+def test_disabled(mock_redis):
+    cache = GitComparisonCache()
+    fetch = MagicMock(return_value=comparison)
+    assert cache.get_or_fetch(1, "base", "head", fetch) == comparison
+    assert cache.get_or_fetch(1, "base", "head", fetch) == comparison
+    assert fetch.call_count == 2
+
+
+def test_get_or_fetch(mock_redis, cache_settings):
+    cache = GitComparisonCache()
+    fetch = MagicMock(return_value=comparison)
+
+    assert cache.get_or_fetch(1, "base", "head", fetch) == comparison
+    assert cache.get_or_fetch(1, "base", "head", fetch) == comparison
+    fetch.assert_called_once()
+
+    # entries are shared with other processes through redis
+    assert GitComparisonCache().get(1, "base", "head") == comparison
+    assert GitComparisonCache().get(2, "base", "head") is None
+
+
+def test_memory_eviction(mock_redis, cache_settings):
+    cache = GitComparisonCache()
+    cache.set(1, "base", "head", comparison)
+    cache.set(1, "base", "other", comparison)
+    assert list(cache._memory) == ["git_comparison/1/base/other"]
+    assert cache.get(1, "base", "head") == comparison
+
+
+def test_unmerged_base_commits(mock_redis, cache_settings):
+    cache = GitComparisonCache()
+    assert cache.get_unmerged_base_commits(1, "base", "head") is None
+    cache.set_unmerged_base_commits(1, "base", "head", True)
+    assert cache.get_unmerged_base_commits(1, "base", "head") is True
+    cache.set_unmerged_base_commits(1, "base", "head", False)
+    assert cache.get_unmerged_base_commits(1, "base", "head") is False
+
+
+def test_single_flight(mock_redis, cache_settings):
+    cache = GitComparisonCache()
+    fetching = threading.Event()
+    release = threading.Event()
+
+    def fetch():
+        fetching.set()
+        release.wait(timeout=5)
+        return comparison
+
+    results = []
+    first = threading.Thread(
+        target=lambda: results.append(cache.get_or_fetch(1, "base", "head", fetch))
+    )
+    first.start()
+    fetching.wait(timeout=5)
+
+    second_fetch = MagicMock(return_value=comparison)
+    second = threading.Thread(
+        target=lambda: results.append(
+            cache.get_or_fetch(1, "base", "head", second_fetch)
+        )
+    )
+    second.start()
+    release.set()
+    first.join(timeout=5)
+    second.join(timeout=5)
+
+    assert results == [comparison, comparison]
+    second_fetch.assert_not_called()
+    assert cache._flights == {}
@@ -0,0 +1,64 @@
+from unittest.mock import MagicMock
+
+from django.test import override_settings
+from redis.exceptions import ConnectionError
+
+from services.graph_cache import GraphCache
+
+
+@override_settings(GRAPH_CACHE_ENABLED=False)
+def test_disabled(mock_redis):
+    render = MagicMock(return_value="<svg />")
+    cache = GraphCache()
+    assert cache.get_or_render("commit/1/abc/v1", "tree", 300, 300, render) == "<svg />"
+    assert cache.get_or_render("commit/1/abc/v1", "tree", 300, 300, render) == "<svg />"
+    assert render.call_count == 2
+    assert mock_redis.keys("graphs/*") == []
+
+
+@override_settings(GRAPH_CACHE_ENABLED=True)
+def test_get_or_render(mock_redis):
+    render = MagicMock(return_value="<svg />")
+    cache = GraphCache()
+    assert cache.get_or_render("commit/1/abc/v1", "tree", 300, 300, render) == "<svg />"
+    assert cache.get_or_render("commit/1/abc/v1", "tree", 300, 300, render) == "<svg />"
+    render.assert_called_once()
+    assert mock_redis.ttl("graphs/commit/1/abc/v1/tree/300x300") > 0
+
+    cache.get_or_render("commit/1/abc/v1", "tree", 300, 350, render)
+    cache.get_or_render("commit/1/abc/v1", "icicle", 300, 300, render)
+    cache.get_or_render("commit/1/abc/v2", "tree", 300, 300, render)
+    assert render.call_count == 4
+
+
+@override_settings(GRAPH_CACHE_ENABLED=True)
+def test_get_or_build_flare(mock_redis):
+    flare = [{"name": "", "lines": 10, "color": "#4c1", "_class": None}]
+    build = MagicMock(return_value=flare)
+    cache = GraphCache()
+    assert cache.get_or_build_flare("commit/1/abc/v1", build) == flare
+    assert cache.get_or_build_flare("commit/1/abc/v1", build) == flare
+    build.assert_called_once()
+
+
+@override_settings(GRAPH_CACHE_ENABLED=True)
+def test_uncacheable_source(mock_redis):
+    render = MagicMock(return_value="<svg />")
+    cache = GraphCache()
+    cache.get_or_render(None, "tree", 300, 300, render)
+    cache.get_or_render(None, "tree", 300, 300, render)
+    assert render.call_count == 2
+
+
+@override_settings(GRAPH_CACHE_ENABLED=True)
+def test_redis_unavailable(mocker):
+    redis = mocker.MagicMock()
+    redis.get.side_effect = ConnectionError()
+    redis.set.side_effect = ConnectionError()
+    mocker.patch("services.redis_cache.get_redis_connection", return_value=redis)
+
+    cache = GraphCache()
+    assert (
+        cache.get_or_render("commit/1/abc/v1", "tree", 300, 300, lambda: "<svg />")
+        == "<svg />"
+    )
@@ -0,0 +1,104 @@
+import json
+from unittest.mock import patch
+
+import fakeredis
+from django.test import TransactionTestCase, override_settings
+
+from compare.tests.factories import CommitComparisonFactory
+from services.comparison import ComparisonReport, ImpactedFile
+from services.impacted_files_index import (
+    IMPACTED_FILE_ORDERINGS,
+    ImpactedFilesIndex,
+    impacted_files_index_cache,
+)
+
+
+def impacted_file(head_name, hits, lines, unexpected_line_changes=None):
+    return {
+        "head_name": head_name,
+        "base_name": head_name,
+        "head_coverage": (
+            {"hits": hits, "misses": lines - hits, "partials": 0}
+            if lines is not None
+            else None
+        ),
+        "base_coverage": None,
+        "added_diff_coverage": [[1, "h"]],
+        "unexpected_line_changes": unexpected_line_changes or [],
+    }
+
+
+files_data = [
+    impacted_file("b.py", 1, 2),
+    impacted_file("a.py", 3, 4, unexpected_line_changes=[[[1, "h"], [1, "m"]]]),
+    impacted_file("c.py", 0, None),
+]
+
+
+def test_build():
+    files = [ImpactedFile.create(**data) for data in files_data]
+    index = ImpactedFilesIndex.build(files)
+
+    assert len(index) == 3
+    assert index.positions == {"b.py": 0, "a.py": 1, "c.py": 2}
+    # orderings are sorted when requested
+    assert index.orderings == {}
+    assert index.ordering("file_name", "ascending") == [1, 0, 2]
+    assert index.ordering("file_name", "descending") == [2, 0, 1]
+    # files without coverage are last in both directions
+    assert index.ordering("head_coverage", "ascending") == [0, 1, 2]
+    assert index.ordering("head_coverage", "descending") == [1, 0, 2]
+    assert index.unintended == [1]
+    assert index.direct == [0, 1, 2]
+
+    assert index.orderings.keys() == {"file_name", "head_coverage"}
+
+    stored = ImpactedFilesIndex.from_dict(index.to_dict())
+    assert stored == index
+    assert stored.orderings.keys() == IMPACTED_FILE_ORDERINGS.keys()
+    assert stored.ordering("file_name", "descending") == [2, 0, 1]
+
+
+class ComparisonReportIndexTest(TransactionTestCase):
+    def setUp(self):
+        self.commit_comparison = CommitComparisonFactory(
+            report_storage_path="v4/test.json"
+        )
+
+    @patch("services.archive.ArchiveService.read_file")
+    def test_impacted_file(self, read_file):
+        read_file.return_value = json.dumps({"files": files_data})
+        comparison_report = ComparisonReport(self.commit_comparison)
+
+        assert comparison_report.impacted_file("a.py").head_name == "a.py"
+        assert comparison_report.impacted_file("missing.py") is None
+        read_file.assert_called_once()
+
+    @override_settings(IMPACTED_FILES_INDEX_CACHE_ENABLED=True)
+    @patch("services.archive.ArchiveService.read_file")
+    def test_shared_through_redis(self, read_file):
+        read_file.return_value = json.dumps({"files": files_data})
+        with patch.object(
+            impacted_files_index_cache, "_redis", fakeredis.FakeStrictRedis()
+        ):
+            ComparisonReport(self.commit_comparison).index
+
+            # only the requested files are loaded from redis
+            comparison_report = ComparisonReport(self.commit_comparison)
+            assert comparison_report.index.positions["c.py"] == 2
+            files = comparison_report.impacted_files_at([2, 0])
+            assert [file.head_name for file in files] == ["c.py", "b.py"]
+            assert comparison_report._loaded_files.keys() == {0, 2}
+
+        read_file.assert_called_once()
+
+    @override_settings(IMPACTED_FILES_INDEX_CACHE_ENABLED=True)
+    @patch.object(impacted_files_index_cache, "set")
+    @patch("services.archive.ArchiveService.read_file")
+    def test_not_cached_when_data_is_missing(self, read_file, set_index):
+        read_file.side_effect = Exception()
+        with patch.object(
+            impacted_files_index_cache, "_redis", fakeredis.FakeStrictRedis()
+        ):
+            assert ComparisonReport(self.commit_comparison).impacted_files == []
+        set_index.assert_not_called()
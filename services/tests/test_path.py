@@ -13,6 +13,7 @@ from core.tests.factories import CommitFactory
 from services.path import (
     Dir,
     File,
+    PathTree,
     PrefixedPath,
     ReportPaths,
     dashboard_commit_file_url,
@@ -275,6 +276,95 @@ class TestReportPathsNested(TestCase):
         ]
 
 
+class TestPathTree(TestCase):
+    def setUp(self):
+        files = {
+            "dir/file1.py": file_data1,
+            "dir/subdir/file2.py": file_data2,
+            "dir/subdir/file3.py": file_data3,
+            "other.py": file_data3,
+        }
+        self.report = SerializableReport(files=files)
+        self.tree = PathTree(self.report.files, self.report.get_file_totals)
+
+    def test_directory_totals(self):
+        assert self.tree.root.totals.lines == 40
+        assert self.tree.root.totals.hits == 22
+
+        subdir = self.tree.find("dir/subdir")
+        assert subdir.totals.lines == 20
+        assert subdir.totals.hits == 11
+        assert subdir.totals.misses == 4
+
+    def test_find(self):
+        assert self.tree.find("") is self.tree.root
+        assert self.tree.find("dir/subdir/file2.py").is_file
+        assert self.tree.find("dir/sub") is None
+        assert self.tree.find("dir/file1.py/nope") is None
+
+    def test_file_nodes_in_report_order(self):
+        assert [node.full_path for node in self.tree.root.file_nodes()] == [
+            "dir/file1.py",
+            "dir/subdir/file2.py",
+            "dir/subdir/file3.py",
+            "other.py",
+        ]
+
+    def test_to_path_node(self):
+        node = self.tree.find("dir/subdir").to_path_node()
+        assert node == Dir(
+            full_path="dir/subdir",
+            children=[
+                File(full_path="dir/subdir/file2.py", totals=totals2),
+                File(full_path="dir/subdir/file3.py", totals=totals3),
+            ],
+        )
+        assert node.lines == 20
+        assert node.hits == 11
+
+    def test_tree_is_built_once_per_report(self):
+        with patch.object(
+            self.report, "get_file_totals", wraps=self.report.get_file_totals
+        ) as get_file_totals:
+            ReportPaths(self.report, path="dir").single_directory()
+            ReportPaths(self.report, path="dir/subdir").single_directory()
+            # `other.py` is outside of both listings
+            assert get_file_totals.call_count == 3
+
+    def test_totals_are_computed_lazily(self):
+        totals = MagicMock(side_effect=self.report.get_file_totals)
+        tree = PathTree(self.report.files, totals)
+        assert totals.call_count == 0
+
+        assert tree.find("dir/subdir").totals.lines == 20
+        assert [call.args[0] for call in totals.call_args_list] == [
+            "dir/subdir/file2.py",
+            "dir/subdir/file3.py",
+        ]
+
+    def test_missing_file_totals(self):
+        tree = PathTree(
+            self.report.files,
+            lambda path: None if path == "other.py" else totals1,
+        )
+        assert tree.find("other.py").to_path_node() == File(
+            full_path="other.py", totals=ReportTotals.default_totals()
+        )
+        assert tree.root.totals.lines == 3 * totals1.lines
+
+    def test_file_with_directory_name(self):
+        for files in (["dir", "dir/file1.py"], ["dir/file1.py", "dir"]):
+            tree = PathTree(files, lambda path: totals1)
+            node = tree.find("dir")
+            assert not node.is_file
+            assert sorted(child.full_path for child in node.children.values()) == [
+                "dir",
+                "dir/file1.py",
+            ]
+            assert node.totals.lines == 2 * totals1.lines
+            assert [node.full_path for node in tree.root.file_nodes()] == files
+
+
 class MockedProviderAdapter:
     async def list_files(self, *args, **kwargs):
         return []
@@ -0,0 +1,46 @@
+import logging
+
+from django.test import override_settings
+from redis.exceptions import ConnectionError
+
+from services.redis_cache import RedisCache
+
+
+class GraphLikeCache(RedisCache):
+    enabled_setting = "GRAPH_CACHE_ENABLED"
+
+    def get(self, key):
+        with self.suppress_redis_errors("Error reading from redis", key=key):
+            return self.redis.get(key)
+        return "fallback"
+
+
+def test_enabled():
+    assert RedisCache().enabled
+    with override_settings(GRAPH_CACHE_ENABLED=False):
+        assert not GraphLikeCache().enabled
+    with override_settings(GRAPH_CACHE_ENABLED=True):
+        assert GraphLikeCache().enabled
+
+
+def test_redis_is_connected_once(mocker):
+    get_redis_connection = mocker.patch(
+        "services.redis_cache.get_redis_connection", return_value=mocker.MagicMock()
+    )
+    cache = GraphLikeCache()
+    assert get_redis_connection.call_count == 0
+    assert cache.redis is cache.redis
+    get_redis_connection.assert_called_once()
+
+
+def test_suppress_redis_errors(mock_redis, mocker, caplog):
+    cache = GraphLikeCache()
+    mock_redis.set("key", "value")
+    assert cache.get("key") == b"value"
+
+    mocker.patch.object(mock_redis, "get", side_effect=ConnectionError("down"))
+    with caplog.at_level(logging.WARNING):
+        assert cache.get("key") == "fallback"
+    assert caplog.records[-1].name == __name__
+    assert caplog.records[-1].key == "key"
+    assert caplog.records[-1].error == "down"
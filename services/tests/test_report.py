@@ -1,19 +1,30 @@
 from decimal import Decimal
 from pathlib import Path
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
-from django.test import TestCase
+import fakeredis
+from django.test import TestCase, override_settings
 from shared.reports.resources import Report, ReportFile, ReportLine
 from shared.storage.exceptions import FileNotInStorageError
 from shared.utils.sessions import Session
+from urllib3.exceptions import MaxRetryError
 
 from core.tests.factories import CommitFactory, CommitWithReportFactory
 from reports.tests.factories import UploadFactory, UploadFlagMembershipFactory
 from services.report import (
+    MAX_RANGED_READS,
+    LazyChunks,
+    RangedChunks,
+    ReadOnlyReport,
     build_report,
     build_report_from_commit,
+    build_report_from_source,
+    fetch_report_sources,
     files_belonging_to_flags,
+    files_in_sessions,
+    session_files_index,
 )
+from services.report_cache import ReportChunksCache
 
 current_file = Path(__file__)
 
@@ -98,6 +109,130 @@ class ReportServiceTest(TestCase):
         res = build_report(**data)
         assert len(res._chunks) == 3
 
+    def test_build_report_lazy(self):
+        with open(current_file.parent / "samples" / "chunks.txt", "r") as f:
+            chunks = f.read()
+        files = {
+            "awesome/__init__.py": [
+                2,
+                [0, 10, 8, 2, 0, "80.00000", 0, 0, 0, 0, 0, 0, 0],
+                [[0, 10, 8, 2, 0, "80.00000", 0, 0, 0, 0, 0, 0, 0]],
+                None,
+            ],
+            "tests/__init__.py": [
+                0,
+                [0, 3, 2, 1, 0, "66.66667", 0, 0, 0, 0, 0, 0, 0],
+                [[0, 3, 2, 1, 0, "66.66667", 0, 0, 0, 0, 0, 0, 0]],
+                None,
+            ],
+        }
+
+        eager = build_report(chunks, files, {}, None)
+        lazy = build_report(chunks, files, {}, None, lazy=True)
+
+        assert isinstance(lazy._chunks, LazyChunks)
+        assert len(lazy._chunks) == len(eager._chunks) == 3
+        for filename in files:
+            assert list(lazy.get(filename).lines) == list(eager.get(filename).lines)
+
+    def test_build_report_lazy_read_only(self):
+        with self.assertRaises(ValueError):
+            build_report("", {}, {}, None, report_class=ReadOnlyReport, lazy=True)
+
+    def test_lazy_chunks(self):
+        raw = "{}\n[1]\n<<<<< end_of_chunk >>>>>\n{}\n[0]\n<<<<< end_of_chunk >>>>>\n"
+        chunks = LazyChunks(raw)
+        assert chunks._offsets is None
+        assert len(chunks) == 3
+        assert list(chunks) == raw.split("\n<<<<< end_of_chunk >>>>>\n")
+        assert chunks[-2] == "{}\n[0]"
+        assert chunks[0:2] == ["{}\n[1]", "{}\n[0]"]
+        with self.assertRaises(IndexError):
+            chunks[3]
+
+        chunks[1] = "replaced"
+        assert chunks[1] == "replaced"
+
+        chunks.append("appended")
+        assert list(chunks) == ["{}\n[1]", "replaced", "", "appended"]
+
+    def test_ranged_chunks(self):
+        archive_service = MagicMock()
+        archive_service.read_chunk_range.side_effect = (
+            lambda commit_sha, indexes, index: {i: f"chunk {i}" for i in indexes}
+        )
+        index = dict(header="", offsets=[[0, 1]] * (MAX_RANGED_READS + 2))
+        chunks = RangedChunks(archive_service, "abc", index)
+
+        assert len(chunks) == MAX_RANGED_READS + 2
+        assert chunks[1] == "chunk 1"
+        assert chunks[1] == "chunk 1"
+        archive_service.read_chunk_range.assert_called_once_with(
+            "abc", [1], index=index
+        )
+
+        for i in range(2, MAX_RANGED_READS + 1):
+            assert chunks[i] == f"chunk {i}"
+        # the remaining chunks are read at once
+        assert chunks[0] == "chunk 0"
+        archive_service.read_chunk_range.assert_called_with(
+            "abc", [0, MAX_RANGED_READS + 1], index=index
+        )
+        assert archive_service.read_chunk_range.call_count == MAX_RANGED_READS + 1
+
+    def test_ranged_chunks_whole_file(self):
+        archive_service = MagicMock()
+        archive_service.read_chunk_range.return_value = {0: "a", 1: "b", 2: "c"}
+        chunks = RangedChunks(archive_service, "abc", dict(offsets=[[0, 1]] * 2))
+
+        assert chunks[0] == "a"
+        # the whole file was read and may not match the index
+        assert list(chunks) == ["a", "b", "c"]
+        archive_service.read_chunk_range.assert_called_once()
+
+    @override_settings(REPORT_CHUNKS_RANGE_READS_ENABLED=True)
+    @patch("services.archive.ArchiveService.read_chunk_range")
+    @patch("services.archive.ArchiveService.read_chunks_index")
+    @patch("services.archive.ArchiveService.read_chunks")
+    def test_build_report_from_commit_ranged(
+        self, read_chunks_mock, read_chunks_index_mock, read_chunk_range_mock
+    ):
+        with open(current_file.parent / "samples" / "chunks.txt", "r") as f:
+            chunks = f.read().split("\n<<<<< end_of_chunk >>>>>\n")
+        read_chunks_index_mock.return_value = dict(
+            header="", offsets=[[0, 0]] * len(chunks)
+        )
+        read_chunk_range_mock.side_effect = lambda commit_sha, indexes, index: {
+            i: chunks[i] for i in indexes
+        }
+        commit = CommitWithReportFactory.create(message="aaaaa", commitid="abf6d4d")
+
+        res = build_report_from_commit(commit, lazy=True)
+        assert isinstance(res._chunks, RangedChunks)
+        assert not read_chunk_range_mock.called
+
+        file_report = res.get("tests/__init__.py")
+        assert tuple(file_report.totals) == (
+            0, 3, 2, 1, 0, "66.66667", 0, 0, 0, 0, 0, 0, 0,
+        )  # fmt: skip
+        read_chunk_range_mock.assert_called_once()
+        assert not read_chunks_mock.called
+
+    @override_settings(REPORT_CHUNKS_RANGE_READS_ENABLED=True)
+    @patch("services.archive.ArchiveService.read_chunks_index", return_value=None)
+    @patch("services.archive.ArchiveService.read_chunks")
+    def test_build_report_from_commit_ranged_no_index(
+        self, read_chunks_mock, read_chunks_index_mock
+    ):
+        with open(current_file.parent / "samples" / "chunks.txt", "r") as f:
+            read_chunks_mock.return_value = f.read()
+        commit = CommitWithReportFactory.create(message="aaaaa", commitid="abf6d4d")
+
+        res = build_report_from_commit(commit, lazy=True)
+        assert type(res._chunks) is LazyChunks
+        assert len(res._chunks) == 3
+        read_chunks_mock.assert_called_once_with("abf6d4d")
+
     @patch("services.archive.ArchiveService.read_chunks")
     def test_build_report_from_commit(self, read_chunks_mock):
         f = open(current_file.parent / "samples" / "chunks.txt", "r")
@@ -140,6 +275,29 @@ class ReportServiceTest(TestCase):
             0,
         ]
 
+    @override_settings(REPORT_CACHE_ENABLED=True)
+    @patch("services.redis_cache.get_redis_connection")
+    @patch("services.archive.ArchiveService.read_chunks")
+    def test_build_report_from_commit_cached_chunks(
+        self, read_chunks_mock, get_redis_connection_mock
+    ):
+        get_redis_connection_mock.return_value = fakeredis.FakeStrictRedis()
+        f = open(current_file.parent / "samples" / "chunks.txt", "r")
+        read_chunks_mock.return_value = f.read()
+        commit = CommitWithReportFactory.create(message="aaaaa", commitid="abf6d4d")
+
+        with patch("services.report.report_chunks_cache", ReportChunksCache()):
+            first = build_report_from_commit(commit)
+            second = build_report_from_commit(commit)
+
+            assert read_chunks_mock.call_count == 1
+            assert len(second._chunks) == len(first._chunks) == 3
+
+            # rewriting the report details gives the chunks a new version
+            commit.reports.first().reportdetails.save()
+            build_report_from_commit(commit)
+            assert read_chunks_mock.call_count == 2
+
     @patch("services.archive.ArchiveService.read_chunks")
     def test_build_report_from_commit_file_not_in_storage(self, read_chunks_mock):
         read_chunks_mock.side_effect = FileNotInStorageError()
@@ -354,6 +512,48 @@ class ReportServiceTest(TestCase):
             [1, 2, 1, 1, 0, "50.00000", 0, 0, 0, 0, 0, 0, 0],
         ]
 
+    @patch("services.archive.ArchiveService.read_chunks")
+    def test_fetch_report_sources(self, read_chunks_mock):
+        with open(current_file.parent / "samples" / "chunks.txt", "r") as f:
+            read_chunks_mock.return_value = f.read()
+        commit = CommitWithReportFactory.create(message="aaaaa", commitid="abf6d4d")
+        other = CommitWithReportFactory.create(
+            message="bbbbb", commitid="cdf6d4d", repository=commit.repository
+        )
+        no_report = CommitFactory(repository=commit.repository)
+
+        sources = fetch_report_sources([commit, other, commit, no_report])
+        assert set(sources) == {"abf6d4d", "cdf6d4d"}
+        # shared commits are only fetched once
+        assert read_chunks_mock.call_count == 2
+
+        report = build_report_from_source(sources["abf6d4d"])
+        expected = build_report_from_commit(commit)
+        assert report.files == expected.files
+        assert list(report.totals) == list(expected.totals)
+        # every report built from a source is independent
+        assert build_report_from_source(sources["abf6d4d"]) is not report
+
+    @patch("services.archive.ArchiveService.read_chunks")
+    def test_fetch_report_sources_file_not_in_storage(self, read_chunks_mock):
+        read_chunks_mock.side_effect = FileNotInStorageError()
+        commit = CommitWithReportFactory.create(message="aaaaa", commitid="abf6d4d")
+        assert fetch_report_sources([commit]) == {}
+
+    @patch("services.archive.ArchiveService.read_chunks")
+    def test_fetch_report_sources_storage_error(self, read_chunks_mock):
+        read_chunks_mock.side_effect = MaxRetryError(None, "/chunks.txt")
+        commit = CommitWithReportFactory.create(message="aaaaa", commitid="abf6d4d")
+        # the report is built on demand instead
+        assert fetch_report_sources([commit]) == {}
+
+    @patch("services.archive.ArchiveService.read_chunks")
+    def test_fetch_report_sources_unexpected_error(self, read_chunks_mock):
+        read_chunks_mock.side_effect = KeyError("bug")
+        commit = CommitWithReportFactory.create(message="aaaaa", commitid="abf6d4d")
+        with self.assertRaises(KeyError):
+            fetch_report_sources([commit])
+
     def test_files_belonging_to_flags_with_one_flag(self):
         commit_report = flags_report()
         flags = ["flag-a"]
@@ -381,3 +581,44 @@ class ReportServiceTest(TestCase):
         files = files_belonging_to_flags(commit_report=commit_report, flags=flags)
         assert len(files) == 0
         assert files == []
+
+    def test_session_files_index(self):
+        commit_report = flags_report()
+        assert session_files_index(commit_report) == {0: {0}, 1: {1}, 2: {2}}
+        assert files_in_sessions(commit_report, [0, 2]) == [
+            "foo/file1.py",
+            "another/file3.py",
+        ]
+
+    def test_files_in_sessions_without_index(self):
+        commit_report = flags_report()
+        assert files_in_sessions(commit_report, [0, 2]) == [
+            "foo/file1.py",
+            "another/file3.py",
+        ]
+        # the index is only built when it can be cached
+        assert not hasattr(commit_report, "_session_files_index")
+
+    def test_session_files_index_is_kept_on_report(self):
+        commit_report = flags_report()
+        index = session_files_index(commit_report)
+        with patch.object(commit_report, "get") as get_mock:
+            assert session_files_index(commit_report) is index
+            assert files_in_sessions(commit_report, [1]) == ["bar/file2.py"]
+            assert not get_mock.called
+
+    @override_settings(REPORT_CACHE_ENABLED=True)
+    @patch("services.redis_cache.get_redis_connection")
+    def test_session_files_index_cached_with_report(self, get_redis_connection_mock):
+        get_redis_connection_mock.return_value = fakeredis.FakeStrictRedis()
+        with patch("services.report.report_chunks_cache", ReportChunksCache()):
+            commit_report = flags_report()
+            commit_report._report_cache_key = (1, "abc", "v1")
+            index = session_files_index(commit_report)
+
+            # a report built from the same chunks reads the index from the cache
+            other_report = flags_report()
+            other_report._report_cache_key = (1, "abc", "v1")
+            with patch.object(other_report, "get") as get_mock:
+                assert session_files_index(other_report) == index
+                assert not get_mock.called
@@ -0,0 +1,124 @@
+from unittest.mock import MagicMock
+
+from django.test import override_settings
+from redis.exceptions import ConnectionError
+
+from services.report_cache import LRUByteCache, ReportChunksCache
+
+
+def test_lru_byte_cache_evicts_least_recently_used():
+    cache = LRUByteCache(max_bytes=10)
+    cache.set(("a",), "aaaa")
+    cache.set(("b",), "bbbb")
+    assert cache.get(("a",)) == "aaaa"
+
+    cache.set(("c",), "cccc")
+    assert cache.get(("b",)) is None
+    assert cache.get(("a",)) == "aaaa"
+    assert cache.get(("c",)) == "cccc"
+    assert cache.current_bytes == 8
+
+
+def test_lru_byte_cache_skips_oversized_values():
+    cache = LRUByteCache(max_bytes=3)
+    cache.set(("a",), "aaaa")
+    assert cache.get(("a",)) is None
+    assert cache.current_bytes == 0
+
+
+def test_lru_byte_cache_delete_matching():
+    cache = LRUByteCache(max_bytes=100)
+    cache.set((1, "abc", "v1"), "one")
+    cache.set((1, "def", "v1"), "two")
+    cache.delete_matching(lambda key: key[:2] == (1, "abc"))
+    assert cache.get((1, "abc", "v1")) is None
+    assert cache.get((1, "def", "v1")) == "two"
+    assert cache.current_bytes == 3
+
+
+@override_settings(REPORT_CACHE_ENABLED=False)
+def test_get_or_fetch_disabled(mock_redis):
+    fetch = MagicMock(return_value="chunks")
+    cache = ReportChunksCache()
+    assert cache.get_or_fetch(1, "abc", "v1", fetch) == "chunks"
+    assert cache.get_or_fetch(1, "abc", "v1", fetch) == "chunks"
+    assert fetch.call_count == 2
+    assert mock_redis.keys("report_chunks/*") == []
+
+
+@override_settings(REPORT_CACHE_ENABLED=True)
+def test_get_or_fetch_memory_tier(mock_redis):
+    fetch = MagicMock(return_value="chunks")
+    cache = ReportChunksCache()
+    assert cache.get_or_fetch(1, "abc", "v1", fetch) == "chunks"
+    assert cache.get_or_fetch(1, "abc", "v1", fetch) == "chunks"
+    fetch.assert_called_once()
+
+
+@override_settings(REPORT_CACHE_ENABLED=True)
+def test_get_or_fetch_redis_tier_shared_across_processes(mock_redis):
+    fetch = MagicMock(return_value="chunks")
+    assert ReportChunksCache().get_or_fetch(1, "abc", "v1", fetch) == "chunks"
+    # a fresh instance has an empty memory tier and must read from redis
+    assert ReportChunksCache().get_or_fetch(1, "abc", "v1", fetch) == "chunks"
+    fetch.assert_called_once()
+    assert mock_redis.ttl("report_chunks/1/abc") > 0
+
+
+@override_settings(REPORT_CACHE_ENABLED=True)
+def test_get_or_fetch_new_version(mock_redis):
+    cache = ReportChunksCache()
+    cache.get_or_fetch(1, "abc", "v1", lambda: "old chunks")
+    assert cache.get_or_fetch(1, "abc", "v2", lambda: "new chunks") == "new chunks"
+    # older versions are dropped from redis when a newer one is written
+    assert mock_redis.hkeys("report_chunks/1/abc") == [b"v2"]
+
+
+@override_settings(REPORT_CACHE_ENABLED=True)
+def test_get_or_fetch_without_version(mock_redis):
+    fetch = MagicMock(return_value="chunks")
+    cache = ReportChunksCache()
+    cache.get_or_fetch(1, "abc", None, fetch)
+    cache.get_or_fetch(1, "abc", None, fetch)
+    assert fetch.call_count == 2
+
+
+@override_settings(REPORT_CACHE_ENABLED=True)
+def test_invalidate(mock_redis):
+    fetch = MagicMock(return_value="chunks")
+    cache = ReportChunksCache()
+    cache.get_or_fetch(1, "abc", "v1", fetch)
+    cache.invalidate(1, "abc")
+    assert not mock_redis.exists("report_chunks/1/abc")
+    cache.get_or_fetch(1, "abc", "v1", fetch)
+    assert fetch.call_count == 2
+
+
+@override_settings(REPORT_CACHE_ENABLED=True)
+def test_get_or_fetch_redis_unavailable(mocker):
+    redis = mocker.MagicMock()
+    redis.hget.side_effect = ConnectionError()
+    redis.pipeline.return_value.execute.side_effect = ConnectionError()
+    mocker.patch("services.redis_cache.get_redis_connection", return_value=redis)
+
+    cache = ReportChunksCache()
+    assert cache.get_or_fetch(1, "abc", "v1", lambda: "chunks") == "chunks"
+
+
+@override_settings(REPORT_CACHE_ENABLED=True)
+def test_extra_data_dropped_with_old_version(mock_redis):
+    cache = ReportChunksCache()
+    cache.get_or_fetch(1, "abc", "v1", lambda: "chunks")
+    cache.set_extra(1, "abc", "v1", "index", {"1": [0, 2]})
+    assert cache.get_extra(1, "abc", "v1", "index") == {"1": [0, 2]}
+    assert cache.get_extra(1, "abc", "v1", "other") is None
+
+    cache.get_or_fetch(1, "abc", "v2", lambda: "new chunks")
+    assert cache.get_extra(1, "abc", "v1", "index") is None
+
+
+@override_settings(REPORT_CACHE_ENABLED=False)
+def test_extra_data_disabled(mock_redis):
+    cache = ReportChunksCache()
+    cache.set_extra(1, "abc", "v1", "index", {"1": [0, 2]})
+    assert cache.get_extra(1, "abc", "v1", "index") is None
@@ -5,6 +5,7 @@ from unittest.mock import MagicMock
 import pytest
 from celery import Task
 from django.conf import settings
+from django.test import override_settings
 from freezegun import freeze_time
 from shared import celery_config
 
@@ -355,3 +356,30 @@ def test_backfill_commit_data_task(mocker):
         headers=dict(created_timestamp="2023-06-13T10:01:01.000123"),
         immutable=False,
     )
+
+
+@override_settings(TASK_PUBLISHER_ENABLED=True)
+def test_upload_returns_result(mocker):
+    signature_mock = mocker.patch("services.task.task.signature")
+    mocker.patch("services.task.task.route_task", return_value={"queue": "celery"})
+    publish = mocker.patch("services.task.task.task_publisher.publish")
+
+    # callers may use the result, so it isn't published in the background
+    result = TaskService().upload(repoid=1, commitid="abc", countdown=4)
+    assert result == signature_mock.return_value.apply_async.return_value
+    signature_mock.return_value.apply_async.assert_called_once_with(countdown=4)
+
+    result = TaskService().collect_profiling_commit(12)
+    assert result == signature_mock.return_value.apply_async.return_value
+    assert not publish.called
+
+
+def test_publish_upload(mocker):
+    signature_mock = mocker.patch("services.task.task.signature")
+    mocker.patch("services.task.task.route_task", return_value={"queue": "celery"})
+    publish = mocker.patch("services.task.task.task_publisher.publish")
+
+    assert TaskService().publish_upload(repoid=1, commitid="abc", countdown=4) is None
+    publish.assert_called_once_with(
+        signature_mock.return_value, on_spool=None, countdown=4
+    )
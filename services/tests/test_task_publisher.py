@@ -0,0 +1,163 @@
+import json
+import os
+import queue
+import time
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+from celery import Celery, signature
+from celery.canvas import Signature
+from django.test import override_settings
+
+from services.task.publisher import PendingTask, TaskPublisher
+
+
+@pytest.fixture
+def app():
+    app = MagicMock(spec=Celery)
+    app.producer_or_acquire.return_value.__enter__.return_value = "producer"
+    return app
+
+
+@pytest.fixture
+def publisher_settings(tmp_path):
+    with override_settings(
+        TASK_PUBLISHER_ENABLED=True,
+        TASK_PUBLISHER_MAX_RETRIES=2,
+        TASK_PUBLISHER_RETRY_BACKOFF=0,
+        TASK_PUBLISHER_SPOOL_DIR=str(tmp_path),
+    ):
+        yield tmp_path
+
+
+def make_signature(name="app.tasks.notify.Notify"):
+    sig = MagicMock()
+    sig.task = name
+    return sig
+
+
+@override_settings(TASK_PUBLISHER_ENABLED=False)
+def test_disabled_publishes_synchronously(app):
+    sig = make_signature()
+    result = TaskPublisher(app).publish(sig, countdown=4)
+    assert result == sig.apply_async.return_value
+    sig.apply_async.assert_called_once_with(countdown=4)
+
+
+def test_publishes_in_background(app, publisher_settings):
+    publisher = TaskPublisher(app)
+    first, second = make_signature(), make_signature()
+
+    assert publisher.publish(first) is None
+    assert publisher.publish(second, countdown=10) is None
+    assert publisher.flush(timeout=5)
+
+    first.apply_async.assert_called_once_with(producer="producer")
+    # the countdown runs from the time the task was enqueued
+    _, options = second.apply_async.call_args
+    assert options["producer"] == "producer"
+    assert isinstance(options["eta"], datetime)
+    assert "countdown" not in options
+
+
+def test_publishes_synchronously_when_full(app, publisher_settings):
+    publisher = TaskPublisher(app)
+    publisher._pid = os.getpid()
+    publisher._queue = MagicMock()
+    publisher._queue.put_nowait.side_effect = queue.Full()
+    publisher._queue.qsize.return_value = 1
+
+    sig = make_signature()
+    publisher.publish(sig)
+    sig.apply_async.assert_called_once_with(producer="producer")
+
+
+def test_retries_then_spools(app, publisher_settings):
+    publisher = TaskPublisher(app)
+    sig = signature("app.tasks.notify.Notify", kwargs=dict(repoid=1, commitid="abc"))
+    app.producer_or_acquire.side_effect = ConnectionError("broker down")
+
+    publisher.publish(sig, countdown=5)
+    assert publisher.flush(timeout=5)
+
+    assert app.producer_or_acquire.call_count == 3
+    (spool_file,) = os.listdir(publisher_settings)
+    with open(publisher_settings / spool_file) as spool:
+        (line,) = spool.readlines()
+    spooled = json.loads(line)
+    assert spooled["signature"]["task"] == "app.tasks.notify.Notify"
+    assert spooled["signature"]["kwargs"] == dict(repoid=1, commitid="abc")
+    assert spooled["options"]["eta"]
+
+
+def test_replays_spool(app, publisher_settings):
+    app.producer_or_acquire.side_effect = ConnectionError("broker down")
+    publisher = TaskPublisher(app)
+    sig = signature("app.tasks.notify.Notify", kwargs=dict(repoid=1))
+    publisher._publish_batch([PendingTask(signature=sig, options={})])
+    assert len(os.listdir(publisher_settings)) == 1
+
+    app.producer_or_acquire.side_effect = None
+    with patch.object(Signature, "apply_async") as apply_async:
+        publisher._replay_spool()
+
+    apply_async.assert_called_once_with(producer="producer")
+    assert os.listdir(publisher_settings) == []
+
+
+def test_replay_spool_failure_keeps_spool(app, publisher_settings):
+    app.producer_or_acquire.side_effect = ConnectionError("broker down")
+    publisher = TaskPublisher(app)
+    sig = signature("app.tasks.notify.Notify", kwargs=dict(repoid=1))
+    publisher._publish_batch([PendingTask(signature=sig, options={})])
+
+    with (
+        patch.object(publisher, "_publish_batch", side_effect=RuntimeError()),
+        pytest.raises(RuntimeError),
+    ):
+        publisher._replay_spool()
+
+    # the claimed file is handed back to the next replay
+    (spool_file,) = os.listdir(publisher_settings)
+    assert spool_file.endswith(".jsonl")
+
+    app.producer_or_acquire.side_effect = None
+    with patch.object(Signature, "apply_async") as apply_async:
+        publisher._replay_spool()
+
+    apply_async.assert_called_once_with(producer="producer")
+    assert os.listdir(publisher_settings) == []
+
+
+def test_replays_spool_on_timer(app, publisher_settings):
+    app.producer_or_acquire.side_effect = ConnectionError("broker down")
+    publisher = TaskPublisher(app)
+    sig = signature("app.tasks.notify.Notify", kwargs=dict(repoid=1))
+    publisher._publish_batch([PendingTask(signature=sig, options={})])
+    assert len(os.listdir(publisher_settings)) == 1
+
+    app.producer_or_acquire.side_effect = None
+    with (
+        override_settings(TASK_PUBLISHER_SPOOL_REPLAY_INTERVAL=0.01),
+        patch.object(Signature, "apply_async"),
+    ):
+        # the buffer never gets to idle
+        deadline = time.monotonic() + 5
+        while os.listdir(publisher_settings) and time.monotonic() < deadline:
+            publisher.publish(make_signature())
+            time.sleep(0.005)
+        assert publisher.flush(timeout=5)
+
+    assert os.listdir(publisher_settings) == []
+
+
+def test_spool_callback(app, publisher_settings):
+    app.producer_or_acquire.side_effect = ConnectionError("broker down")
+    publisher = TaskPublisher(app)
+    on_spool = MagicMock()
+
+    publisher.publish(make_signature(), on_spool=on_spool)
+    assert publisher.flush(timeout=5)
+
+    on_spool.assert_called_once_with()
@@ -0,0 +1,103 @@
+from unittest.mock import patch
+
+from django.test import override_settings
+from redis.exceptions import ConnectionError
+
+from core.tests.factories import CommitFactory, OwnerFactory
+from plan.service import PlanService
+from reports.tests.factories import CommitReportFactory, UploadFactory
+from services.upload_counters import CommitUploadCounts, UploadCounters
+
+
+@override_settings(UPLOAD_COUNTERS_ENABLED=False)
+def test_disabled(db, mock_redis):
+    commit = CommitFactory()
+    UploadFactory(report__commit=commit)
+    counts = UploadCounters().commit_counts(commit)
+    assert counts == CommitUploadCounts(total=1, new=1)
+    assert mock_redis.keys("upload_counts/*") == []
+
+
+@override_settings(UPLOAD_COUNTERS_ENABLED=True)
+def test_commit_counts_loaded_once(db, mock_redis):
+    commit = CommitFactory()
+    report = CommitReportFactory(commit=commit)
+    UploadFactory(report=report)
+    UploadFactory(report=report, state="error")
+    counters = UploadCounters()
+
+    assert counters.commit_counts(commit) == CommitUploadCounts(total=2, new=1)
+    assert mock_redis.ttl(f"upload_counts/commit/{commit.id}") > 0
+
+    # served from redis until reconciled
+    UploadFactory(report=report)
+    assert counters.commit_counts(commit) == CommitUploadCounts(total=2, new=1)
+
+    mock_redis.delete(f"upload_counts/commit/{commit.id}")
+    assert counters.commit_counts(commit) == CommitUploadCounts(total=3, new=2)
+
+
+@override_settings(UPLOAD_COUNTERS_ENABLED=True)
+def test_record_upload(db, mock_redis):
+    commit = CommitFactory(repository__private=True)
+    report = CommitReportFactory(commit=commit)
+    counters = UploadCounters()
+    plan_service = PlanService(current_org=commit.repository.author)
+
+    with patch(
+        "services.upload_counters.query_monthly_coverage_measurements",
+        return_value=10,
+    ):
+        assert counters.monthly_uploads(plan_service) == 10
+    assert counters.commit_counts(commit) == CommitUploadCounts(total=0, new=0)
+
+    counters.record_upload(UploadFactory(report=report), commit, private_repo=True)
+    counters.record_upload(
+        UploadFactory(report=report, upload_type="carriedforward"),
+        commit,
+        private_repo=True,
+    )
+
+    assert counters.commit_counts(commit) == CommitUploadCounts(total=2, new=1)
+    assert counters.monthly_uploads(plan_service) == 12
+
+
+@override_settings(UPLOAD_COUNTERS_ENABLED=True)
+def test_record_upload_does_not_create_counters(db, mock_redis):
+    commit = CommitFactory(repository__private=True)
+    upload = UploadFactory(report__commit=commit)
+    UploadCounters().record_upload(upload, commit, private_repo=True)
+    assert mock_redis.keys("upload_counts/*") == []
+
+
+@override_settings(UPLOAD_COUNTERS_ENABLED=True)
+def test_monthly_uploads_public_repo_not_recorded(db, mock_redis):
+    owner = OwnerFactory()
+    commit = CommitFactory(repository__author=owner, repository__private=False)
+    counters = UploadCounters()
+    plan_service = PlanService(current_org=owner)
+
+    with patch(
+        "services.upload_counters.query_monthly_coverage_measurements",
+        return_value=3,
+    ):
+        assert counters.monthly_uploads(plan_service) == 3
+    counters.record_upload(
+        UploadFactory(report__commit=commit), commit, private_repo=False
+    )
+    assert counters.monthly_uploads(plan_service) == 3
+
+
+@override_settings(UPLOAD_COUNTERS_ENABLED=True)
+def test_redis_errors_fall_back_to_database(db):
+    commit = CommitFactory()
+    UploadFactory(report__commit=commit)
+    counters = UploadCounters()
+    with patch.object(counters, "_redis") as redis:
+        redis.hgetall.side_effect = ConnectionError()
+        redis.pipeline.side_effect = ConnectionError()
+        redis.transaction.side_effect = ConnectionError()
+        assert counters.commit_counts(commit) == CommitUploadCounts(total=1, new=1)
+        counters.record_upload(
+            UploadFactory(report__commit=commit), commit, private_repo=False
+        )
@@ -1,12 +1,14 @@
+from collections import OrderedDict
 from unittest.mock import patch
 
-from django.contrib.auth.models import AnonymousUser
-from django.test import TransactionTestCase
+import fakeredis
+from django.test import TransactionTestCase, override_settings
 from shared.torngit.exceptions import TorngitObjectNotFoundError
 
 import services.yaml as yaml
 from codecov_auth.tests.factories import OwnerFactory
 from core.tests.factories import CommitFactory, RepositoryFactory
+from services.yaml_cache import yaml_cache
 
 
 class YamlServiceTest(TransactionTestCase):
@@ -14,6 +16,9 @@ class YamlServiceTest(TransactionTestCase):
         self.org = OwnerFactory()
         self.repo = RepositoryFactory(author=self.org, private=False)
         self.commit = CommitFactory(repository=self.repo)
+        memory = patch.object(yaml_cache, "_memory", OrderedDict())
+        memory.start()
+        self.addCleanup(memory.stop)
 
     @patch("services.yaml.fetch_current_yaml_from_provider_via_reference")
     def test_when_commit_has_yaml(self, mock_fetch_yaml):
@@ -32,3 +37,49 @@ class YamlServiceTest(TransactionTestCase):
         )
         config = yaml.final_commit_yaml(self.commit, None)
         assert config["codecov"]["require_ci_to_pass"] is True
+
+    @patch("services.yaml.fetch_current_yaml_from_provider_via_reference")
+    def test_caches_final_yaml(self, mock_fetch_yaml):
+        mock_fetch_yaml.return_value = """
+        codecov:
+          notify:
+            require_ci_to_pass: no
+        """
+        yaml.final_commit_yaml(self.commit, None)
+        config = yaml.final_commit_yaml(self.commit, None)
+        assert config["codecov"]["require_ci_to_pass"] is False
+        mock_fetch_yaml.assert_called_once()
+
+    @patch("services.yaml.fetch_current_yaml_from_provider_via_reference")
+    def test_repo_yaml_change_invalidates_cache(self, mock_fetch_yaml):
+        mock_fetch_yaml.return_value = ""
+        config = yaml.final_commit_yaml(self.commit, None)
+        assert config["codecov"]["require_ci_to_pass"] is True
+
+        self.repo.yaml = {"codecov": {"require_ci_to_pass": False}}
+        self.repo.save()
+        self.commit.refresh_from_db()
+        config = yaml.final_commit_yaml(self.commit, None)
+        assert config["codecov"]["require_ci_to_pass"] is False
+
+    @override_settings(YAML_CACHE_ENABLED=True)
+    @patch("services.yaml.fetch_current_yaml_from_provider_via_reference")
+    def test_shares_commit_yaml_through_redis(self, mock_fetch_yaml):
+        mock_fetch_yaml.return_value = """
+        codecov:
+          notify:
+            require_ci_to_pass: no
+        """
+        with patch.object(yaml_cache, "_redis", fakeredis.FakeStrictRedis()):
+            yaml.final_commit_yaml(self.commit, None)
+
+            # another process, with the new owner yaml, reuses the commit yaml
+            yaml_cache._memory.clear()
+            self.org.yaml = {"coverage": {"precision": 3}}
+            self.org.save()
+            self.commit.refresh_from_db()
+            config = yaml.final_commit_yaml(self.commit, None)
+
+        assert config["codecov"]["require_ci_to_pass"] is False
+        assert config["coverage"]["precision"] == 3
+        mock_fetch_yaml.assert_called_once()
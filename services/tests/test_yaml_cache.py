@@ -0,0 +1,61 @@
+from unittest.mock import patch
+
+from django.test import override_settings
+
+from services.yaml_cache import YamlCache, yaml_version
+
+
+def test_yaml_version():
+    assert yaml_version({"a": 1, "b": 2}) == yaml_version({"b": 2, "a": 1})
+    assert yaml_version({"a": 1}) != yaml_version({"a": 2})
+    assert yaml_version(None) != yaml_version({})
+
+
+def test_final_yaml_key():
+    cache = YamlCache()
+    key = cache.final_yaml_key(1, "abc", {"a": 1}, None)
+    assert key == cache.final_yaml_key(1, "abc", {"a": 1}, None)
+    assert key != cache.final_yaml_key(1, "abc", {"a": 2}, None)
+    assert key != cache.final_yaml_key(1, "abc", {"a": 1}, {})
+    assert key != cache.final_yaml_key(1, "def", {"a": 1}, None)
+
+
+@override_settings(YAML_CACHE_ENABLED=False, YAML_CACHE_MEMORY_MAX_ENTRIES=1)
+def test_memory(mock_redis):
+    cache = YamlCache()
+    cache.set_final_yaml("first", {"a": 1})
+    assert cache.get_final_yaml("first") == {"a": 1}
+
+    cache.set_final_yaml("second", {"a": 2})
+    assert cache.get_final_yaml("first") is None
+    assert cache.get_final_yaml("second") == {"a": 2}
+    assert mock_redis.get("second") is None
+
+
+@override_settings(YAML_CACHE_NEGATIVE_TTL=60, YAML_CACHE_TTL=3600)
+def test_negative_ttl():
+    cache = YamlCache()
+    with patch("services.yaml_cache.time.monotonic", return_value=0):
+        cache.set_final_yaml("negative", {"a": 1}, negative=True)
+        cache.set_final_yaml("positive", {"a": 1})
+
+    with patch("services.yaml_cache.time.monotonic", return_value=120):
+        assert cache.get_final_yaml("negative") is None
+        assert cache.get_final_yaml("positive") == {"a": 1}
+
+
+@override_settings(
+    YAML_CACHE_ENABLED=True, YAML_CACHE_NEGATIVE_TTL=60, YAML_CACHE_TTL=3600
+)
+def test_redis(mock_redis):
+    cache = YamlCache()
+    cache.set_final_yaml("key", {"a": 1})
+    assert YamlCache().get_final_yaml("key") == {"a": 1}
+    assert mock_redis.ttl("key") == 3600
+
+    assert cache.get_commit_yaml(1, "abc") == (False, None)
+    cache.set_commit_yaml(1, "abc", None)
+    assert cache.get_commit_yaml(1, "abc") == (True, None)
+    assert mock_redis.ttl("commit_yaml/1/abc") == 60
+    cache.set_commit_yaml(1, "abc", {"a": 1})
+    assert YamlCache().get_commit_yaml(1, "abc") == (True, {"a": 1})
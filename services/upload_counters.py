@@ -0,0 +1,142 @@
+from dataclasses import asdict, dataclass
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.db.models import Count, Q
+from shared.reports.enums import UploadType
+from shared.upload.utils import query_monthly_coverage_measurements
+
+from core.models import Commit
+from plan.service import PlanService
+from reports.models import ReportSession
+from services.redis_cache import RedisCache
+
+
+@dataclass
+class CommitUploadCounts:
+    """
+    Number of uploads of a commit: `total` counts every upload while `new` leaves
+    out errored and carried forward ones, which don't count towards upload limits.
+    """
+
+    total: int
+    new: int
+
+
+def count_commit_uploads(commit: Commit) -> CommitUploadCounts:
+    counts = ReportSession.objects.filter(report__commit=commit).aggregate(
+        total=Count("id"),
+        new=Count(
+            "id",
+            filter=~Q(state="error")
+            & ~Q(upload_type=UploadType.CARRIEDFORWARD.db_name),
+        ),
+    )
+    return CommitUploadCounts(total=counts["total"], new=counts["new"])
+
+
+class UploadCounters(RedisCache):
+    """
+    Redis counters of the uploads of each commit and of the monthly uploads of
+    each owner, so that upload throttles don't count rows on every request.
+
+    A counter is loaded from Postgres the first time it is read and kept for
+    `settings.UPLOAD_COUNTERS_TTL`, after which it is reconciled by loading it
+    again.  In between, uploads created through the API increment the existing
+    counters atomically.  Uploads created elsewhere (the worker creates the ones
+    of legacy uploads) are only accounted for on reconciliation.
+    """
+
+    enabled_setting = "UPLOAD_COUNTERS_ENABLED"
+
+    def _commit_key(self, commit_id: int) -> str:
+        return f"upload_counts/commit/{commit_id}"
+
+    def _owner_key(self, ownerid: int) -> str:
+        return f"upload_counts/owner/{ownerid}"
+
+    def commit_counts(self, commit: Commit) -> CommitUploadCounts:
+        if not self.enabled:
+            return count_commit_uploads(commit)
+
+        counts = self._get_or_load(
+            self._commit_key(commit.id),
+            lambda: asdict(count_commit_uploads(commit)),
+        )
+        return CommitUploadCounts(**counts)
+
+    def monthly_uploads(self, plan_service: PlanService) -> int:
+        if not self.enabled:
+            return query_monthly_coverage_measurements(plan_service=plan_service)
+
+        counts = self._get_or_load(
+            self._owner_key(plan_service.current_org.ownerid),
+            lambda: dict(
+                count=query_monthly_coverage_measurements(plan_service=plan_service)
+            ),
+        )
+        return counts["count"]
+
+    def record_upload(
+        self, upload: ReportSession, commit: Commit, private_repo: bool
+    ) -> None:
+        """
+        Increments the counters an upload just created through the API counts
+        towards, if they are currently loaded.
+        """
+        if not self.enabled:
+            return
+
+        increments = {self._commit_key(commit.id): ["total"]}
+        if upload.state != "error" and (
+            upload.upload_type != UploadType.CARRIEDFORWARD.db_name
+        ):
+            increments[self._commit_key(commit.id)].append("new")
+        if private_repo:
+            # measurements belong to the repository author, which is also the
+            # owner whose plan is checked (except for gitlab subgroups, whose
+            # parent group counter is only reconciled)
+            increments[self._owner_key(commit.repository.author_id)] = ["count"]
+
+        def increment(pipeline):
+            existing = [key for key in increments if pipeline.exists(key)]
+            pipeline.multi()
+            for key in existing:
+                for field in increments[key]:
+                    pipeline.hincrby(key, field, 1)
+
+        with self.suppress_redis_errors(
+            "Error incrementing upload counters", commit_id=commit.id
+        ):
+            # watching the keys makes the increments fail (and retry) rather than
+            # creating partial counters if they expire in the meantime
+            self.redis.transaction(increment, *increments.keys())
+
+    def _get_or_load(self, key: str, load: Callable[[], dict]) -> dict:
+        cached = self._get(key)
+        if cached is not None:
+            return cached
+
+        counts = load()
+        with self.suppress_redis_errors(
+            "Error writing upload counters to redis", key=key
+        ):
+            pipeline = self.redis.pipeline()
+            pipeline.delete(key)
+            pipeline.hset(key, mapping=counts)
+            pipeline.expire(key, settings.UPLOAD_COUNTERS_TTL)
+            pipeline.execute()
+        return counts
+
+    def _get(self, key: str) -> Optional[dict]:
+        fields = None
+        with self.suppress_redis_errors(
+            "Error reading upload counters from redis", key=key
+        ):
+            fields = self.redis.hgetall(key)
+        if not fields:
+            return None
+        return {field.decode(): int(value) for field, value in fields.items()}
+
+
+upload_counters = UploadCounters()
@@ -1,5 +1,4 @@
 import enum
-from functools import lru_cache
 from typing import Dict, Optional
 
 from asgiref.sync import async_to_sync
@@ -10,6 +9,7 @@ from yaml import safe_load
 from codecov_auth.models import Owner, get_config
 from core.models import Commit
 from services.repo_providers import RepoProviderService
+from services.yaml_cache import yaml_cache
 
 
 class YamlStates(enum.Enum):
@@ -38,14 +38,33 @@ def fetch_commit_yaml(commit: Commit, owner: Owner) -> Optional[Dict]:
         return None
 
 
-@lru_cache()
-# TODO: make this use the Redis cache logic in 'shared' once it's there
 def final_commit_yaml(commit: Commit, owner: Owner) -> UserYaml:
-    return UserYaml.get_final_yaml(
-        owner_yaml=commit.repository.author.yaml,
-        repo_yaml=commit.repository.yaml,
-        commit_yaml=fetch_commit_yaml(commit, owner),
+    """
+    Returns the yaml used for the commit: its own yaml merged with the yamls of
+    its repository and owner.  Results are kept in the `yaml_cache`, so the
+    yaml in the commit is only fetched from the provider once.
+    """
+    repository = commit.repository
+    owner_yaml, repo_yaml = repository.author.yaml, repository.yaml
+    key = yaml_cache.final_yaml_key(
+        repository.repoid, commit.commitid, owner_yaml, repo_yaml
+    )
+    cached = yaml_cache.get_final_yaml(key)
+    if cached is not None:
+        return UserYaml(cached)
+
+    found, commit_yaml = yaml_cache.get_commit_yaml(repository.repoid, commit.commitid)
+    if not found:
+        commit_yaml = fetch_commit_yaml(commit, owner)
+        yaml_cache.set_commit_yaml(repository.repoid, commit.commitid, commit_yaml)
+
+    final_yaml = UserYaml.get_final_yaml(
+        owner_yaml=owner_yaml,
+        repo_yaml=repo_yaml,
+        commit_yaml=commit_yaml,
     )
+    yaml_cache.set_final_yaml(key, final_yaml.to_dict(), negative=commit_yaml is None)
+    return final_yaml
 
 
 def get_yaml_state(yaml: UserYaml) -> YamlStates:
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from django.conf import settings
+
+from services.redis_cache import RedisCache
+
+
+def yaml_version(yaml: Optional[dict]) -> str:
+    """
+    Version stamp of an owner or repository yaml, derived from its content so
+    that it changes whenever the yaml does.
+    """
+    content = json.dumps(yaml, sort_keys=True, default=str).encode()
+    return hashlib.sha256(content).hexdigest()[:16]
+
+
+class YamlCache(RedisCache):
+    """
+    Cache of the final yaml of commits, keyed by the commit and the versions of
+    the owner and repository yamls it was merged with, along with the yaml found
+    in the commit itself (which only depends on the commit).
+
+    Commits without a yaml, or whose yaml couldn't be fetched, are cached for
+    `settings.YAML_CACHE_NEGATIVE_TTL` only, the others for
+    `settings.YAML_CACHE_TTL`.  Final yamls are kept in a process-local LRU and,
+    when `settings.YAML_CACHE_ENABLED`, in Redis to share them across processes.
+    """
+
+    enabled_setting = "YAML_CACHE_ENABLED"
+
+    def __init__(self):
+        self._memory: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def final_yaml_key(
+        self,
+        repoid: int,
+        commitid: str,
+        owner_yaml: Optional[dict],
+        repo_yaml: Optional[dict],
+    ) -> str:
+        return (
+            f"final_yaml/{repoid}/{commitid}/"
+            f"{yaml_version(owner_yaml)}/{yaml_version(repo_yaml)}"
+        )
+
+    def _commit_yaml_key(self, repoid: int, commitid: str) -> str:
+        return f"commit_yaml/{repoid}/{commitid}"
+
+    def get_final_yaml(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._memory.move_to_end(key)
+                return json.loads(entry[1])
+
+        if not self.enabled:
+            return None
+        value = None
+        with self.suppress_redis_errors("Error reading yaml from redis", key=key):
+            pipeline = self.redis.pipeline()
+            pipeline.get(key)
+            pipeline.ttl(key)
+            value, ttl = pipeline.execute()
+        if value is None:
+            return None
+        # the entry expires from memory along with the redis one
+        if ttl > 0:
+            self._set_in_memory(key, value, ttl)
+        return json.loads(value)
+
+    def set_final_yaml(self, key: str, yaml: dict, negative: bool = False) -> None:
+        ttl = settings.YAML_CACHE_NEGATIVE_TTL if negative else settings.YAML_CACHE_TTL
+        try:
+            value = json.dumps(yaml).encode()
+        except (TypeError, ValueError):
+            return
+        self._set_in_memory(key, value, ttl)
+        self._set_in_redis(key, value, ttl)
+
+    def get_commit_yaml(
+        self, repoid: int, commitid: str
+    ) -> tuple[bool, Optional[dict]]:
+        """
+        Returns whether the yaml of the commit is cached, and the yaml (`None`
+        when the commit has none).
+        """
+        if not self.enabled:
+            return False, None
+        value = self._get_from_redis(self._commit_yaml_key(repoid, commitid))
+        if value is None:
+            return False, None
+        return True, json.loads(value)
+
+    def set_commit_yaml(self, repoid: int, commitid: str, yaml: Optional[dict]) -> None:
+        try:
+            value = json.dumps(yaml).encode()
+        except (TypeError, ValueError):
+            return
+        ttl = (
+            settings.YAML_CACHE_NEGATIVE_TTL
+            if yaml is None
+            else settings.YAML_CACHE_TTL
+        )
+        self._set_in_redis(self._commit_yaml_key(repoid, commitid), value, ttl)
+
+    def _get_from_redis(self, key: str) -> Optional[bytes]:
+        with self.suppress_redis_errors("Error reading yaml from redis", key=key):
+            return self.redis.get(key)
+        return None
+
+    def _set_in_redis(self, key: str, value: bytes, ttl: int) -> None:
+        if not self.enabled:
+            return
+        with self.suppress_redis_errors("Error writing yaml to redis", key=key):
+            self.redis.set(key, value, ex=ttl)
+
+    def _set_in_memory(self, key: str, value: bytes, ttl: int) -> None:
+        with self._lock:
+            self._memory[key] = (time.monotonic() + ttl, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > settings.YAML_CACHE_MEMORY_MAX_ENTRIES:
+                self._memory.popitem(last=False)
+
+
+yaml_cache = YamlCache()
@@ -0,0 +1,105 @@
+import json
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Iterable, Optional
+
+from django.conf import settings
+
+from services.redis_cache import RedisCache
+from timeseries.models import Interval
+
+# (repoid, branch)
+RepoBranch = tuple[int, str]
+
+
+@dataclass
+class CoverageBins:
+    """
+    Coverage aggregates of the commits of a repository branch, by time bin.
+    Each bin holds `[min, max, sum, count]` so that bins of several branches can be
+    combined.  `created_at` is when all the bins were first aggregated and
+    `computed_at` when the most recent ones were.
+    """
+
+    created_at: datetime
+    computed_at: datetime
+    bins: dict[datetime, list[float]] = field(default_factory=dict)
+
+
+class CoverageBinsCache(RedisCache):
+    """
+    Redis cache of `CoverageBins` used to answer coverage charts of repositories
+    whose timeseries data is not backfilled yet.  Entries are extended with newer
+    bins as commits come in and recomputed from scratch once they are older than
+    `settings.COVERAGE_FALLBACK_CACHE_TTL`.
+    """
+
+    enabled_setting = "COVERAGE_FALLBACK_CACHE_ENABLED"
+
+    def _redis_key(self, repo: RepoBranch, interval: Interval) -> str:
+        repoid, branch = repo
+        return f"coverage_bins/{interval.value}/{repoid}/{branch}"
+
+    def get_many(
+        self, repos: Iterable[RepoBranch], interval: Interval
+    ) -> dict[RepoBranch, CoverageBins]:
+        repos = list(repos)
+        if not self.enabled or not repos:
+            return {}
+
+        with self.suppress_redis_errors(
+            "Error reading coverage bins from redis", interval=interval.value
+        ):
+            values = self.redis.mget(
+                [self._redis_key(repo, interval) for repo in repos]
+            )
+            return {
+                repo: self._deserialize(value)
+                for repo, value in zip(repos, values)
+                if value is not None
+            }
+        return {}
+
+    def set_many(
+        self, entries: dict[RepoBranch, CoverageBins], interval: Interval
+    ) -> None:
+        if not self.enabled or not entries:
+            return
+
+        with self.suppress_redis_errors(
+            "Error writing coverage bins to redis", interval=interval.value
+        ):
+            pipeline = self.redis.pipeline()
+            for repo, entry in entries.items():
+                pipeline.set(
+                    self._redis_key(repo, interval),
+                    self._serialize(entry),
+                    ex=settings.COVERAGE_FALLBACK_CACHE_TTL,
+                )
+            pipeline.execute()
+
+    def _serialize(self, entry: CoverageBins) -> bytes:
+        data = {
+            "created_at": entry.created_at.isoformat(),
+            "computed_at": entry.computed_at.isoformat(),
+            "bins": [
+                [timestamp.isoformat(), *values]
+                for timestamp, values in sorted(entry.bins.items())
+            ],
+        }
+        return zlib.compress(json.dumps(data).encode())
+
+    def _deserialize(self, value: bytes) -> CoverageBins:
+        data = json.loads(zlib.decompress(value))
+        return CoverageBins(
+            created_at=datetime.fromisoformat(data["created_at"]),
+            computed_at=datetime.fromisoformat(data["computed_at"]),
+            bins={
+                datetime.fromisoformat(timestamp): values
+                for timestamp, *values in data["bins"]
+            },
+        )
+
+
+coverage_bins_cache = CoverageBinsCache()
@@ -6,6 +6,7 @@ from django.conf import settings
 from django.db import connections
 from django.db.models import (
     Avg,
+    Count,
     DateTimeField,
     DecimalField,
     F,
@@ -26,6 +27,7 @@ from codecov_auth.models import Owner
 from core.models import Commit, Repository
 from reports.models import RepositoryFlag
 from services.task import TaskService
+from timeseries.fallback_cache import CoverageBins, RepoBranch, coverage_bins_cache
 from timeseries.models import (
     Dataset,
     Interval,
@@ -34,6 +36,9 @@ from timeseries.models import (
     MeasurementSummary,
 )
 
+# bins this recent are recomputed when extending cached coverage bins
+COVERAGE_BINS_RECOMPUTE_WINDOW = timedelta(days=1)
+
 interval_deltas = {
     Interval.INTERVAL_1_DAY: timedelta(days=1),
     Interval.INTERVAL_7_DAY: timedelta(days=7),
@@ -292,7 +297,7 @@ def coverage_fallback_query(
         return commits.order_by("timestamp_bin")
 
 
-def _commits_coverage(
+def _annotate_coverage(
     commits_queryset: QuerySet[Commit], interval: Interval
 ) -> QuerySet[Commit]:
     intervals = {
@@ -301,19 +306,24 @@ def _commits_coverage(
         Interval.INTERVAL_30_DAY: "30 days",
     }
 
+    return commits_queryset.annotate(
+        timestamp_bin=Func(
+            Value(intervals[interval]),
+            F("timestamp"),
+            Value("2000-01-03"),  # mimic how Timescale aligns bins
+            function="date_bin",
+            template="%(function)s(%(expressions)s) at time zone 'utc'",
+            output_field=DateTimeField(),
+        ),
+        coverage=Cast(KeyTextTransform("c", "totals"), output_field=FloatField()),
+    ).filter(coverage__isnull=False)
+
+
+def _commits_coverage(
+    commits_queryset: QuerySet[Commit], interval: Interval
+) -> QuerySet[Commit]:
     return (
-        commits_queryset.annotate(
-            timestamp_bin=Func(
-                Value(intervals[interval]),
-                F("timestamp"),
-                Value("2000-01-03"),  # mimic how Timescale aligns bins
-                function="date_bin",
-                template="%(function)s(%(expressions)s) at time zone 'utc'",
-                output_field=DateTimeField(),
-            ),
-            coverage=Cast(KeyTextTransform("c", "totals"), output_field=FloatField()),
-        )
-        .filter(coverage__isnull=False)
+        _annotate_coverage(commits_queryset, interval)
         .values("timestamp_bin")
         .annotate(
             min=Min("coverage"),
@@ -324,17 +334,158 @@ def _commits_coverage(
     )
 
 
+def _fetch_coverage_bins(
+    repos: List[RepoBranch],
+    interval: Interval,
+    since: Optional[datetime] = None,
+) -> dict[RepoBranch, dict[datetime, list[float]]]:
+    """
+    Aggregates the coverage of the commits on the given repository branches by
+    time bin, optionally only for the commits made `since` the given date.
+    """
+    commits = Commit.objects.all()
+    if since is not None:
+        commits = commits.filter(timestamp__gte=since)
+    commits = commits.extra(
+        where=["(repoid, branch) in %s"],
+        params=[tuple(repos)],
+    )
+    rows = (
+        _annotate_coverage(commits, interval)
+        .values("repository_id", "branch", "timestamp_bin")
+        .annotate(
+            min=Min("coverage"),
+            max=Max("coverage"),
+            sum=Sum("coverage"),
+            count=Count("coverage"),
+        )
+        .order_by()
+    )
+
+    bins = {}
+    for row in rows:
+        timestamp_bin = row["timestamp_bin"].replace(tzinfo=timezone.utc)
+        bins.setdefault((row["repository_id"], row["branch"]), {})[timestamp_bin] = [
+            row["min"],
+            row["max"],
+            row["sum"],
+            row["count"],
+        ]
+    return bins
+
+
+def cached_coverage_fallback(
+    interval: Interval,
+    repos: Iterable[RepoBranch],
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+) -> List[dict]:
+    """
+    Returns the same measurements as `coverage_fallback_query` for the given
+    `(repoid, branch)` pairs, but built from per-branch coverage bins cached in Redis.
+    Cached bins are only extended with the commits made since they were last
+    computed instead of aggregating every commit again.
+
+    Unlike `coverage_fallback_query`, the bins containing `start_date` and
+    `end_date` cover all of their commits.
+    """
+    repos = list(set(repos))
+    if not repos:
+        return []
+
+    now = timezone.now()
+    max_age = timedelta(seconds=settings.COVERAGE_FALLBACK_CACHE_TTL)
+    cached = {
+        repo: entry
+        for repo, entry in coverage_bins_cache.get_many(repos, interval).items()
+        if now - entry.created_at <= max_age
+    }
+
+    entries = {}
+    missing = [repo for repo in repos if repo not in cached]
+    if missing:
+        bins = _fetch_coverage_bins(missing, interval)
+        for repo in missing:
+            entries[repo] = CoverageBins(
+                created_at=now, computed_at=now, bins=bins.get(repo, {})
+            )
+
+    if cached:
+        # recent bins are recomputed since commits may be processed well after
+        # their timestamp
+        since = {
+            repo: aligned_start_date(
+                interval, entry.computed_at - COVERAGE_BINS_RECOMPUTE_WINDOW
+            )
+            for repo, entry in cached.items()
+        }
+        bins = _fetch_coverage_bins(list(cached), interval, since=min(since.values()))
+        for repo, entry in cached.items():
+            entry.bins = {
+                timestamp_bin: values
+                for timestamp_bin, values in entry.bins.items()
+                if timestamp_bin < since[repo]
+            }
+            entry.bins.update(
+                (timestamp_bin, values)
+                for timestamp_bin, values in bins.get(repo, {}).items()
+                if timestamp_bin >= since[repo]
+            )
+            entry.computed_at = now
+            entries[repo] = entry
+
+    coverage_bins_cache.set_many(entries, interval)
+
+    # combine the bins of every branch
+    combined = {}
+    for entry in entries.values():
+        for timestamp_bin, (min_, max_, sum_, count) in entry.bins.items():
+            if timestamp_bin in combined:
+                values = combined[timestamp_bin]
+                values[0] = min(values[0], min_)
+                values[1] = max(values[1], max_)
+                values[2] += sum_
+                values[3] += count
+            else:
+                combined[timestamp_bin] = [min_, max_, sum_, count]
+
+    measurements = [
+        {
+            "timestamp_bin": timestamp_bin,
+            "avg": sum_ / count,
+            "min": min_,
+            "max": max_,
+        }
+        for timestamp_bin, (min_, max_, sum_, count) in sorted(combined.items())
+        if end_date is None or timestamp_bin <= end_date
+    ]
+
+    if start_date:
+        # carry the most recent older datapoint (see `coverage_fallback_query`)
+        start_bin = aligned_start_date(interval, start_date)
+        older = [m for m in measurements if m["timestamp_bin"] < start_bin]
+        measurements = older[-1:] + [
+            m for m in measurements if m["timestamp_bin"] >= start_bin
+        ]
+
+    return measurements
+
+
 def repository_coverage_measurements_with_fallback(
     repository: Repository,
     interval: Interval,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     branch: str = None,
+    allow_cached_fallback: bool = False,
 ):
     """
     Tries to return repository coverage measurements from Timescale.
     If those are not available then we trigger a backfill and return computed results
     directly from the primary database (much slower to query).
+
+    With `allow_cached_fallback`, callers accept those computed results as a list
+    built by `cached_coverage_fallback` (when enabled) rather than a QuerySet.
     """
     dataset = None
     if settings.TIMESERIES_ENABLED:
@@ -364,6 +515,13 @@ def repository_coverage_measurements_with_fallback(
             trigger_backfill(dataset)
 
         # we're still backfilling or timeseries is disabled
+        if allow_cached_fallback and coverage_bins_cache.enabled:
+            return cached_coverage_fallback(
+                interval,
+                [(repository.pk, branch or repository.branch)],
+                start_date=start_date,
+                end_date=end_date,
+            )
         return coverage_fallback_query(
             interval,
             start_date=start_date,
@@ -424,6 +582,13 @@ def owner_coverage_measurements_with_fallback(
                 trigger_backfill(dataset)
 
         # we're still backfilling or timeseries is disabled
+        if coverage_bins_cache.enabled:
+            return cached_coverage_fallback(
+                interval,
+                [(repo.repoid, repo.branch) for repo in repos],
+                start_date=start_date,
+                end_date=end_date,
+            )
         return coverage_fallback_query(
             interval,
             start_date=start_date,
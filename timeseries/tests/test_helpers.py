@@ -1,9 +1,10 @@
 from datetime import datetime, timezone
 from unittest.mock import call, patch
 
+import fakeredis
 import pytest
 from django.conf import settings
-from django.test import TransactionTestCase
+from django.test import TransactionTestCase, override_settings
 from freezegun import freeze_time
 from freezegun.api import FakeDatetime
 from shared.reports.resources import Report, ReportFile, ReportLine
@@ -12,7 +13,10 @@ from shared.utils.sessions import Session
 from codecov_auth.tests.factories import OwnerFactory
 from core.tests.factories import CommitFactory, RepositoryFactory
 from reports.tests.factories import RepositoryFlagFactory
+from timeseries.fallback_cache import coverage_bins_cache
 from timeseries.helpers import (
+    cached_coverage_fallback,
+    coverage_fallback_query,
     coverage_measurements,
     fill_sparse_measurements,
     owner_coverage_measurements_with_fallback,
@@ -1131,3 +1135,138 @@ class OwnerCoverageMeasurementsWithFallbackTest(TransactionTestCase):
                 "max": 80.0,
             },
         ]
+
+
+@override_settings(COVERAGE_FALLBACK_CACHE_ENABLED=True)
+class CachedCoverageFallbackTest(TransactionTestCase):
+    def setUp(self):
+        self.owner = OwnerFactory()
+        self.repo1 = RepositoryFactory(author=self.owner, branch="master")
+        self.repo2 = RepositoryFactory(author=self.owner, branch="master")
+        self.repos = [(self.repo1.pk, "master"), (self.repo2.pk, "master")]
+
+        redis_patcher = patch.object(
+            coverage_bins_cache, "_redis", fakeredis.FakeStrictRedis()
+        )
+        self.redis = redis_patcher.start()
+        self.addCleanup(redis_patcher.stop)
+
+        CommitFactory(
+            commitid="commit1",
+            repository_id=self.repo1.pk,
+            branch="master",
+            timestamp=datetime(2022, 1, 1, 1, 0, 0, 0, tzinfo=timezone.utc),
+            totals={"c": "80.00"},
+        )
+        CommitFactory(
+            commitid="commit2",
+            repository_id=self.repo1.pk,
+            branch="master",
+            timestamp=datetime(2022, 1, 1, 2, 0, 0, 0, tzinfo=timezone.utc),
+            totals={"c": "85.00"},
+        )
+        CommitFactory(
+            commitid="commit3",
+            repository_id=self.repo1.pk,
+            branch="other",
+            timestamp=datetime(2022, 1, 1, 3, 0, 0, 0, tzinfo=timezone.utc),
+            totals={"c": "90.00"},
+        )
+        CommitFactory(
+            commitid="commit4",
+            repository_id=self.repo2.pk,
+            branch="master",
+            timestamp=datetime(2022, 1, 2, 1, 0, 0, 0, tzinfo=timezone.utc),
+            totals={"c": "90.00"},
+        )
+
+    def _measurements(self):
+        return cached_coverage_fallback(
+            Interval.INTERVAL_1_DAY,
+            self.repos,
+            start_date=datetime(2021, 12, 31, 0, 0, 0, tzinfo=timezone.utc),
+            end_date=datetime(2022, 1, 3, 0, 0, 0, tzinfo=timezone.utc),
+        )
+
+    @freeze_time("2022-01-02T06:00:00")
+    def test_matches_fallback_query(self):
+        expected = list(
+            coverage_fallback_query(
+                Interval.INTERVAL_1_DAY,
+                start_date=datetime(2021, 12, 31, 0, 0, 0, tzinfo=timezone.utc),
+                end_date=datetime(2022, 1, 3, 0, 0, 0, tzinfo=timezone.utc),
+                repos=[self.repo1, self.repo2],
+            )
+        )
+        assert self._measurements() == expected
+        # served from the cache
+        assert self._measurements() == expected
+
+    def test_extends_cached_bins(self):
+        with freeze_time("2022-01-02T06:00:00"):
+            self._measurements()
+
+        # too old to be picked up until the cached bins are recomputed
+        CommitFactory(
+            commitid="commit5",
+            repository_id=self.repo1.pk,
+            branch="master",
+            timestamp=datetime(2021, 12, 20, 1, 0, 0, 0, tzinfo=timezone.utc),
+            totals={"c": "10.00"},
+        )
+        CommitFactory(
+            commitid="commit6",
+            repository_id=self.repo2.pk,
+            branch="master",
+            timestamp=datetime(2022, 1, 2, 8, 0, 0, 0, tzinfo=timezone.utc),
+            totals={"c": "70.00"},
+        )
+
+        with freeze_time("2022-01-02T09:00:00"):
+            assert self._measurements() == [
+                {
+                    "timestamp_bin": datetime(2022, 1, 1, 0, 0, tzinfo=timezone.utc),
+                    "avg": 82.5,
+                    "min": 80.0,
+                    "max": 85.0,
+                },
+                {
+                    "timestamp_bin": datetime(2022, 1, 2, 0, 0, tzinfo=timezone.utc),
+                    "avg": 80.0,
+                    "min": 70.0,
+                    "max": 90.0,
+                },
+            ]
+
+        with freeze_time("2022-01-03T09:00:00"):
+            # entries older than the TTL are recomputed from scratch
+            assert self._measurements()[0] == {
+                "timestamp_bin": datetime(2021, 12, 20, 0, 0, tzinfo=timezone.utc),
+                "avg": 10.0,
+                "min": 10.0,
+                "max": 10.0,
+            }
+
+    @override_settings(TIMESERIES_ENABLED=False)
+    def test_owner_coverage_measurements(self):
+        res = owner_coverage_measurements_with_fallback(
+            owner=self.owner,
+            repo_ids=[self.repo1.pk, self.repo2.pk],
+            interval=Interval.INTERVAL_1_DAY,
+            start_date=datetime(2021, 12, 31, 0, 0, 0, tzinfo=timezone.utc),
+            end_date=datetime(2022, 1, 3, 0, 0, 0, tzinfo=timezone.utc),
+        )
+        assert res == [
+            {
+                "timestamp_bin": datetime(2022, 1, 1, 0, 0, tzinfo=timezone.utc),
+                "avg": 82.5,
+                "min": 80.0,
+                "max": 85.0,
+            },
+            {
+                "timestamp_bin": datetime(2022, 1, 2, 0, 0, tzinfo=timezone.utc),
+                "avg": 90.0,
+                "min": 90.0,
+                "max": 90.0,
+            },
+        ]
@@ -8,14 +8,11 @@ from asgiref.sync import async_to_sync
 from cerberus import Validator
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
-from django.db.models import Q
 from django.utils import timezone
 from jwt import PyJWKClient, PyJWTError
 from rest_framework.exceptions import NotFound, Throttled, ValidationError
 from shared.github import InvalidInstallationError
-from shared.reports.enums import UploadType
 from shared.torngit.exceptions import TorngitClientError, TorngitObjectNotFoundError
-from shared.upload.utils import query_monthly_coverage_measurements
 
 from codecov_auth.models import (
     GITHUB_APP_INSTALLATION_DEFAULT_NAME,
@@ -27,11 +24,12 @@ from codecov_auth.models import (
 from core.models import Commit, Repository
 from plan.constants import USER_PLAN_REPRESENTATIONS
 from plan.service import PlanService
-from reports.models import CommitReport, ReportSession
+from reports.models import CommitReport
 from services.analytics import AnalyticsService
 from services.redis_configuration import get_redis_connection
 from services.repo_providers import RepoProviderService
 from services.task import TaskService
+from services.upload_counters import upload_counters
 from upload.tokenless.tokenless import TokenlessUploadHandler
 from utils import is_uuid
 from utils.config import get_config
@@ -522,14 +520,11 @@ def check_commit_upload_constraints(commit: Commit):
         plan_service = PlanService(current_org=owner)
         limit = plan_service.monthly_uploads_limit
         if limit is not None:
-            did_commit_uploads_start_already = ReportSession.objects.filter(
-                report__commit=commit
-            ).exists()
+            did_commit_uploads_start_already = (
+                upload_counters.commit_counts(commit).total > 0
+            )
             if not did_commit_uploads_start_already:
-                if (
-                    query_monthly_coverage_measurements(plan_service=plan_service)
-                    >= limit
-                ):
+                if upload_counters.monthly_uploads(plan_service) >= limit:
                     log.warning(
                         "User exceeded its limits for usage",
                         extra=dict(ownerid=owner.ownerid, repoid=commit.repository_id),
@@ -555,11 +550,11 @@ def validate_upload(upload_params, repository, redis):
         commit = Commit.objects.get(
             commitid=upload_params.get("commit"), repository=repository
         )
-        new_session_count = ReportSession.objects.filter(
-            ~Q(state="error"),
-            ~Q(upload_type=UploadType.CARRIEDFORWARD.db_name),
-            report__commit=commit,
-        ).count()
+        # the worker creates the uploads of this (legacy) endpoint, so with
+        # `settings.UPLOAD_COUNTERS_ENABLED` they are only counted once the
+        # commit's counter is reloaded from the database, which can let up to
+        # `settings.UPLOAD_COUNTERS_TTL` seconds worth of uploads past the limit
+        new_session_count = upload_counters.commit_counts(commit).new
         session_count = (commit.totals.get("s") if commit.totals else 0) or 0
         current_upload_limit = get_config("setup", "max_sessions") or 150
         if new_session_count > current_upload_limit:
@@ -700,11 +695,14 @@ def dispatch_upload_task(
 ):
     # Store task arguments in redis
     cache_uploads_eta = get_config(("setup", "cache", "uploads"), default=86400)
+    commitid = task_arguments.get("commit")
     if report_type == CommitReport.ReportType.COVERAGE:
-        repo_queue_key = f"uploads/{repository.repoid}/{task_arguments.get('commit')}"
+        repo_queue_key = f"uploads/{repository.repoid}/{commitid}"
+        latest_upload_key = f"latest_upload/{repository.repoid}/{commitid}"
     else:
-        repo_queue_key = (
-            f"uploads/{repository.repoid}/{task_arguments.get('commit')}/{report_type}"
+        repo_queue_key = f"uploads/{repository.repoid}/{commitid}/{report_type}"
+        latest_upload_key = (
+            f"latest_upload/{repository.repoid}/{commitid}/{report_type}"
         )
 
     countdown = 0
@@ -715,34 +713,62 @@ def dispatch_upload_task(
         or CommitReport.ReportType.TEST_RESULTS
     ):
         countdown = 4
+    countdown = max(countdown, int(get_config("setup", "upload_processing_delay") or 0))
 
-    redis.rpush(repo_queue_key, dumps(task_arguments))
-    redis.expire(
+    pipeline = redis.pipeline()
+    pipeline.rpush(repo_queue_key, dumps(task_arguments))
+    pipeline.expire(
         repo_queue_key, cache_uploads_eta if cache_uploads_eta is not True else 86400
     )
-
-    if report_type == CommitReport.ReportType.COVERAGE:
-        latest_upload_key = (
-            f"latest_upload/{repository.repoid}/{task_arguments.get('commit')}"
-        )
-    else:
-        latest_upload_key = f"latest_upload/{repository.repoid}/{task_arguments.get('commit')}/{report_type}"
-    redis.setex(
+    pipeline.setex(
         latest_upload_key,
         3600,
         timezone.now().timestamp(),
     )
-    commitid = task_arguments.get("commit")
 
-    TaskService().upload(
-        repoid=repository.repoid,
-        commitid=commitid,
-        report_type=str(report_type),
-        report_code=task_arguments.get("report_code"),
-        countdown=max(
-            countdown, int(get_config("setup", "upload_processing_delay") or 0)
-        ),
-    )
+    # The upload task processes every argument queued before it runs, so uploads
+    # queued before the countdown of an already scheduled task elapses don't need
+    # a task of their own.  The key expires ahead of the countdown: an upload
+    # queued once the task may have drained the queue schedules a new task.
+    debounce_key = None
+    debounce_ttl = countdown - settings.UPLOAD_DISPATCH_DEBOUNCE_MARGIN
+    if settings.UPLOAD_DISPATCH_DEBOUNCE_ENABLED and debounce_ttl > 0:
+        debounce_key = f"upload_dispatch/{repository.repoid}/{commitid}/{report_type}/{task_arguments.get('report_code')}"
+        pipeline.set(
+            debounce_key,
+            1,
+            ex=debounce_ttl,
+            nx=True,
+        )
+
+    results = pipeline.execute()
+    if debounce_key is not None and not results[-1]:
+        log.info(
+            "Upload task already scheduled for commit",
+            extra=dict(
+                repoid=repository.repoid, commit=commitid, report_type=report_type
+            ),
+        )
+        return
+
+    def release_debounce():
+        # a spooled task only runs once the spool is replayed
+        redis.delete(debounce_key)
+
+    try:
+        TaskService().publish_upload(
+            repoid=repository.repoid,
+            commitid=commitid,
+            report_type=str(report_type),
+            report_code=task_arguments.get("report_code"),
+            countdown=countdown,
+            on_spool=release_debounce if debounce_key is not None else None,
+        )
+    except Exception:
+        # let the next upload schedule the task instead
+        if debounce_key is not None:
+            redis.delete(debounce_key)
+        raise
 
 
 def validate_activated_repo(repository):
@@ -1,4 +1,4 @@
-from unittest.mock import MagicMock, Mock, patch
+from unittest.mock import Mock
 
 from django.test import override_settings
 from rest_framework.test import APITestCase
@@ -10,6 +10,7 @@ from plan.constants import PlanName
 from reports.tests.factories import CommitReportFactory, UploadFactory
 from services.redis_configuration import get_redis_connection
 from upload.throttles import UploadsPerCommitThrottle, UploadsPerWindowThrottle
+from upload.views.base import GetterMixin
 
 
 class ThrottlesUnitTests(APITestCase):
@@ -23,9 +24,9 @@ class ThrottlesUnitTests(APITestCase):
         self.uploads_per_commit_not_throttled(commit)
 
     def set_view_obj(self, commit):
-        view = MagicMock()
-        view.get_repo.return_value = commit.repository
-        view.get_commit.return_value = commit
+        view = GetterMixin()
+        view.get_repo = Mock(return_value=commit.repository)
+        view.get_commit = Mock(return_value=commit)
         return view
 
     def uploads_per_commit_throttled(self, commit):
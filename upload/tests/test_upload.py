@@ -4,6 +4,7 @@ from json import dumps, loads
 from unittest.mock import ANY, PropertyMock, patch
 from urllib.parse import urlencode
 
+import fakeredis
 import pytest
 import requests
 import rest_framework
@@ -78,6 +79,12 @@ class MockRedis:
     def setex(self, redis_key, expire_time, report):
         return
 
+    def pipeline(self):
+        return self
+
+    def execute(self):
+        return []
+
     def set(self, redis_key, value, **kwargs):
         # This is only used when setting the cache key for the number of uploads. Will need to be refactored if we use it for something else.
         assert self.get(redis_key) + 1 == value
@@ -879,7 +886,7 @@ class UploadHandlerHelpersTest(TestCase):
         assert repo.deleted == False
 
     @freeze_time("2023-01-01T00:00:00")
-    @patch("services.task.TaskService.upload")
+    @patch("services.task.TaskService.publish_upload")
     def test_dispatch_upload_task(self, upload):
         repo = G(Repository)
         task_arguments = {
@@ -903,7 +910,92 @@ class UploadHandlerHelpersTest(TestCase):
             report_code="local_report",
             countdown=4,
             report_type="coverage",
+            on_spool=None,
+        )
+
+    @override_settings(UPLOAD_DISPATCH_DEBOUNCE_ENABLED=True)
+    @patch("services.task.TaskService.publish_upload")
+    def test_dispatch_upload_task_debounced(self, upload):
+        repo = G(Repository)
+        redis = fakeredis.FakeStrictRedis()
+        first_arguments = {"commit": "commit123", "version": "v4", "build": "1"}
+        second_arguments = {"commit": "commit123", "version": "v4", "build": "2"}
+
+        dispatch_upload_task(first_arguments, repo, redis)
+        dispatch_upload_task(second_arguments, repo, redis)
+
+        # both uploads are queued for the single scheduled task
+        assert [
+            loads(arguments)
+            for arguments in redis.lrange(f"uploads/{repo.repoid}/commit123", 0, -1)
+        ] == [first_arguments, second_arguments]
+        assert redis.get(f"latest_upload/{repo.repoid}/commit123")
+        upload.assert_called_once_with(
+            repoid=repo.repoid,
+            commitid="commit123",
+            report_code=None,
+            countdown=4,
+            report_type="coverage",
+            on_spool=ANY,
         )
+        # the key expires before the countdown of the task elapses
+        debounce_key = f"upload_dispatch/{repo.repoid}/commit123/coverage/None"
+        assert 0 < redis.ttl(debounce_key) < 4
+
+        # a new task is scheduled once the pending one may have run
+        redis.delete(debounce_key)
+        dispatch_upload_task(first_arguments, repo, redis)
+        assert upload.call_count == 2
+
+    @override_settings(UPLOAD_DISPATCH_DEBOUNCE_ENABLED=True)
+    @patch("services.task.TaskService.publish_upload")
+    def test_dispatch_upload_task_after_queue_drained(self, upload):
+        repo = G(Repository)
+        redis = fakeredis.FakeStrictRedis()
+        first_arguments = {"commit": "commit123", "version": "v4", "build": "1"}
+        second_arguments = {"commit": "commit123", "version": "v4", "build": "2"}
+        repo_queue_key = f"uploads/{repo.repoid}/commit123"
+
+        with freeze_time("2024-01-01T00:00:00") as frozen_time:
+            dispatch_upload_task(first_arguments, repo, redis)
+            # the countdown elapses and the scheduled task drains the queue
+            frozen_time.tick(4)
+            redis.delete(repo_queue_key)
+
+            dispatch_upload_task(second_arguments, repo, redis)
+
+        assert [
+            loads(arguments) for arguments in redis.lrange(repo_queue_key, 0, -1)
+        ] == [second_arguments]
+        assert upload.call_count == 2
+
+    @override_settings(UPLOAD_DISPATCH_DEBOUNCE_ENABLED=True)
+    @patch("services.task.TaskService.publish_upload")
+    def test_dispatch_upload_task_debounce_released_on_spool(self, upload):
+        repo = G(Repository)
+        redis = fakeredis.FakeStrictRedis()
+        task_arguments = {"commit": "commit123", "version": "v4"}
+
+        dispatch_upload_task(task_arguments, repo, redis)
+        # the publisher couldn't reach the broker and spooled the task
+        upload.call_args.kwargs["on_spool"]()
+        dispatch_upload_task(task_arguments, repo, redis)
+
+        assert upload.call_count == 2
+
+    @override_settings(UPLOAD_DISPATCH_DEBOUNCE_ENABLED=True)
+    @patch("services.task.TaskService.publish_upload")
+    def test_dispatch_upload_task_debounce_released_on_error(self, upload):
+        repo = G(Repository)
+        redis = fakeredis.FakeStrictRedis()
+        task_arguments = {"commit": "commit123", "version": "v4"}
+        upload.side_effect = [Exception("broker unavailable"), None]
+
+        with pytest.raises(Exception):
+            dispatch_upload_task(task_arguments, repo, redis)
+        dispatch_upload_task(task_arguments, repo, redis)
+
+        assert upload.call_count == 2
 
 
 class UploadHandlerRouteTest(APITestCase):
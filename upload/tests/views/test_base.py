@@ -3,6 +3,7 @@ from rest_framework.exceptions import ValidationError
 
 from core.tests.factories import CommitFactory, RepositoryFactory
 from reports.models import CommitReport
+from reports.tests.factories import UploadFactory
 from upload.views.base import GetterMixin
 
 
@@ -81,3 +82,55 @@ def test_get_report_error(db):
     with pytest.raises(ValidationError) as exp:
         generic_class.get_report(commit)
     assert exp.match("Report not found")
+
+
+def test_getters_are_memoized(db, django_assert_num_queries):
+    repository = RepositoryFactory(
+        name="the_repo", author__username="codecov", author__service="github"
+    )
+    commit = CommitFactory(repository=repository)
+    report = CommitReport(commit=commit, report_type=CommitReport.ReportType.COVERAGE)
+    report.save()
+    generic_class = GetterMixin()
+    generic_class.kwargs = dict(
+        repo="codecov::::the_repo",
+        service="github",
+        commit_sha=commit.commitid,
+        report_code=report.code,
+    )
+
+    recovered_repo = generic_class.get_repo()
+    recovered_commit = generic_class.get_commit(recovered_repo)
+    recovered_report = generic_class.get_report(recovered_commit)
+
+    with django_assert_num_queries(0):
+        assert generic_class.get_repo() is recovered_repo
+        assert generic_class.get_commit(recovered_repo) is recovered_commit
+        assert generic_class.get_report(recovered_commit) is recovered_report
+
+
+def test_getters_errors_are_not_memoized(db):
+    repository = RepositoryFactory(name="the_repo", author__username="codecov")
+    generic_class = GetterMixin()
+    generic_class.kwargs = dict(repo=repository.name, commit_sha="missing_commit")
+    with pytest.raises(ValidationError):
+        generic_class.get_commit(repository)
+
+    commit = CommitFactory(repository=repository, commitid="missing_commit")
+    assert generic_class.get_commit(repository) == commit
+
+
+def test_get_upload_counts(db, django_assert_num_queries):
+    commit = CommitFactory()
+    report = CommitReport(commit=commit)
+    report.save()
+    UploadFactory(report=report)
+    UploadFactory(report=report, state="error")
+    UploadFactory(report=report, upload_type="carriedforward")
+    generic_class = GetterMixin()
+
+    with django_assert_num_queries(1):
+        counts = generic_class.get_upload_counts(commit)
+        assert generic_class.get_upload_counts(commit) is counts
+    assert counts.total == 3
+    assert counts.new == 1
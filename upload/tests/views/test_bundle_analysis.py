@@ -17,7 +17,7 @@ from timeseries.models import Dataset, MeasurementName
 
 @pytest.mark.django_db(databases={"default", "timeseries"})
 def test_upload_bundle_analysis(db, client, mocker, mock_redis):
-    upload = mocker.patch.object(TaskService, "upload")
+    upload = mocker.patch.object(TaskService, "publish_upload")
     mock_sentry_metrics = mocker.patch(
         "upload.views.bundle_analysis.sentry_metrics.incr"
     )
@@ -86,6 +86,7 @@ def test_upload_bundle_analysis(db, client, mocker, mock_redis):
         countdown=4,
         report_code=None,
         report_type="bundle_analysis",
+        on_spool=None,
     )
     mock_sentry_metrics.assert_called_with(
         "upload",
@@ -102,7 +103,7 @@ def test_upload_bundle_analysis(db, client, mocker, mock_redis):
 
 @pytest.mark.django_db(databases={"default", "timeseries"})
 def test_upload_bundle_analysis_org_token(db, client, mocker, mock_redis):
-    upload = mocker.patch.object(TaskService, "upload")
+    upload = mocker.patch.object(TaskService, "publish_upload")
     create_presigned_put = mocker.patch(
         "services.archive.StorageService.create_presigned_put",
         return_value="test-presigned-put",
@@ -127,7 +128,7 @@ def test_upload_bundle_analysis_org_token(db, client, mocker, mock_redis):
 
 @pytest.mark.django_db(databases={"default", "timeseries"})
 def test_upload_bundle_analysis_existing_commit(db, client, mocker, mock_redis):
-    upload = mocker.patch.object(TaskService, "upload")
+    upload = mocker.patch.object(TaskService, "publish_upload")
     create_presigned_put = mocker.patch(
         "services.archive.StorageService.create_presigned_put",
         return_value="test-presigned-put",
@@ -155,11 +156,12 @@ def test_upload_bundle_analysis_existing_commit(db, client, mocker, mock_redis):
         countdown=4,
         report_code=None,
         report_type="bundle_analysis",
+        on_spool=None,
     )
 
 
 def test_upload_bundle_analysis_missing_args(db, client, mocker, mock_redis):
-    upload = mocker.patch.object(TaskService, "upload")
+    upload = mocker.patch.object(TaskService, "publish_upload")
     create_presigned_put = mocker.patch(
         "services.archive.StorageService.create_presigned_put",
         return_value="test-presigned-put",
@@ -195,7 +197,7 @@ def test_upload_bundle_analysis_missing_args(db, client, mocker, mock_redis):
 
 
 def test_upload_bundle_analysis_invalid_token(db, client, mocker, mock_redis):
-    upload = mocker.patch.object(TaskService, "upload")
+    upload = mocker.patch.object(TaskService, "publish_upload")
     create_presigned_put = mocker.patch(
         "services.archive.StorageService.create_presigned_put",
         return_value="test-presigned-put",
@@ -228,7 +230,7 @@ def test_upload_bundle_analysis_invalid_token(db, client, mocker, mock_redis):
 def test_upload_bundle_analysis_github_oidc_auth(
     mock_jwks_client, mock_jwt_decode, db, mocker
 ):
-    mocker.patch.object(TaskService, "upload")
+    mocker.patch.object(TaskService, "publish_upload")
     mocker.patch(
         "services.archive.StorageService.create_presigned_put",
         return_value="test-presigned-put",
@@ -259,7 +261,7 @@ def test_upload_bundle_analysis_github_oidc_auth(
 def test_upload_bundle_analysis_measurement_datasets_created(
     db, client, mocker, mock_redis
 ):
-    mocker.patch.object(TaskService, "upload")
+    mocker.patch.object(TaskService, "publish_upload")
     mocker.patch("upload.views.bundle_analysis.sentry_metrics.incr")
     mocker.patch(
         "services.archive.StorageService.create_presigned_put",
@@ -307,7 +309,7 @@ def test_upload_bundle_analysis_measurement_datasets_created(
 def test_upload_bundle_analysis_measurement_timeseries_disabled(
     db, client, mocker, mock_redis
 ):
-    mocker.patch.object(TaskService, "upload")
+    mocker.patch.object(TaskService, "publish_upload")
     mocker.patch("upload.views.bundle_analysis.sentry_metrics.incr")
     mocker.patch(
         "services.archive.StorageService.create_presigned_put",
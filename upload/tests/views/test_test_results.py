@@ -13,7 +13,7 @@ from services.task import TaskService
 
 
 def test_upload_test_results(db, client, mocker, mock_redis):
-    upload = mocker.patch.object(TaskService, "upload")
+    upload = mocker.patch.object(TaskService, "publish_upload")
     mock_sentry_metrics = mocker.patch("upload.views.test_results.metrics.incr")
     create_presigned_put = mocker.patch(
         "services.archive.StorageService.create_presigned_put",
@@ -90,6 +90,7 @@ def test_upload_test_results(db, client, mocker, mock_redis):
         countdown=4,
         report_code=None,
         report_type="test_results",
+        on_spool=None,
     )
     mock_sentry_metrics.assert_called_with(
         "upload",
@@ -105,7 +106,7 @@ def test_upload_test_results(db, client, mocker, mock_redis):
 
 
 def test_test_results_org_token(db, client, mocker, mock_redis):
-    upload = mocker.patch.object(TaskService, "upload")
+    upload = mocker.patch.object(TaskService, "publish_upload")
     create_presigned_put = mocker.patch(
         "services.archive.StorageService.create_presigned_put",
         return_value="test-presigned-put",
@@ -134,7 +135,7 @@ def test_test_results_org_token(db, client, mocker, mock_redis):
 def test_test_results_github_oidc_token(
     mock_jwks_client, mock_jwt_decode, db, client, mocker, mock_redis
 ):
-    mocker.patch.object(TaskService, "upload")
+    mocker.patch.object(TaskService, "publish_upload")
     mocker.patch(
         "services.archive.StorageService.create_presigned_put",
         return_value="test-presigned-put",
@@ -188,7 +189,7 @@ def test_test_results_no_auth(db, client, mocker, mock_redis):
 
 
 def test_upload_test_results_missing_args(db, client, mocker, mock_redis):
-    upload = mocker.patch.object(TaskService, "upload")
+    upload = mocker.patch.object(TaskService, "publish_upload")
     create_presigned_put = mocker.patch(
         "services.archive.StorageService.create_presigned_put",
         return_value="test-presigned-put",
@@ -226,7 +227,7 @@ def test_upload_test_results_missing_args(db, client, mocker, mock_redis):
 def test_update_repo_fields_when_upload_is_triggered(
     db, client, mocker, mock_redis
 ) -> None:
-    upload = mocker.patch.object(TaskService, "upload")
+    upload = mocker.patch.object(TaskService, "publish_upload")
     create_presigned_put = mocker.patch(
         "services.archive.StorageService.create_presigned_put",
         return_value="test-presigned-put",
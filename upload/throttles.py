@@ -2,14 +2,11 @@ import logging
 
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
-from django.db.models import Q
 from rest_framework.throttling import BaseThrottle
-from shared.reports.enums import UploadType
-from shared.upload.utils import query_monthly_coverage_measurements
 
 from plan.service import PlanService
-from reports.models import ReportSession
 from services.redis_configuration import get_redis_connection
+from services.upload_counters import upload_counters
 from upload.helpers import _determine_responsible_owner
 
 log = logging.getLogger(__name__)
@@ -22,11 +19,7 @@ class UploadsPerCommitThrottle(BaseThrottle):
         try:
             repository = view.get_repo()
             commit = view.get_commit(repository)
-            new_session_count = ReportSession.objects.filter(
-                ~Q(state="error"),
-                ~Q(upload_type=UploadType.CARRIEDFORWARD.db_name),
-                report__commit=commit,
-            ).count()
+            new_session_count = view.get_upload_counts(commit).new
             max_upload_limit = repository.author.max_upload_limit or 150
             if new_session_count > max_upload_limit:
                 log.warning(
@@ -53,16 +46,11 @@ class UploadsPerWindowThrottle(BaseThrottle):
                 plan_service = PlanService(current_org=owner)
                 limit = plan_service.monthly_uploads_limit
                 if limit is not None:
-                    did_commit_uploads_start_already = ReportSession.objects.filter(
-                        report__commit=commit
-                    ).exists()
+                    did_commit_uploads_start_already = (
+                        view.get_upload_counts(commit).total > 0
+                    )
                     if not did_commit_uploads_start_already:
-                        if (
-                            query_monthly_coverage_measurements(
-                                plan_service=plan_service
-                            )
-                            >= limit
-                        ):
+                        if upload_counters.monthly_uploads(plan_service) >= limit:
                             log.warning(
                                 "User exceeded its limits for usage",
                                 extra=dict(
@@ -1,4 +1,5 @@
 import logging
+from typing import Any, Callable, Optional
 
 from django.conf import settings
 from rest_framework.exceptions import ValidationError
@@ -6,6 +7,7 @@ from rest_framework.exceptions import ValidationError
 from codecov_auth.models import Service
 from core.models import Commit, Repository
 from reports.models import CommitReport
+from services.upload_counters import CommitUploadCounts, upload_counters
 from upload.views.helpers import get_repository_from_string
 
 log = logging.getLogger(__name__)
@@ -24,9 +26,29 @@ class ShelterMixin:
 
 
 class GetterMixin(ShelterMixin):
+    """
+    Lookups shared by the upload views, their permissions and their throttles.
+
+    DRF instantiates views per request, so successful lookups are memoized on the
+    view instance and every caller of the same request gets the same objects
+    without querying them again.  Failed lookups are not memoized so that they
+    keep raising (and logging) on every call.
+    """
+
+    def _memoized(self, key: tuple, fetch: Callable[[], Any]) -> Any:
+        identity_map = self.__dict__.setdefault("_identity_map", {})
+        if key not in identity_map:
+            identity_map[key] = fetch()
+        return identity_map[key]
+
     def get_repo(self) -> Repository:
         service = self.kwargs.get("service")
         repo_slug = self.kwargs.get("repo")
+        return self._memoized(
+            ("repo", service, repo_slug), lambda: self._fetch_repo(service, repo_slug)
+        )
+
+    def _fetch_repo(self, service: str, repo_slug: str) -> Repository:
         try:
             service_enum = Service(service)
         except ValueError:
@@ -47,6 +69,12 @@ class GetterMixin(ShelterMixin):
 
     def get_commit(self, repo: Repository) -> Commit:
         commit_sha = self.kwargs.get("commit_sha")
+        return self._memoized(
+            ("commit", repo.repoid, commit_sha),
+            lambda: self._fetch_commit(repo, commit_sha),
+        )
+
+    def _fetch_commit(self, repo: Repository, commit_sha: str) -> Commit:
         try:
             commit = Commit.objects.get(
                 commitid=commit_sha, repository__repoid=repo.repoid
@@ -65,6 +93,14 @@ class GetterMixin(ShelterMixin):
         report_code = self.kwargs.get("report_code")
         if report_code == "default":
             report_code = None
+        return self._memoized(
+            ("report", commit.id, report_code, report_type),
+            lambda: self._fetch_report(commit, report_code, report_type),
+        )
+
+    def _fetch_report(
+        self, commit: Commit, report_code: Optional[str], report_type
+    ) -> CommitReport:
         queryset = CommitReport.objects.filter(code=report_code, commit=commit)
         if report_type == CommitReport.ReportType.COVERAGE:
             queryset = queryset.coverage_reports()
@@ -81,3 +117,12 @@ class GetterMixin(ShelterMixin):
             report.report_type = CommitReport.ReportType.COVERAGE
             report.save()
         return report
+
+    def get_upload_counts(self, commit: Commit) -> CommitUploadCounts:
+        """
+        Upload counts of the commit, as of the first call for this request.
+        """
+        return self._memoized(
+            ("upload_counts", commit.id),
+            lambda: upload_counters.commit_counts(commit),
+        )
@@ -26,6 +26,7 @@ from reports.models import CommitReport, ReportSession
 from services.analytics import AnalyticsService
 from services.archive import ArchiveService, MinioEndpoints
 from services.redis_configuration import get_redis_connection
+from services.upload_counters import upload_counters
 from upload.helpers import (
     dispatch_upload_task,
     generate_upload_sentry_metrics_tags,
@@ -122,6 +123,7 @@ class UploadViews(ListCreateAPIView, GetterMixin):
             private_repo=repository.private,
             report_type=report.report_type,
         )
+        upload_counters.record_upload(instance, commit, repository.private)
 
         # only Shelter requests are allowed to set their own `storage_path`
         if instance.storage_path is None or not self.is_shelter_request():